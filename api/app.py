@@ -8,6 +8,8 @@ from api.routes.stocks import router as stocks_router
 from api.routes.selection import router as selection_router
 from api.routes.backtest import router as backtest_router
 from api.routes.jobs import router as jobs_router
+from api.routes.correlation import router as correlation_router
+from api.routes.similarity import router as similarity_router
 
 
 def create_app() -> FastAPI:
@@ -23,6 +25,8 @@ def create_app() -> FastAPI:
     app.include_router(selection_router)
     app.include_router(backtest_router)
     app.include_router(jobs_router)
+    app.include_router(correlation_router)
+    app.include_router(similarity_router)
     return app
 
 
@@ -2,20 +2,114 @@
 # - /backtest 同步/异步回测
 # - 提供参数校验与分页导出
 
+import datetime
+
 from fastapi import APIRouter
+from core.jobs.queue import JobQueue
 from core.service.backtest_service import BacktestService
+from strategy.adjust import DEFAULT_ADJUST
 
 router = APIRouter(prefix="/backtest", tags=["backtest"])
 
 
 @router.post("")
-async def run_backtest(body: dict):
+def run_backtest(body: dict):
     cfg = body.get("cfg", {})
     start = body.get("start")
     end = body.get("end")
     codes = body.get("codes")
     lookback = int(body.get("lookback", 60))
     forward_n = int(body.get("forward_n", 5))
+    # 可选：params={fee_single_side_bps, top_k_per_day, entry_mode, exit_mode, exclude_limit_up, limit_up_threshold,
+    #              benchmark: "industry" | 指数代码}
+    #       weights={vol,ma,brk,pat,macd,rsi}，engine={max_positions, sizing, initial_cash, stamp_tax_rate, lot_size}
+    #       bootstrap={n_samples, block_days, seed}：汇总指标的块自助法置信区间
     svc = BacktestService()
-    res = svc.run(cfg, start, end, codes, lookback, forward_n)
+    res = svc.run(cfg, start, end, codes, lookback, forward_n,
+                  params=body.get("params"), weights=body.get("weights"), engine=body.get("engine"),
+                  bootstrap=body.get("bootstrap"))
     return res
+
+
+@router.post("/incremental")
+def run_incremental(body: dict):
+    # body 同 /backtest，另有 force?: bool（强制全量重算）；end 缺省为今天
+    svc = BacktestService()
+    end = body.get("end") or datetime.date.today().strftime("%Y%m%d")
+    try:
+        return svc.run_incremental(body.get("cfg", {}), body.get("start"), end, body.get("codes"),
+                                   int(body.get("lookback", 60)), int(body.get("forward_n", 5)),
+                                   params=body.get("params"), weights=body.get("weights"),
+                                   force=bool(body.get("force", False)))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.post("/event-study")
+def run_event_study(body: dict):
+    # body: { start, end, cfg?: {} | patterns?: [形态名], pattern_params?: {}, codes?: [], lookback?,
+    #         pre?: 事件前K线数, post?: 事件后K线数, benchmark?: "industry" | 指数代码 | "market" | null }
+    svc = BacktestService()
+    return svc.event_study(body.get("start"), body.get("end"), cfg=body.get("cfg"), patterns=body.get("patterns"),
+                           pattern_params=body.get("pattern_params"), codes=body.get("codes"),
+                           lookback=int(body.get("lookback", 60)), pre=int(body.get("pre", 5)),
+                           post=int(body.get("post", 20)), benchmark=body.get("benchmark", "industry"))
+
+
+@router.post("/factor-ic")
+def run_factor_ic(body: dict):
+    # body: { start, end, factors?: ["rsi_14", "ma_dist_20", "vol_ratio_5", "atr_pct_14", "ret_20", ...],
+    #         horizons?: [1, 2, 3, 5, 10, 20], quantiles?: 5, quantile_horizon?: 5, codes?: [], adjust?: raw|qfq|hfq }
+    try:
+        return BacktestService().factor_ic(body.get("start"), body.get("end"), factors=body.get("factors"),
+                                           horizons=body.get("horizons"), quantiles=int(body.get("quantiles", 5)),
+                                           quantile_horizon=body.get("quantile_horizon"), codes=body.get("codes"),
+                                           adjust=body.get("adjust", DEFAULT_ADJUST))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.post("/rotation")
+def run_rotation(body: dict):
+    # body: { start, end, level?: 1, cfg?: {criteria: {momentum|volume|low_vol|risk_adj: 权重}, lookback, skip,
+    #         top_n, rebalance_days, signal_lag, hold: "industry" | "stocks", stocks_per_industry, fee_single_side_bps} }
+    try:
+        return BacktestService().rotation(body.get("cfg", {}), body.get("start"), body.get("end"),
+                                          level=body.get("level", 1))
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.get("/runs")
+def list_runs():
+    return {"items": BacktestService().list_runs()}
+
+
+@router.post("/sweep")
+def run_sweep(body: dict):
+    # body: { cfg: {}, start, end, codes?: [], grid: {参数: [候选值]}, params?: {lookback_days, forward_n, ...},
+    #         weights?: {}, processes?: n, early_stop?: {frac, min_signals, min_win_rate, min_avg_ret_after_fee}, rank_by? }
+    # 扫描耗时较长，提交到任务队列，结果通过 /jobs/{job_id} 查询
+    svc = BacktestService()
+    job_id = JobQueue.instance().submit(
+        svc.sweep, body.get("cfg", {}), body.get("start"), body.get("end"), body.get("grid") or {},
+        codes=body.get("codes"), params=body.get("params"), weights=body.get("weights"),
+        processes=body.get("processes"), early_stop=body.get("early_stop"),
+        rank_by=body.get("rank_by", "avg_ret_after_fee"),
+    )
+    return {"job_id": job_id}
+
+
+@router.post("/walk-forward")
+def run_walk_forward(body: dict):
+    # body: { cfg: {}, start, end, codes?: [], grid: {参数: [候选值]}, train_days, test_days, step_days?, anchored?,
+    #         params?: {...}, weights?: {}, processes?: n, rank_by? }
+    svc = BacktestService()
+    job_id = JobQueue.instance().submit(
+        svc.walk_forward, body.get("cfg", {}), body.get("start"), body.get("end"), body.get("grid") or {},
+        int(body.get("train_days", 120)), int(body.get("test_days", 20)),
+        step_days=body.get("step_days"), anchored=bool(body.get("anchored", False)),
+        codes=body.get("codes"), params=body.get("params"), weights=body.get("weights"),
+        processes=body.get("processes", 1), rank_by=body.get("rank_by", "avg_ret_after_fee"),
+    )
+    return {"job_id": job_id}
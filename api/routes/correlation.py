@@ -0,0 +1,23 @@
+# 收益相关性：最相关股票查询、收益共振聚类（矩阵按窗口截止日缓存，见 CorrelationService）
+
+from fastapi import APIRouter, HTTPException
+from core.service.correlation_service import CorrelationService, DEFAULT_CORR_WINDOW
+
+router = APIRouter(prefix="/correlation", tags=["correlation"])
+
+
+@router.get("/{ts_code}")
+def most_correlated(ts_code: str, end: str | None = None, window: int = DEFAULT_CORR_WINDOW, k: int = 10,
+                    ascending: bool = False):
+    """与 ts_code 近 window 日收益相关性最高（ascending=true 时最低）的 k 只股票"""
+    result = CorrelationService().most_correlated(ts_code, end, window, k, ascending)
+    if not result["items"]:
+        raise HTTPException(status_code=404, detail=f"{ts_code} 不在相关矩阵中（窗口内K线不足或无数据）")
+    return result
+
+
+@router.post("/clusters")
+def correlation_clusters(body: dict):
+    # body: { end?: "yyyyMMdd", window?: 60, n_clusters?: 20, codes?: [] }
+    return CorrelationService().clusters(body.get("end"), int(body.get("window") or DEFAULT_CORR_WINDOW),
+                                         int(body.get("n_clusters") or 20), body.get("codes"))
@@ -2,19 +2,55 @@
 # - /selection 触发选股、查询最近一次结果
 # - 传入策略参数(cfg)与时间范围
 
+import json
+import time
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from core.service.selection_service import SelectionService
 
 router = APIRouter(prefix="/selection", tags=["selection"])
 
 
 @router.post("")
-async def run_selection(body: dict):
-    # body: { cfg: {}, start: "yyyyMMdd", end: "yyyyMMdd", codes?: [] }
+def run_selection(body: dict, stream: bool = False):
+    # body: { cfg: {}, start: "yyyyMMdd", end: "yyyyMMdd", codes?: [], weights?: {vol,ma,brk,pat,macd,rsi}, top_k?: 0,
+    #         max_corr?: 0.7, corr_window?: 60 }
+    # max_corr：Top-K 分散约束，跳过与已选股票收益相关系数超过该值的候选
+    # stream=true 时以 NDJSON 逐行返回通过的股票，最后一行为 {"done": true, "total": n, "elapsed_ms": x}
     cfg = body.get("cfg", {})
     start = body.get("start")
     end = body.get("end")
     codes = body.get("codes")
+    weights = body.get("weights")
+    top_k = int(body.get("top_k") or 0)
+    max_corr = body.get("max_corr")
+    max_corr = float(max_corr) if max_corr is not None else None
     svc = SelectionService()
-    result = svc.select(cfg, start, end, codes)
+    # top_k / max_corr 需要全量排序，此时不走流式
+    if (stream or body.get("stream")) and not (top_k or max_corr is not None):
+        def _ndjson():
+            t0 = time.perf_counter()
+            total = 0
+            for item in svc.iter_select(cfg, start, end, codes, weights):
+                total += 1
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "total": total,
+                              "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 2)}) + "\n"
+        return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+    result = svc.select(cfg, start, end, codes, weights, top_k, max_corr, body.get("corr_window"))
     return {"items": result, "total": len(result)}
+
+
+@router.post("/batch")
+def run_selection_batch(body: dict):
+    # body: { configs: [{}, ...], start: "yyyyMMdd", end: "yyyyMMdd", codes?: [], weights?: {}, top_k?: 0,
+    #         max_corr?: 0.7, corr_window?: 60 }
+    configs = body.get("configs") or []
+    start = body.get("start")
+    end = body.get("end")
+    codes = body.get("codes")
+    svc = SelectionService()
+    max_corr = body.get("max_corr")
+    return svc.select_many(configs, start, end, codes, body.get("weights"), int(body.get("top_k") or 0),
+                           float(max_corr) if max_corr is not None else None, body.get("corr_window"))
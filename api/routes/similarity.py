@@ -0,0 +1,26 @@
+# 历史形态相似检索：哪些股票/哪段历史与给定走势最像，以及之后的远期收益
+
+from fastapi import APIRouter, HTTPException
+from core.service.similarity_service import DEFAULT_SHAPE_WINDOW, DEFAULT_YEARS, SimilarityService
+from strategy.similarity import DEFAULT_HORIZONS
+
+router = APIRouter(prefix="/similarity", tags=["similarity"])
+
+
+@router.post("")
+def search_similar(body: dict):
+    # body: { code?: "000001", end?: "yyyyMMdd", values?: [收盘价...], volumes?: [成交量...], window?: 60,
+    #         use_volume?: false, vol_weight?: 0.5, k?: 20, per_code?: 1, since?: "yyyyMMdd", until?: "yyyyMMdd",
+    #         codes?: [], years?: 10, horizons?: [5, 10, 20] }
+    # 查询某只股票自身历史上的相似走势：codes=[code]，per_code=k
+    try:
+        return SimilarityService().search(
+            code=body.get("code"), end=body.get("end"), values=body.get("values"), volumes=body.get("volumes"),
+            window=int(body.get("window") or DEFAULT_SHAPE_WINDOW), use_volume=bool(body.get("use_volume")),
+            vol_weight=float(body.get("vol_weight", 0.5)), k=int(body.get("k") or 20),
+            per_code=int(body.get("per_code") or 1), since=body.get("since"), until=body.get("until"),
+            codes=body.get("codes"), years=int(body.get("years") or DEFAULT_YEARS),
+            horizons=body.get("horizons") or DEFAULT_HORIZONS,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -3,7 +3,7 @@
 # - 依赖注入 session/service
 
 from fastapi import APIRouter
-from core.dao.repositories import StockRepository, IndustryRepository
+from core.dao.repositories import StockRepository, IndustryRepository, MarketSnapshotRepository
 from core.service.real_industry_service import RealIndustryService
 from core.service.database_industry_service import DatabaseIndustryService
 
@@ -18,20 +18,25 @@ async def list_stocks(q: str | None = None, limit: int = 50, offset: int = 0):
 
 @router.get("/stats")
 async def get_stats():
-    """获取股票统计信息"""
+    """获取股票统计信息；市场宽度与异动读取 market_snapshot 的最新一行"""
     repo = StockRepository()
     # 获取股票总数
     items, total = repo.paged_list(None, 1, 0)
-    
-    # 获取最新交易日
-    from infrastructure.db.engine import get_session
-    with get_session() as conn:
-        latest_date_row = conn.execute("SELECT MAX(trade_date) FROM daily_kline").fetchone()
-        latest_date = latest_date_row[0] if latest_date_row and latest_date_row[0] else None
-    
+
+    snapshot = MarketSnapshotRepository().latest()
+    if snapshot:
+        latest_date = snapshot["trade_date"]
+    else:
+        # 尚未计算快照时回退到 daily_kline
+        from infrastructure.db.engine import get_session
+        with get_session() as conn:
+            latest_date_row = conn.execute("SELECT MAX(trade_date) FROM daily_kline").fetchone()
+            latest_date = latest_date_row[0] if latest_date_row and latest_date_row[0] else None
+
     return {
         "total_stocks": total,
-        "latest_trade_date": latest_date
+        "latest_trade_date": latest_date,
+        "market": snapshot
     }
 
 @router.get("/industries")
@@ -151,7 +156,7 @@ async def get_industry_members(index_code: str):
         return {"error": str(e)}
 
 @router.post("/calculate-stats")
-async def calculate_stats(request: dict):
+def calculate_stats(request: dict):
     """计算指定日期的统计数据"""
     from core.service.data_service import DataService
     
@@ -162,9 +167,78 @@ async def calculate_stats(request: dict):
     data_service = DataService()
     industry_count = data_service.calculate_industry_stats(trade_date)
     stock_count = data_service.calculate_stock_daily_stats(trade_date)
+    snapshot_count = data_service.calculate_market_snapshot(trade_date)
+    xs_rank_count = data_service.calculate_xs_ranks(trade_date)
     
     return {
         "trade_date": trade_date,
         "industry_stats_calculated": industry_count,
-        "stock_stats_calculated": stock_count
+        "stock_stats_calculated": stock_count,
+        "market_snapshot_calculated": snapshot_count,
+        "xs_rank_calculated": xs_rank_count
     }
+
+
+@router.post("/calculate-stats-range")
+def calculate_stats_range(request: dict):
+    """按日期区间批量计算行业统计；已计算过的日期默认跳过，force=true 时重算"""
+    from core.service.data_service import DataService
+
+    start = request.get("start")
+    end = request.get("end")
+    if not start or not end:
+        return {"error": "start and end are required"}
+
+    data_service = DataService()
+    result = data_service.calculate_industry_stats_range(
+        start, end, force=bool(request.get("force", False)), chunk_days=int(request.get("chunk_days", 20))
+    )
+    snapshot_count = data_service.calculate_market_snapshot(start, end)
+    return {"start": start, "end": end, "industry_stats": result, "market_snapshot": snapshot_count}
+
+
+@router.post("/calculate-xs-rank")
+def calculate_xs_rank(request: dict):
+    """按日期区间计算截面排名特征（全市场/行业内百分位与名次），features 缺省为默认特征集"""
+    from core.service.data_service import DataService
+
+    start = request.get("start")
+    if not start:
+        return {"error": "start is required"}
+    end = request.get("end") or start
+    try:
+        rows = DataService().calculate_xs_ranks(start, end, request.get("features"))
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"start": start, "end": end, "rows": rows}
+
+
+@router.post("/calculate-timeframe-bars")
+def calculate_timeframe_bars(request: dict):
+    """重算周/月K线（weekly_kline / monthly_kline）；start 为空时全量重建，timeframes 缺省为 weekly + monthly"""
+    from core.service.data_service import DataService
+
+    try:
+        rows = DataService().calculate_timeframe_bars(request.get("start"), request.get("end"),
+                                                      request.get("timeframes"))
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"start": request.get("start"), "end": request.get("end"), "rows": rows}
+
+
+@router.get("/market-snapshot")
+def get_market_snapshot(start: str, end: str):
+    """区间内逐日的市场宽度与异动快照"""
+    return MarketSnapshotRepository().get_range(start, end)
+
+
+@router.get("/{ts_code}/kline")
+def get_stock_kline(ts_code: str, start: str, end: str, adjust: str = "qfq", timeframe: str = "daily"):
+    """单只股票的K线（图表用）；adjust: raw 不复权 | qfq 前复权 | hfq 后复权，timeframe: daily | weekly | monthly"""
+    from core.service.price_service import PriceService
+
+    try:
+        items = PriceService().bars(ts_code, start, end, adjust=adjust, timeframe=timeframe)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"ts_code": ts_code, "adjust": adjust, "timeframe": timeframe, "items": items}
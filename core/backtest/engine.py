@@ -1,12 +1,201 @@
-# TODO
-# - 实现基础回测循环(按交易日/信号执行)
-# - 支持交易规则(开平仓/手续费/滑点/涨跌停处理)
-# - 产出曲线与指标
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.panel import Panel
+from strategy.scoring import top_k_indices
+
+
+@dataclass
+class EngineConfig:
+    """组合回测参数。
+    - fee_single_side_bps：单边佣金，千分之x（与 Backtester 同口径）；stamp_tax_rate：卖出印花税率
+    - entry_mode：close=信号日收盘买入，next_open=次日开盘买入
+    - exit_mode：持有满 hold_days 根K线后按 close/open 卖出；T+1：买入当日不可卖出
+    - sizing：equal=每个空仓位分配 NAV/max_positions；score=按得分比例分配同等总额
+    """
+    initial_cash: float = 1_000_000.0
+    max_positions: int = 10
+    hold_days: int = 5
+    sizing: str = "equal"
+    fee_single_side_bps: float = 3.0
+    stamp_tax_rate: float = 0.0005
+    lot_size: int = 100
+    entry_mode: str = "next_open"
+    exit_mode: str = "close"
+
+
+@dataclass
+class EngineResult:
+    nav: pd.DataFrame                  # 逐日：nav/cash/market_value/exposure/turnover/positions
+    trades: pd.DataFrame               # 成交明细
+    summary: Dict[str, Any] = field(default_factory=dict)
+
 
 class BacktestEngine:
-    """TODO: 简单回测引擎占位"""
-    def run(self, signals, config):
-        """占位：根据输入信号计算简单绩效
-        - 目前直接返回空summary，后续实现资金曲线/胜率等
-        """
-        return {"summary": {"signals": len(signals)}, "signals": signals}
+    """组合级逐日事件驱动回测。
+
+    状态全部保存在按代码排列的 NumPy 数组中（持股数、买入行、成本），每个交易日只做
+    一组向量化步骤：开盘成交 -> 收盘成交 -> 收盘估值。选股与排序在外部完成，
+    引擎只接收 (日期 × 代码) 的得分表（NaN 或 False 表示无信号）。
+    buyable/sellable 为可选的 (日期 × 代码) 布尔表，用于涨跌停、停牌等成交约束。
+    """
+    def __init__(self, config: Optional[EngineConfig] = None):
+        self.config = config or EngineConfig()
+
+    def run(self, panel: Panel, scores: pd.DataFrame | np.ndarray,
+            buyable: pd.DataFrame | np.ndarray | None = None,
+            sellable: pd.DataFrame | np.ndarray | None = None) -> EngineResult:
+        cfg = self.config
+        dates = np.asarray(panel.index)
+        codes = np.asarray(panel.codes)
+        n_days, n_codes = len(dates), len(codes)
+        open_px = panel["open"].to_numpy(dtype=float)
+        close_px = panel["close"].to_numpy(dtype=float)
+        # 停牌日按最近收盘价估值
+        mark_px = panel["close"].ffill().to_numpy(dtype=float)
+        raw = np.asarray(scores)
+        if raw.dtype == bool:
+            sig, sc = raw, raw.astype(float)
+        else:
+            sc = raw.astype(float)
+            sig = np.isfinite(sc)
+        can_buy = np.ones((n_days, n_codes), dtype=bool) if buyable is None else np.asarray(buyable, dtype=bool)
+        can_sell = np.ones((n_days, n_codes), dtype=bool) if sellable is None else np.asarray(sellable, dtype=bool)
+
+        fee = cfg.fee_single_side_bps / 1000.0
+        tax = cfg.stamp_tax_rate
+        lot = max(int(cfg.lot_size), 1)
+        hold = max(int(cfg.hold_days), 1)
+
+        # ====== 数组化状态 ======
+        cash = float(cfg.initial_cash)
+        shares = np.zeros(n_codes, dtype=np.int64)
+        buy_row = np.full(n_codes, -1, dtype=np.int64)
+        cost = np.zeros(n_codes)            # 含费买入总额，用于计算单笔盈亏
+        bars_held = np.zeros(n_codes, dtype=np.int64)
+
+        nav = np.zeros(n_days)
+        cash_hist = np.zeros(n_days)
+        mv_hist = np.zeros(n_days)
+        traded = np.zeros(n_days)
+        n_pos = np.zeros(n_days, dtype=np.int64)
+        trades: List[Dict[str, np.ndarray]] = []
+        prev_nav = cash
+
+        def _sell(t: int, px: np.ndarray) -> float:
+            nonlocal cash
+            # T+1：买入当日不可卖；持有满 hold 根K线、价格有效且允许卖出
+            mask = (shares > 0) & (buy_row < t) & (bars_held >= hold) & np.isfinite(px) & can_sell[t]
+            if not mask.any():
+                return 0.0
+            idx = np.flatnonzero(mask)
+            gross = shares[idx] * px[idx]
+            proceeds = gross * (1.0 - fee - tax)
+            cash += float(proceeds.sum())
+            trades.append({
+                "trade_date": np.full(len(idx), dates[t]), "ts_code": codes[idx], "side": np.full(len(idx), "sell"),
+                "price": px[idx], "shares": shares[idx].copy(), "amount": gross,
+                "pnl": proceeds - cost[idx], "ret_pct": (proceeds / cost[idx] - 1.0) * 100.0,
+                "entry_date": dates[buy_row[idx]],
+            })
+            shares[idx] = 0
+            buy_row[idx] = -1
+            cost[idx] = 0.0
+            bars_held[idx] = 0
+            return float(gross.sum())
+
+        def _buy(t: int, sig_row: int, px: np.ndarray, nav_ref: float) -> float:
+            nonlocal cash
+            slots = cfg.max_positions - int((shares > 0).sum())
+            if slots <= 0 or sig_row < 0:
+                return 0.0
+            ok = sig[sig_row] & (shares == 0) & np.isfinite(px) & (px > 0) & can_buy[t]
+            cand = np.flatnonzero(ok)
+            if len(cand) == 0:
+                return 0.0
+            pick = cand[top_k_indices(sc[sig_row, cand], slots)][:slots]
+            budget = min(nav_ref / cfg.max_positions * len(pick), cash)
+            if cfg.sizing == "score":
+                w = np.maximum(sc[sig_row, pick], 0.0)
+                w = w / w.sum() if w.sum() > 0 else np.full(len(pick), 1.0 / len(pick))
+            else:
+                w = np.full(len(pick), 1.0 / len(pick))
+            qty = np.floor(budget * w / (px[pick] * (1.0 + fee)) / lot).astype(np.int64) * lot
+            keep = qty > 0
+            pick, qty = pick[keep], qty[keep]
+            if len(pick) == 0:
+                return 0.0
+            gross = qty * px[pick]
+            outlay = gross * (1.0 + fee)
+            cash -= float(outlay.sum())
+            shares[pick] = qty
+            buy_row[pick] = t
+            cost[pick] = outlay
+            bars_held[pick] = 0
+            trades.append({
+                "trade_date": np.full(len(pick), dates[t]), "ts_code": codes[pick], "side": np.full(len(pick), "buy"),
+                "price": px[pick], "shares": qty, "amount": gross,
+                "pnl": np.zeros(len(pick)), "ret_pct": np.zeros(len(pick)), "entry_date": np.full(len(pick), dates[t]),
+            })
+            return float(gross.sum())
+
+        for t in range(n_days):
+            # 持有天数按该股实际K线计数（停牌不计）
+            bars_held += (shares > 0) & np.isfinite(close_px[t])
+            turnover_value = 0.0
+            # 开盘：先卖后买
+            if cfg.exit_mode == "open":
+                turnover_value += _sell(t, open_px[t])
+            if cfg.entry_mode == "next_open":
+                turnover_value += _buy(t, t - 1, open_px[t], prev_nav)
+            # 收盘
+            if cfg.exit_mode != "open":
+                turnover_value += _sell(t, close_px[t])
+            if cfg.entry_mode != "next_open":
+                turnover_value += _buy(t, t, close_px[t], prev_nav)
+            mv = float((shares * np.nan_to_num(mark_px[t])).sum())
+            nav[t] = cash + mv
+            cash_hist[t] = cash
+            mv_hist[t] = mv
+            traded[t] = turnover_value
+            n_pos[t] = int((shares > 0).sum())
+            prev_nav = nav[t]
+
+        nav_df = pd.DataFrame({
+            "trade_date": dates,
+            "nav": nav / cfg.initial_cash,
+            "equity": nav,
+            "cash": cash_hist,
+            "market_value": mv_hist,
+            "exposure": np.divide(mv_hist, nav, out=np.zeros(n_days), where=nav > 0),
+            "turnover": np.divide(traded, nav, out=np.zeros(n_days), where=nav > 0),
+            "positions": n_pos,
+        })
+        trades_df = (pd.DataFrame({k: np.concatenate([tr[k] for tr in trades]) for k in trades[0]})
+                     if trades else pd.DataFrame(columns=["trade_date", "ts_code", "side", "price", "shares",
+                                                          "amount", "pnl", "ret_pct", "entry_date"]))
+        return EngineResult(nav=nav_df, trades=trades_df, summary=self._summary(nav_df, trades_df))
+
+    @staticmethod
+    def _summary(nav_df: pd.DataFrame, trades: pd.DataFrame) -> Dict[str, Any]:
+        if nav_df.empty:
+            return {"days": 0}
+        nav = nav_df["nav"].to_numpy()
+        dd = nav / np.maximum.accumulate(nav) - 1.0
+        days = len(nav)
+        total = nav[-1] - 1.0
+        sells = trades[trades["side"] == "sell"] if not trades.empty else trades
+        return {
+            "days": days,
+            "final_nav": round(float(nav[-1]), 4),
+            "total_return": round(float(total) * 100.0, 3),
+            "annual_return": round(float((nav[-1] ** (252.0 / days) - 1.0) * 100.0), 3) if nav[-1] > 0 else -100.0,
+            "portfolio_mdd": round(float(dd.min()) * 100.0, 2),
+            "avg_exposure": round(float(nav_df["exposure"].mean()), 4),
+            "avg_turnover": round(float(nav_df["turnover"].mean()), 4),
+            "trades": int(len(sells)),
+            "trade_win_rate": round(float((sells["pnl"] > 0).mean()) * 100.0, 2) if len(sells) else 0.0,
+        }
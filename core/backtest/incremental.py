@@ -0,0 +1,229 @@
+import hashlib
+import json
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.dao.repositories import BacktestRunRepository, KlineRepository
+from strategy.adjust import adjust_fields, normalize_adjust
+from strategy.backtest import summarize_signals
+from strategy.cross_section import xs_specs
+from strategy.panel import PANEL_FIELDS, Panel
+from strategy.selector import StrategyConfig
+from strategy.vector_backtest import VectorBacktester
+
+# EMA 类指标（MACD/RSI/ATR）没有固定窗口，续算时额外预热的交易日数
+EMA_WARMUP_ROWS = 250
+
+
+def config_hash(spec: Dict[str, Any]) -> str:
+    """回测配置（策略/起点/参数/权重/股票池）的稳定哈希。"""
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def warmup_rows(cfg: StrategyConfig, lookback_days: int) -> int:
+    """续算时信号日之前需要额外加载的行数：覆盖全部滚动窗口，EMA 类指标再多预热一段。"""
+    windows = [lookback_days, cfg.volume_ma_days, cfg.pattern_window + 3, *(cfg.ma_days or [])]
+    windows += [w for w in (cfg.pullback_touch_ma, cfg.range_increase_days, cfg.exists_day_increase_within_days) if w]
+    if cfg.breakout_n:
+        windows.append(cfg.breakout_n + 1)
+    rows = max(int(w) for w in windows) + 5
+    if cfg.macd_enable or cfg.rsi_enable or cfg.atr_period:
+        rows += EMA_WARMUP_ROWS
+    return rows
+
+
+def panel_fingerprints(panel: Panel) -> Dict[str, str]:
+    """按交易日的数据指纹，口径与 KlineRepository.day_fingerprints 相同。"""
+    close = panel["close"].to_numpy(dtype=float)
+    valid = np.isfinite(close)
+
+    def _sum(name: str, scale: float, offset: float = 0.0) -> np.ndarray:
+        if name not in panel.fields:
+            return np.zeros(len(panel.index), dtype=np.int64)
+        x = panel[name].to_numpy(dtype=float)
+        ok = valid & np.isfinite(x)
+        return np.where(ok, np.floor(np.nan_to_num(x) * scale + offset + 0.5), 0).astype(np.int64).sum(axis=1)
+
+    n = valid.sum(axis=1)
+    parts = (n, _sum("close", 1000), _sum("vol", 1), _sum("limit_status", 1, 3), _sum("adj_factor", 1e6))
+    return {str(d): ":".join(str(p[i]) for p in parts) for i, d in enumerate(panel.index)}
+
+
+def _extend_state(state: Dict[str, Any], signals: pd.DataFrame) -> Dict[str, Any]:
+    """把一段按顺序排列的已定稿信号并入汇总状态（计数/胜场/收益和/串行资金曲线的末值、峰值与最大回撤）。"""
+    out = dict(state)
+    if signals is None or signals.empty:
+        return out
+    ret_fee = signals["ret_pct_after_fee"].to_numpy(dtype=float)
+    eq = out["eq_last"] * np.cumprod(1.0 + ret_fee / 100.0)
+    peak = np.maximum.accumulate(np.maximum(eq, out["peak"]))
+    out["count"] += int(len(signals))
+    out["wins"] += int((ret_fee > 0).sum())
+    out["sum_ret"] += float(signals["ret_pct"].sum())
+    out["sum_ret_fee"] += float(ret_fee.sum())
+    out["eq_last"] = float(eq[-1])
+    out["peak"] = float(peak[-1])
+    out["mdd"] = min(out["mdd"], float((eq / peak - 1.0).min()))
+    return out
+
+
+def _new_state() -> Dict[str, Any]:
+    return {"count": 0, "wins": 0, "sum_ret": 0.0, "sum_ret_fee": 0.0, "eq_last": 1.0, "peak": 0.0, "mdd": 0.0}
+
+
+class IncrementalBacktest:
+    """可续算的信号回测。
+
+    每个 (配置, 起点, 参数, 权重, 股票池) 以哈希为键保存在 backtest_runs：
+    - 已定稿的信号写入 backtest_signals，汇总量（计数、收益和、资金曲线末值/峰值/最大回撤）写入 state
+    - 仍在等待入场/离场K线的末尾信号日不定稿，记为 resume_date，下次从这里续算
+    - data_version 为计算时 daily_kline 的 rowid 水位，state 中另记 kline_revisions 修订号；重跑时只检查
+      水位之后写入、以及修订号之后被回填工具原地更新的旧日期，按日指纹（行数/收盘和/成交量和/
+      涨跌停状态和/复权因子和）比对，旧数据确有变化才回退为全量重算
+    - 前复权（adjust=qfq）的历史价格以各股最新因子为基准，新的除权会整体改写历史价格：
+      state 中记录股票池最新因子的摘要，摘要变化时同样全量重算
+    续算只加载 resume_date 之前 warmup_rows 行的预热数据；滚动窗口类指标与全量结果一致，
+    EMA 类指标（MACD/RSI/ATR）依赖预热长度，与全量结果存在极小差异。
+    """
+    def __init__(self, klines: Optional[KlineRepository] = None, runs: Optional[BacktestRunRepository] = None):
+        self.klines = klines or KlineRepository()
+        self.runs = runs or BacktestRunRepository()
+
+    def run(self, cfg: StrategyConfig, start: str, end: str, codes: Iterable[str] | None = None,
+            lookback_days: int = 60, forward_n: int = 5, params: Dict[str, Any] | None = None,
+            weights: Dict[str, float] | None = None, force: bool = False) -> Dict[str, Any]:
+        """返回 {"mode": full|incremental|cached, "run_id", "summary", "signals": 本次新增/变化的信号}。"""
+        # 续算按日线的交易日与数据指纹定位，周/月K线周期请用全量回测
+        if (cfg.timeframe or "daily") != "daily":
+            raise ValueError("增量回测只支持日线周期")
+        params = dict(params or {})
+        codes_list = sorted(codes) if codes else None
+        spec = {"cfg": asdict(cfg), "start": start, "codes": codes_list, "lookback_days": lookback_days,
+                "forward_n": forward_n, "params": params, "weights": weights or {}}
+        key = config_hash(spec)
+        # 先取水位再读数据：读取期间写入的行在下次重跑时会被重新检查
+        version = self.klines.max_rowid()
+        prev = None if force else self.runs.get(key)
+        dates = self.klines.trade_dates(start, end)
+        if len(dates) < 2:
+            return {"mode": "full", "run_id": None, "summary": summarize_signals(pd.DataFrame(), start, end),
+                    "signals": pd.DataFrame()}
+
+        digest = self._factor_digest(cfg, codes_list)
+        revision = self.klines.revision()
+        if (prev is not None and prev["last_date"] <= dates[-1] and prev["state"].get("factor_digest", "") == digest
+                and not self._history_changed(prev, start, codes_list)):
+            if (prev["last_date"] == dates[-1] and prev["data_version"] == version
+                    and prev["state"].get("revision", 0) == revision):
+                return {"mode": "cached", "run_id": prev["id"], "summary": prev["summary"], "signals": pd.DataFrame()}
+            return self._extend(prev, spec, cfg, dates, codes_list, version, revision)
+        return self._full(spec, key, cfg, dates, codes_list, version, digest, revision)
+
+    # ====== 数据变化检测 ======
+    def _history_changed(self, prev: Dict[str, Any], start: str, codes: List[str] | None) -> bool:
+        # 新写入的行按 rowid 水位定位；回填工具原地 UPDATE 的交易日按修订号定位（见 KlineRepository.record_revision）
+        touched = self.klines.touched_dates(prev["data_version"], start, prev["last_date"],
+                                            since_revision=prev["state"].get("revision", 0))
+        if not touched:
+            return False
+        stored = prev["state"].get("fingerprints", {})
+        current = self.klines.day_fingerprints(touched, codes)
+        return any(stored.get(d, "0:0:0:0:0") != current[d] for d in touched)
+
+    def _factor_digest(self, cfg: StrategyConfig, codes: List[str] | None) -> str:
+        """前复权基准（股票池各股最新 adj_factor）的摘要；其余复权方式的历史价格不随新数据变化，为空串。"""
+        if normalize_adjust(cfg.adjust) != "qfq":
+            return ""
+        latest = self.klines.latest_factors()
+        if codes is not None:
+            latest = latest[latest.index.isin(set(codes))]
+        items = sorted(f"{c}:{v:.6g}" for c, v in latest.items())
+        return hashlib.sha1("|".join(items).encode("utf-8")).hexdigest()
+
+    # ====== 全量 / 续算 ======
+    def _full(self, spec: Dict[str, Any], key: str, cfg: StrategyConfig, dates: List[str],
+              codes: List[str] | None, version: int, digest: str, revision: int) -> Dict[str, Any]:
+        panel, fingerprints = self._load(cfg, dates[0], dates[-1], codes)
+        res = VectorBacktester(panel).run(cfg, spec["lookback_days"], spec["forward_n"],
+                                          weights=spec["weights"] or None, **spec["params"])
+        final, _ = self._split(res.signals, res.pending_from)
+        state = _extend_state(_new_state(), final)
+        state["fingerprints"] = fingerprints
+        state["first_date"] = dates[0]
+        state["factor_digest"] = digest
+        state["revision"] = revision
+        summary = dict(res.summary)
+        run_id = self._save(key, spec, dates, res.pending_from, version, state, summary, final, replace_from=None)
+        return {"mode": "full", "run_id": run_id, "summary": summary, "signals": res.signals}
+
+    def _extend(self, prev: Dict[str, Any], spec: Dict[str, Any], cfg: StrategyConfig, dates: List[str],
+                codes: List[str] | None, version: int, revision: int) -> Dict[str, Any]:
+        # 续算起点：上次未定稿的首个信号日，否则为上次末日的下一交易日
+        resume = prev["resume_date"] or next((d for d in dates if d > prev["last_date"]), dates[-1])
+        resume_row = max(dates.index(resume) if resume in dates else len(dates) - 1, 1)
+        lo = max(resume_row - warmup_rows(cfg, spec["lookback_days"]), 0)
+        panel, fingerprints = self._load(cfg, dates[lo], dates[-1], codes)
+        res = VectorBacktester(panel).run(cfg, spec["lookback_days"], spec["forward_n"],
+                                          weights=spec["weights"] or None,
+                                          rows=slice(resume_row - lo, None), **spec["params"])
+        final, _ = self._split(res.signals, res.pending_from)
+
+        state = _extend_state(prev["state"], final)
+        # 汇总 = 已定稿状态 + 本次全部信号（含未定稿部分），中位数需要完整收益序列
+        view = _extend_state(prev["state"], res.signals)
+        stored_ret = self.runs.load_signals(prev["id"], ["ret_pct"])["ret_pct"]
+        summary = dict(res.summary)
+        summary.update(self._summary_from_state(view, pd.concat([stored_ret, res.signals.get("ret_pct", pd.Series(dtype=float))])))
+        summary["period"] = (prev["state"].get("first_date", dates[0]), dates[-1])
+
+        fps = dict(prev["state"].get("fingerprints", {}))
+        fps.update({d: fp for d, fp in fingerprints.items() if d >= dates[resume_row]})
+        state["fingerprints"] = fps
+        state["first_date"] = prev["state"].get("first_date", dates[0])
+        state["factor_digest"] = prev["state"].get("factor_digest", "")
+        state["revision"] = revision
+        run_id = self._save(prev["config_hash"], spec, dates, res.pending_from, version, state, summary, final,
+                            replace_from=resume)
+        return {"mode": "incremental", "run_id": run_id, "summary": summary, "signals": res.signals}
+
+    # ====== 工具 ======
+    def _load(self, cfg: StrategyConfig, start: str, end: str, codes: List[str] | None):
+        """加载回测面板并返回 (面板, 按日数据指纹)：指纹按原始价格计算（与 day_fingerprints 口径一致），
+        之后价格字段再按 cfg.adjust 原地复权。"""
+        adjust = normalize_adjust(cfg.adjust)
+        panel = self.klines.get_panel(start, end, codes, align="calendar", xs=xs_specs([cfg]),
+                                      fields=[*PANEL_FIELDS, "adj_factor"])
+        fingerprints = panel_fingerprints(panel)
+        adjust_fields(panel.fields, panel.fields.pop("adj_factor"), adjust,
+                      self.klines.latest_factors() if adjust == "qfq" else None)
+        return panel, fingerprints
+
+    @staticmethod
+    def _split(signals: pd.DataFrame, pending_from: str | None):
+        if signals.empty or pending_from is None:
+            return signals, signals.iloc[0:0]
+        keep = signals["trade_date"] < pending_from
+        return signals[keep], signals[~keep]
+
+    @staticmethod
+    def _summary_from_state(state: Dict[str, Any], ret_pct: pd.Series) -> Dict[str, Any]:
+        n = state["count"]
+        if n == 0:
+            return {"signals": 0, "win_rate": 0.0, "avg_ret": 0.0, "median_ret": 0.0, "avg_ret_after_fee": 0.0, "mdd": 0.0}
+        return {
+            "signals": n,
+            "win_rate": round(state["wins"] / n * 100.0, 2),
+            "avg_ret": round(state["sum_ret"] / n, 3),
+            "median_ret": round(float(ret_pct.median()), 3),
+            "avg_ret_after_fee": round(state["sum_ret_fee"] / n, 3),
+            "mdd": round(state["mdd"] * 100.0, 2),
+        }
+
+    def _save(self, key: str, spec: Dict[str, Any], dates: List[str], pending_from: str | None, version: int,
+              state: Dict[str, Any], summary: Dict[str, Any], final: pd.DataFrame, replace_from: str | None) -> int:
+        run = {"config_hash": key, "config": spec, "start_date": dates[0], "last_date": dates[-1],
+               "resume_date": pending_from, "data_version": version, "state": state, "summary": summary}
+        return self.runs.save(run, final, replace_from=replace_from)
@@ -0,0 +1,212 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.analytics import ratio_metrics
+from strategy.scoring import top_k_mask
+
+# 可用的截面因子
+ROTATION_FACTORS = ("momentum", "volume", "low_vol", "risk_adj")
+
+
+@dataclass
+class RotationConfig:
+    """行业轮动参数。
+    - criteria：{因子: 权重}，得分 = Σ 权重 × 因子的截面百分位排名；因子见 ROTATION_FACTORS
+      momentum=lookback 期涨幅（跳过最近 skip 根），volume=近 lookback 均量 / 近 4×lookback 均量，
+      low_vol=-(lookback 期日收益标准差)，risk_adj=momentum / 波动
+    - rebalance_days：每隔多少个交易日调仓；signal_lag：用几行之前的因子决策（默认 1，收盘调仓无前视）
+    - hold：industry=等权持有前 top_n 个行业指数；stocks=持有这些行业内按个股动量排名前 stocks_per_industry 的成分股
+    - fee_single_side_bps：单边费率（千分之x，与回测同口径）；stamp_tax_rate：卖出印花税（仅 stocks 模式）
+    """
+    criteria: Dict[str, float] = field(default_factory=lambda: {"momentum": 1.0})
+    lookback: int = 20
+    skip: int = 0
+    top_n: int = 3
+    rebalance_days: int = 20
+    signal_lag: int = 1
+    hold: str = "industry"
+    stocks_per_industry: int = 3
+    fee_single_side_bps: float = 1.0
+    stamp_tax_rate: float = 0.0
+
+    @classmethod
+    def from_dict(cls, d: Optional[Mapping[str, Any]]) -> "RotationConfig":
+        known = set(cls.__dataclass_fields__)
+        return cls(**{k: v for k, v in (d or {}).items() if k in known})
+
+
+@dataclass
+class RotationResult:
+    nav: pd.DataFrame                  # 逐日：nav/benchmark_nav/turnover/holdings
+    holdings: pd.DataFrame             # 每次调仓：trade_date/code/weight
+    summary: Dict[str, Any] = field(default_factory=dict)
+
+
+def factor_frames(close: pd.DataFrame, vol: Optional[pd.DataFrame], lookback: int, skip: int = 0) -> Dict[str, pd.DataFrame]:
+    """(日期 × 标的) 的各因子宽表，均为整表向量化的滚动运算。"""
+    n = int(lookback)
+    px = close.ffill()
+    ret = px.pct_change(fill_method=None)
+    mom = px.shift(skip) / px.shift(skip + n) - 1.0
+    sd = ret.rolling(n, min_periods=max(n // 2, 2)).std()
+    out = {"momentum": mom, "low_vol": -sd, "risk_adj": mom / sd.where(sd > 0)}
+    if vol is not None:
+        out["volume"] = vol.rolling(n, min_periods=1).mean() / vol.rolling(4 * n, min_periods=n).mean()
+    return out
+
+
+def rotation_scores(factors: Dict[str, pd.DataFrame], criteria: Mapping[str, float]) -> pd.DataFrame:
+    """多因子合成：各因子逐日截面百分位排名后加权求和；任一所需因子缺失的标的得分为 NaN。"""
+    score = None
+    for name, w in criteria.items():
+        if name not in factors:
+            raise ValueError(f"未知或缺少数据的轮动因子: {name}")
+        part = factors[name].rank(axis=1, pct=True) * float(w)
+        score = part if score is None else score + part
+    if score is None:
+        raise ValueError("criteria 不能为空")
+    return score
+
+
+def rebalance_nav(close: np.ndarray, reb_rows: np.ndarray, weights: np.ndarray,
+                  fee_rate: float = 0.0, tax_rate: float = 0.0) -> Dict[str, np.ndarray]:
+    """给定调仓行与每次调仓的目标权重，向量化计算净值（调仓日收盘成交，期间买入持有、权重随价格漂移）。
+    close：(日期 × 标的) 已前向填充的收盘价；weights：(调仓次数 × 标的)，每行和为 1（全 0 表示空仓）。
+    返回 nav（调仓前为 1）与每次调仓的 turnover（单边换手率）。"""
+    n_rows = close.shape[0]
+    n_reb = len(reb_rows)
+    nav = np.ones(n_rows)
+    if n_reb == 0:
+        return {"nav": nav, "turnover": np.zeros(0)}
+    px = np.where(np.isfinite(close), close, np.nan)
+    seg = np.searchsorted(reb_rows, np.arange(n_rows), side="right") - 1
+    live = seg >= 0
+    rows = np.flatnonzero(live)
+    s = seg[live]
+    base = px[reb_rows[s]]
+    w = weights[s]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = np.where(w > 0, px[rows] / base, 0.0)
+    cash = 1.0 - w.sum(axis=1)
+    growth = np.nansum(w * rel, axis=1) + cash
+
+    # 上一段持仓在下次调仓日收盘（调仓前）的增长与漂移后的权重，用于换手与段间衔接
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drift = np.where(weights[:-1] > 0, px[reb_rows[1:]] / px[reb_rows[:-1]], 0.0) * weights[:-1]
+    drift = np.nan_to_num(drift)
+    end_growth = drift.sum(axis=1) + (1.0 - weights[:-1].sum(axis=1))
+    drift = drift / np.maximum(end_growth, 1e-12)[:, None]
+    prev = np.vstack([np.zeros((1, weights.shape[1])), drift])
+    traded = np.abs(weights - prev).sum(axis=1)
+    sold = np.maximum(prev - weights, 0.0).sum(axis=1)
+    cost = traded * fee_rate + sold * tax_rate
+    # 每段起点净值 = 上段末净值 × (1 - 调仓成本)
+    seg_start = np.cumprod(np.r_[1.0, end_growth] * (1.0 - cost))
+    nav[rows] = seg_start[s] * growth
+    return {"nav": nav, "turnover": traded / 2.0}
+
+
+class SectorRotation:
+    """行业轮动回测：每个调仓日按截面因子得分选出前 top_n 个行业，
+    持有行业指数（hold=industry）或其中动量最强的成分股（hold=stocks）。
+    因子、排名与净值均为整表运算，只在调仓日（十余年约百余次）上循环选成分股。"""
+    def __init__(self, config: Optional[RotationConfig] = None):
+        self.config = config or RotationConfig()
+
+    def _rebalance_rows(self, dates: np.ndarray, score: np.ndarray, start: Optional[str]) -> np.ndarray:
+        first_valid = np.flatnonzero(np.isfinite(score).any(axis=1))
+        if len(first_valid) == 0:
+            return np.zeros(0, dtype=np.int64)
+        r0 = int(first_valid[0])
+        if start:
+            r0 = max(r0, int(np.searchsorted(dates, start)))
+        return np.arange(r0, len(dates), max(int(self.config.rebalance_days), 1))
+
+    def run(self, index_close: pd.DataFrame, index_vol: Optional[pd.DataFrame] = None, start: Optional[str] = None,
+            stock_close: Optional[pd.DataFrame] = None, member_map: Optional[Mapping[str, str]] = None) -> RotationResult:
+        """index_close/index_vol：(trade_date × index_code) 宽表；start 之前的数据只用于因子预热。
+        hold=stocks 时需 stock_close（与 index_close 同一套交易日行）与 member_map {无后缀代码: index_code}。"""
+        cfg = self.config
+        dates = np.asarray(index_close.index)
+        lag = max(int(cfg.signal_lag), 0)
+        score = rotation_scores(factor_frames(index_close, index_vol, cfg.lookback, cfg.skip), cfg.criteria)
+        score = score.shift(lag).to_numpy(dtype=float)
+        reb = self._rebalance_rows(dates, score, start)
+        top = top_k_mask(score[reb], int(cfg.top_n)) if len(reb) else np.zeros((0, score.shape[1]), dtype=bool)
+
+        if cfg.hold == "stocks":
+            if stock_close is None or member_map is None:
+                raise ValueError("hold=stocks 需要 stock_close 与 member_map")
+            stock_close = stock_close.reindex(index_close.index)
+            col_of = {c: i for i, c in enumerate(index_close.columns)}
+            ind_of = np.array([col_of.get(member_map.get(str(c).split('.')[0]), -1) for c in stock_close.columns],
+                              dtype=np.int64)
+            stock_score = factor_frames(stock_close, None, cfg.lookback, cfg.skip)["momentum"].shift(lag).to_numpy()
+            tradable = np.isfinite(stock_close.to_numpy(dtype=float))
+            weights = np.zeros((len(reb), stock_close.shape[1]))
+            for i, r in enumerate(reb):
+                chosen = np.flatnonzero(top[i])
+                ok = (ind_of >= 0) & np.isin(ind_of, chosen) & np.isfinite(stock_score[r]) & tradable[r]
+                idx = np.flatnonzero(ok)
+                if len(idx) == 0:
+                    continue
+                # 行业内按动量降序取前 stocks_per_industry 只
+                order = idx[np.lexsort((-stock_score[r, idx], ind_of[idx]))]
+                g = ind_of[order]
+                starts = np.r_[0, np.flatnonzero(np.diff(g)) + 1]
+                pos = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+                pick = order[pos < int(cfg.stocks_per_industry)]
+                weights[i, pick] = 1.0 / len(pick)
+            labels = np.asarray(stock_close.columns)
+            px = stock_close.ffill().to_numpy(dtype=float)
+            tax = float(cfg.stamp_tax_rate)
+        else:
+            weights = top / np.maximum(top.sum(axis=1, keepdims=True), 1)
+            labels = np.asarray(index_close.columns)
+            px = index_close.ffill().to_numpy(dtype=float)
+            tax = 0.0
+
+        res = rebalance_nav(px, reb, weights, cfg.fee_single_side_bps / 1000.0, tax)
+        nav = res["nav"]
+        # 基准：全部行业指数等权（逐日再平衡）
+        ipx = index_close.ffill()
+        bench_ret = ipx.pct_change(fill_method=None).mean(axis=1).fillna(0.0).to_numpy()
+        first = int(reb[0]) if len(reb) else len(dates)
+        keep = np.arange(len(dates)) >= first
+        # 与策略同一起点（首个调仓日收盘）计算基准净值
+        bench_nav = np.cumprod(np.where(np.arange(len(dates)) > first, 1.0 + bench_ret, 1.0))
+        turnover = np.zeros(len(dates))
+        turnover[reb] = res["turnover"]
+        holdings_n = np.zeros(len(dates), dtype=np.int64)
+        if len(reb):
+            counts = (weights > 0).sum(axis=1)
+            holdings_n[keep] = counts[np.searchsorted(reb, np.flatnonzero(keep), side="right") - 1]
+        nav_df = pd.DataFrame({"trade_date": dates, "nav": nav, "benchmark_nav": bench_nav,
+                               "turnover": turnover, "holdings": holdings_n})[keep].reset_index(drop=True)
+        ri, ci = np.nonzero(weights)
+        holdings = pd.DataFrame({"trade_date": dates[reb[ri]], "code": labels[ci], "weight": weights[ri, ci]})
+        return RotationResult(nav=nav_df, holdings=holdings, summary=self._summary(nav_df, res["turnover"]))
+
+    @staticmethod
+    def _summary(nav_df: pd.DataFrame, turnover: np.ndarray) -> Dict[str, Any]:
+        if nav_df.empty:
+            return {"days": 0, "rebalances": 0}
+        nav = nav_df["nav"].to_numpy()
+        bench = nav_df["benchmark_nav"].to_numpy()
+        rets = np.r_[nav[0] - 1.0, nav[1:] / nav[:-1] - 1.0]
+        m = ratio_metrics(rets)
+        return {
+            "days": int(len(nav)),
+            "rebalances": int(len(turnover)),
+            "final_nav": round(float(nav[-1]), 4),
+            "total_return": round(float(nav[-1] - 1.0) * 100.0, 3),
+            "annual_return": m["annual_return"],
+            "sharpe": m["sharpe"],
+            "mdd": m["mdd"],
+            "avg_turnover": round(float(turnover.mean()), 4) if len(turnover) else 0.0,
+            "benchmark_return": round(float(bench[-1] - 1.0) * 100.0, 3),
+            "excess_return": round(float(nav[-1] - bench[-1]) * 100.0, 3),
+        }
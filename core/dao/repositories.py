@@ -1,4 +1,7 @@
-from typing import Iterable, Dict, List
+import json
+import math
+import time
+from typing import Any, Iterable, Dict, List, Tuple
 from infrastructure.db.engine import get_session
 
 
@@ -40,15 +43,25 @@ class StockRepository:
                 ) for it in items]
             )
 
-    def info_map(self) -> Dict[str, Dict[str, str]]:
-        """返回 {code: {name, industry}} 映射（code 无后缀）。"""
+    # 进程级缓存：股票基础信息变化很少，避免每次选股请求全表扫描
+    _info_cache: Dict[str, Dict[str, str]] | None = None
+    _info_cache_at: float = 0.0
+
+    def info_map(self, max_age: float = 300.0) -> Dict[str, Dict[str, str]]:
+        """返回 {code: {name, industry}} 映射（code 无后缀）。
+        - max_age 秒内复用缓存；传 0 强制刷新
+        """
+        cls = type(self)
+        if cls._info_cache is not None and time.time() - cls._info_cache_at < max_age:
+            return cls._info_cache
         with get_session() as conn:
             rows = conn.execute("SELECT ts_code, name, industry FROM stock_info").fetchall()
             result: Dict[str, Dict[str, str]] = {}
             for code, name, industry in rows:
                 code_no = code.split('.')[0] if code else code
                 result[code_no] = {"name": name or "-", "industry": industry or "-"}
-            return result
+        cls._info_cache, cls._info_cache_at = result, time.time()
+        return result
 
 
 class KlineRepository:
@@ -61,6 +74,132 @@ class KlineRepository:
             ).fetchall()
             return rows
 
+    def codes_between(self, start: str, end: str) -> List[str]:
+        """区间内有K线的代码（按 daily_kline 中的存储形式返回）。"""
+        with get_session() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT ts_code FROM daily_kline WHERE trade_date>=? AND trade_date<=? ORDER BY ts_code",
+                (start, end)
+            ).fetchall()
+            return [r[0] for r in rows]
+
+    def prefilter(self, cfg, start: str, end: str, codes: Iterable[str] | None = None):
+        """SQL 预筛（见 strategy.planner.SelectionPlanner），无可下推条件时返回 None。"""
+        from strategy.planner import SelectionPlanner
+        with get_session() as conn:
+            return SelectionPlanner(conn).candidates(cfg, start, end, list(codes) if codes is not None else None)
+
+    def get_panel(self, start: str, end: str, codes: Iterable[str] | None = None, align: str = "calendar",
+                  xs: Iterable[tuple] | None = None, fields: Iterable[str] | None = None, timeframe: str = "daily",
+                  adjust: str = "raw"):
+        """一次性加载区间K线为宽表面板（见 strategy.panel.Panel），fields 缺省为 PANEL_FIELDS；
+        timeframe 为 weekly / monthly 时读取周/月K线表（见 TimeframeRepository）；
+        adjust 为 qfq / hfq 时价格字段复权（见 strategy.adjust），前复权基准取 latest_factors 的缓存；
+        xs 为 (特征, 范围) 集合时同时附加截面排名字段（见 CrossSectionRepository.attach）。"""
+        from strategy.adjust import normalize_adjust
+        from strategy.panel import PANEL_FIELDS, load_panel
+        from strategy.timeframe import kline_table
+        adjust = normalize_adjust(adjust)
+        latest = self.latest_factors() if adjust == "qfq" else None
+        with get_session() as conn:
+            panel = load_panel(conn, start, end, codes, fields=fields or PANEL_FIELDS, align=align,
+                               table=kline_table(timeframe), adjust=adjust, latest=latest)
+            if xs:
+                CrossSectionRepository().attach(panel, xs, conn)
+            return panel
+
+    # 进程级缓存：((rowid 水位, 修订号), 各股最新复权因子)，daily_kline 有新写入或原地回填时重查
+    _factor_cache: tuple | None = None
+
+    def latest_factors(self):
+        """各代码最新的 adj_factor（前复权基准，见 strategy.adjust.latest_factors），按 rowid 水位与修订号缓存。"""
+        from strategy.adjust import latest_factors
+        cls = type(self)
+        version = self.data_version()
+        if cls._factor_cache is not None and cls._factor_cache[0] == version:
+            return cls._factor_cache[1]
+        with get_session() as conn:
+            latest = latest_factors(conn)
+        cls._factor_cache = (version, latest)
+        return latest
+
+    def trade_dates(self, start: str, end: str) -> List[str]:
+        with get_session() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT trade_date FROM daily_kline WHERE trade_date>=? AND trade_date<=? ORDER BY trade_date",
+                (start, end)
+            ).fetchall()
+            return [r[0] for r in rows]
+
+    def max_rowid(self) -> int:
+        """daily_kline 的 rowid 水位：INSERT OR REPLACE 每次写入都会产生更大的 rowid。"""
+        with get_session() as conn:
+            row = conn.execute("SELECT MAX(id) FROM daily_kline").fetchone()
+            return int(row[0] or 0)
+
+    def touched_dates(self, since_rowid: int, start: str, end: str, since_revision: int | None = None) -> List[str]:
+        """rowid 水位之后写入、且交易日落在 [start, end] 的日期（只扫描新写入的行）；
+        给定 since_revision 时再并入该修订号之后原地回填（UPDATE 不改 rowid）的交易日区间。"""
+        with get_session() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT trade_date FROM daily_kline WHERE id>? AND trade_date>=? AND trade_date<=?",
+                (since_rowid, start, end)
+            ).fetchall()
+            dates = {r[0] for r in rows}
+            if since_revision is not None:
+                for lo, hi in conn.execute(
+                    "SELECT start_date, end_date FROM kline_revisions WHERE id>? AND end_date>=? AND start_date<=?",
+                    (since_revision, start, end)
+                ).fetchall():
+                    dates.update(r[0] for r in conn.execute(
+                        "SELECT DISTINCT trade_date FROM daily_kline WHERE trade_date>=? AND trade_date<=?",
+                        (max(lo, start), min(hi, end))
+                    ).fetchall())
+            return sorted(dates)
+
+    def data_version(self) -> Tuple[int, int]:
+        """进程级缓存的失效键：(rowid 水位, 修订号)，新写入与原地回填都会使其变化。"""
+        return self.max_rowid(), self.revision()
+
+    def revision(self) -> int:
+        """原地回填的修订号（kline_revisions 的最大 id）：回填工具按列 UPDATE 不产生新 rowid，改为登记修订区间。"""
+        with get_session() as conn:
+            row = conn.execute("SELECT MAX(id) FROM kline_revisions").fetchone()
+            return int(row[0] or 0)
+
+    @staticmethod
+    def record_revision(conn, start: str, end: str, source: str) -> None:
+        """登记一次对 [start, end] 交易日的原地回填（回填工具在提交更新后调用，由调用方提交事务）。"""
+        conn.execute("INSERT INTO kline_revisions (start_date, end_date, source) VALUES (?, ?, ?)",
+                     (start, end, source))
+
+    def day_fingerprints(self, dates: Iterable[str], codes: Iterable[str] | None = None) -> Dict[str, str]:
+        """按交易日计算数据指纹 "行数:Σ收盘(厘):Σ成交量:Σ(涨跌停状态+3):Σ复权因子(百万分之一)"，
+        整数求和与累加顺序无关；空状态/空因子计 0，回填后指纹随之变化。"""
+        dates = list(dates)
+        codes_set = set(codes) if codes is not None else None
+        acc: Dict[str, List[int]] = {d: [0, 0, 0, 0, 0] for d in dates}
+        with get_session() as conn:
+            for i in range(0, len(dates), 500):
+                part = dates[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT trade_date, ts_code, close, vol, limit_status, adj_factor FROM daily_kline "
+                    f"WHERE trade_date IN ({','.join('?' for _ in part)}) AND close IS NOT NULL", part
+                ).fetchall()
+                for d, code, close, vol, status, factor in rows:
+                    if codes_set is not None and code not in codes_set:
+                        continue
+                    a = acc[d]
+                    a[0] += 1
+                    a[1] += int(math.floor(close * 1000 + 0.5))
+                    if vol is not None:
+                        a[2] += int(math.floor(vol + 0.5))
+                    if status is not None:
+                        a[3] += int(status) + 3
+                    if factor is not None:
+                        a[4] += int(math.floor(factor * 1e6 + 0.5))
+        return {d: ":".join(str(x) for x in a) for d, a in acc.items()}
+
     def latest_close_map(self) -> Dict[str, float]:
         with get_session() as conn:
             rows = conn.execute(
@@ -90,6 +229,280 @@ class SignalRepository:
     pass
 
 
+class BacktestRunRepository:
+    """回测结果持久化：backtest_runs 记录配置哈希、覆盖区间、数据版本与汇总状态，
+    backtest_signals 保存已定稿的信号明细。"""
+    SIGNAL_COLUMNS = ["trade_date", "ts_code", "entry_date", "entry_price", "exit_date", "exit_price",
+                      "ret_pct", "ret_pct_after_fee", "score"]
+
+    def get(self, config_hash: str) -> Dict[str, Any] | None:
+        with get_session() as conn:
+            row = conn.execute(
+                "SELECT id, config, start_date, last_date, resume_date, data_version, state, summary, updated_at "
+                "FROM backtest_runs WHERE config_hash=?", (config_hash,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0], "config_hash": config_hash, "config": json.loads(row[1]), "start_date": row[2],
+            "last_date": row[3], "resume_date": row[4], "data_version": row[5],
+            "state": json.loads(row[6]) if row[6] else {}, "summary": json.loads(row[7]) if row[7] else {},
+            "updated_at": row[8],
+        }
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        with get_session() as conn:
+            rows = conn.execute(
+                "SELECT id, config_hash, config, start_date, last_date, updated_at FROM backtest_runs ORDER BY id"
+            ).fetchall()
+        return [{"id": r[0], "config_hash": r[1], "config": json.loads(r[2]), "start_date": r[3],
+                 "last_date": r[4], "updated_at": r[5]} for r in rows]
+
+    def save(self, run: Dict[str, Any], signals, replace_from: str | None = None) -> int:
+        """写入/更新运行记录并追加信号；replace_from 为 None 时清空旧信号（全量重算），
+        否则删除该日期及之后的旧信号后追加。返回 run_id。"""
+        with get_session() as conn:
+            conn.execute(
+                """
+                INSERT INTO backtest_runs (config_hash, config, start_date, last_date, resume_date, data_version, state, summary)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(config_hash) DO UPDATE SET
+                    config=excluded.config, start_date=excluded.start_date, last_date=excluded.last_date,
+                    resume_date=excluded.resume_date, data_version=excluded.data_version,
+                    state=excluded.state, summary=excluded.summary, updated_at=CURRENT_TIMESTAMP
+                """,
+                (run["config_hash"], json.dumps(run["config"], ensure_ascii=False, sort_keys=True), run["start_date"],
+                 run["last_date"], run["resume_date"], run["data_version"],
+                 json.dumps(run["state"]), json.dumps(run["summary"], ensure_ascii=False, default=str))
+            )
+            run_id = conn.execute("SELECT id FROM backtest_runs WHERE config_hash=?", (run["config_hash"],)).fetchone()[0]
+            if replace_from is None:
+                conn.execute("DELETE FROM backtest_signals WHERE run_id=?", (run_id,))
+            else:
+                conn.execute("DELETE FROM backtest_signals WHERE run_id=? AND trade_date>=?", (run_id, replace_from))
+            if signals is not None and len(signals):
+                cols = self.SIGNAL_COLUMNS
+                conn.executemany(
+                    f"INSERT INTO backtest_signals (run_id, {', '.join(cols)}) VALUES (?, {', '.join('?' for _ in cols)})",
+                    [(run_id, *row) for row in signals[cols].itertuples(index=False, name=None)]
+                )
+            return int(run_id)
+
+    def load_signals(self, run_id: int, columns: List[str] | None = None):
+        import pandas as pd
+        cols = columns or self.SIGNAL_COLUMNS
+        with get_session() as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(cols)} FROM backtest_signals WHERE run_id=? ORDER BY rowid", conn, params=[run_id]
+            )
+
+
+class MarketSnapshotRepository:
+    """市场宽度与异动日快照（market_snapshot，每个交易日一行）。
+    入库后由 refresh 按区间一次加载面板、向量化计算后写入，读取方按主键直接取值，不再扫描 daily_kline。"""
+    # 全量重建时每批覆盖的自然日数，限制单次加载的面板大小
+    CHUNK_DAYS = 366
+
+    @staticmethod
+    def _cell(v):
+        # NumPy 标量转为 Python 值，NaN 入库为 NULL
+        v = v.item() if hasattr(v, "item") else v
+        return None if isinstance(v, float) and math.isnan(v) else v
+
+    @staticmethod
+    def _row(cols: List[str], row: tuple) -> Dict[str, Any]:
+        item = dict(zip(cols, row))
+        for key in ("vol_spike_leaders", "turnover_leaders"):
+            item[key] = json.loads(item[key]) if item.get(key) else []
+        return item
+
+    def latest(self) -> Dict[str, Any] | None:
+        with get_session() as conn:
+            cur = conn.execute("SELECT * FROM market_snapshot ORDER BY trade_date DESC LIMIT 1")
+            row = cur.fetchone()
+            return self._row([d[0] for d in cur.description], row) if row else None
+
+    def get_range(self, start: str, end: str) -> List[Dict[str, Any]]:
+        with get_session() as conn:
+            cur = conn.execute(
+                "SELECT * FROM market_snapshot WHERE trade_date>=? AND trade_date<=? ORDER BY trade_date", (start, end)
+            )
+            cols = [d[0] for d in cur.description]
+            return [self._row(cols, r) for r in cur.fetchall()]
+
+    def refresh(self, since: str | None = None, end: str | None = None, conn=None) -> int:
+        """重算 [since, end] 内各交易日的快照（since 为空时从最早K线起全量重建），返回写入行数。
+        每批向前多加载约 warmup_rows() 个交易日（按自然日估算）作为滚动窗口的前置数据。"""
+        from datetime import datetime, timedelta
+        from strategy.market_snapshot import SNAPSHOT_COLUMNS, SNAPSHOT_FIELDS, compute_snapshots, warmup_rows
+        from strategy.panel import load_panel
+
+        if conn is None:
+            with get_session() as c:
+                return self.refresh(since, end, c)
+        if not since or not end:
+            lo, hi = conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+            if lo is None:
+                return 0
+            since, end = since or lo, end or hi
+        fmt = "%Y%m%d"
+        warmup = timedelta(days=int(warmup_rows() * 1.5) + 20)
+        cols = ["trade_date", *SNAPSHOT_COLUMNS, "vol_spike_leaders", "turnover_leaders"]
+        sql = (f"INSERT OR REPLACE INTO market_snapshot ({', '.join(cols)}, updated_at) "
+               f"VALUES ({', '.join('?' for _ in cols)}, CURRENT_TIMESTAMP)")
+        written = 0
+        lo = datetime.strptime(since, fmt)
+        hi = datetime.strptime(end, fmt)
+        while lo <= hi:
+            chunk_end = min(lo + timedelta(days=self.CHUNK_DAYS - 1), hi)
+            # 新高/新低按后复权价格判断，除权缺口不会被当成新低
+            panel = load_panel(conn, (lo - warmup).strftime(fmt), chunk_end.strftime(fmt), fields=SNAPSHOT_FIELDS,
+                               adjust="hfq")
+            dates = [d for d in panel.dates if lo.strftime(fmt) <= d <= chunk_end.strftime(fmt)]
+            df = compute_snapshots(panel, dates)
+            if not df.empty:
+                rows = [tuple(self._cell(v) for v in r) for r in df[cols].itertuples(index=False, name=None)]
+                conn.executemany(sql, rows)
+                written += len(rows)
+            lo = chunk_end + timedelta(days=1)
+        return written
+
+
+class CrossSectionRepository:
+    """截面排名特征库（xs_rank）：每个 (交易日, 特征, 代码) 一行，百分位以万分位整数存储，
+    全市场与行业内各一组（见 strategy.cross_section）。主键 (trade_date, feature, ts_code)，无 rowid。"""
+    # 全量重建时每批覆盖的自然日数
+    CHUNK_DAYS = 183
+
+    def refresh(self, since: str | None = None, end: str | None = None, features: Iterable[str] | None = None,
+                conn=None) -> int:
+        """重算 [since, end] 内各交易日的截面排名（since 为空时全量重建），返回写入行数。
+        每批加载全市场 calendar 面板（含特征所需的前置交易日），逐特征做一次整表/分组排名后批量写入。"""
+        from datetime import datetime, timedelta
+        from strategy.cross_section import DEFAULT_XS_FEATURES, XS_FIELDS, compute_ranks, warmup_rows
+        from strategy.panel import load_panel
+
+        if conn is None:
+            with get_session() as c:
+                return self.refresh(since, end, features, c)
+        features = list(features or DEFAULT_XS_FEATURES)
+        if not since or not end:
+            lo, hi = conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+            if lo is None:
+                return 0
+            since, end = since or lo, end or hi
+        industry = {str(code).split('.')[0]: ind for code, ind in conn.execute(
+            "SELECT ts_code, industry FROM stock_info WHERE industry IS NOT NULL AND industry != ''")}
+        fmt = "%Y%m%d"
+        warmup = timedelta(days=int(warmup_rows(features) * 1.5) + 20)
+        sql = ("INSERT OR REPLACE INTO xs_rank (trade_date, feature, ts_code, pct, ind_pct, rank, ind_rank) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+        written = 0
+        lo = datetime.strptime(since, fmt)
+        hi = datetime.strptime(end, fmt)
+        while lo <= hi:
+            chunk_end = min(lo + timedelta(days=self.CHUNK_DAYS - 1), hi)
+            first, last = lo.strftime(fmt), chunk_end.strftime(fmt)
+            # N日涨幅等价格类特征按后复权计算
+            panel = load_panel(conn, (lo - warmup).strftime(fmt), last, fields=XS_FIELDS, adjust="hfq")
+            df = compute_ranks(panel, features, industry, [d for d in panel.dates if first <= d <= last])
+            if not df.empty:
+                ints = df[["pct", "ind_pct", "rank", "ind_rank"]].astype("Int64").astype(object)
+                ints = ints.where(ints.notna(), None)
+                conn.executemany(sql, zip(df["trade_date"], df["feature"], df["ts_code"],
+                                          ints["pct"], ints["ind_pct"], ints["rank"], ints["ind_rank"]))
+                written += len(df)
+            lo = chunk_end + timedelta(days=1)
+        return written
+
+    def attach(self, panel, specs: Iterable[tuple], conn=None):
+        """把 (特征, 范围) 的百分位与名次作为宽表字段附加到面板（字段名见 cross_section.xs_field）。
+        calendar 面板按交易日区间读取；bars 面板只有最后一行有意义，按各股最后一根K线的日期读取。"""
+        import numpy as np
+        import pandas as pd
+        from strategy.cross_section import xs_columns, xs_field
+
+        specs = sorted(set(specs))
+        if not specs or len(panel.index) == 0:
+            return panel
+        if conn is None:
+            with get_session() as c:
+                return self.attach(panel, specs, c)
+        shape = (len(panel.index), len(panel.codes))
+        for feature, scope in specs:
+            pct_col, rank_col = xs_columns(scope)
+            base = f"SELECT trade_date, ts_code, {pct_col}, {rank_col} FROM xs_rank WHERE feature=? AND "
+            if panel.align == "calendar":
+                df = pd.read_sql_query(base + "trade_date>=? AND trade_date<=?", conn,
+                                       params=[feature, str(panel.index[0]), str(panel.index[-1])])
+                rows = panel.index.get_indexer(df["trade_date"])
+                cols = panel.codes.get_indexer(df["ts_code"])
+            else:
+                dates = sorted(set(panel.last_dates.dropna()))
+                df = pd.read_sql_query(base + f"trade_date IN ({','.join('?' for _ in dates)})", conn,
+                                       params=[feature, *dates]) if dates else pd.DataFrame(
+                    columns=["trade_date", "ts_code", pct_col, rank_col])
+                cols = panel.codes.get_indexer(df["ts_code"])
+                last = panel.last_dates.reindex(panel.codes).to_numpy()
+                hit = (cols >= 0) & (last[np.maximum(cols, 0)] == df["trade_date"].to_numpy())
+                rows = np.where(hit, shape[0] - 1, -1)
+            ok = (rows >= 0) & (cols >= 0)
+            for kind, col in (("pct", pct_col), ("rank", rank_col)):
+                arr = np.full(shape, np.nan)
+                arr[rows[ok], cols[ok]] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)[ok]
+                panel.fields[xs_field(feature, scope, kind)] = pd.DataFrame(arr, index=panel.index, columns=panel.codes)
+        return panel
+
+
+class TimeframeRepository:
+    """周/月K线（weekly_kline / monthly_kline，见 strategy.timeframe）：由 daily_kline 按自然周/月聚合。
+    主键 (ts_code, period)，重算某个周期即整体覆盖该周期的行；日常入库后只需重算当前未结束的周期。"""
+    # 全量重建时每批覆盖的自然日数（按周期边界取整，批次不会切开周期）
+    CHUNK_DAYS = 366
+
+    def refresh(self, since: str | None = None, end: str | None = None, timeframes: Iterable[str] | None = None,
+                conn=None) -> int:
+        """重算覆盖 [since, end] 的全部周期（从 since 所在周期的第一天起，since 为空时全量重建），返回写入行数。"""
+        from datetime import datetime, timedelta
+        import pandas as pd
+        from strategy.timeframe import (DAILY_FIELDS, PERIOD_COLUMNS, PERIOD_TIMEFRAMES, aggregate_bars, kline_table,
+                                        period_bounds)
+
+        if conn is None:
+            with get_session() as c:
+                return self.refresh(since, end, timeframes, c)
+        if not since or not end:
+            lo, hi = conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+            if lo is None:
+                return 0
+            since, end = since or lo, end or hi
+        fmt = "%Y%m%d"
+        written = 0
+        for tf in timeframes or PERIOD_TIMEFRAMES:
+            table = kline_table(tf)
+            sql = (f"INSERT OR REPLACE INTO {table} ({', '.join(PERIOD_COLUMNS)}) "
+                   f"VALUES ({', '.join('?' for _ in PERIOD_COLUMNS)})")
+            lo = period_bounds(since, tf)[0]
+            while lo <= end:
+                hi = (datetime.strptime(lo, fmt) + timedelta(days=self.CHUNK_DAYS - 1)).strftime(fmt)
+                hi = period_bounds(min(hi, end), tf)[1]
+                daily = pd.read_sql_query(
+                    f"SELECT ts_code, trade_date, {', '.join(DAILY_FIELDS)} FROM daily_kline "
+                    f"WHERE trade_date>=? AND trade_date<=?", conn, params=[lo, hi]
+                )
+                bars = aggregate_bars(daily, tf)
+                if not bars.empty:
+                    bars = bars.astype(object).where(bars.notna(), None)
+                    conn.executemany(sql, bars.itertuples(index=False, name=None))
+                    written += len(bars)
+                lo = (datetime.strptime(hi, fmt) + timedelta(days=1)).strftime(fmt)
+        return written
+
+
+# 预计算的行业滚动聚合窗口（交易日数）
+ROLLING_WINDOWS = (1, 5, 7, 20, 60)
+
+
 class IndustryRepository:
     """行业统计仓储"""
     def get_all_industries(self) -> List[dict]:
@@ -99,36 +512,23 @@ class IndustryRepository:
             return [{"name": row[0], "id": row[0]} for row in rows]
     
     def get_industry_stats(self, days: int = 7) -> List[dict]:
-        """获取行业统计数据，按最近N天总成交量排序"""
-        with get_session() as conn:
-            # 获取最近N天的行业统计数据
-            # 先获取最新的几个交易日
-            latest_dates_query = """
-            SELECT DISTINCT trade_date 
-            FROM industry_stats 
-            ORDER BY trade_date DESC 
-            LIMIT ?
-            """
-            latest_dates = [row[0] for row in conn.execute(latest_dates_query, (days,)).fetchall()]
-            
-            if not latest_dates:
-                return []
-            
-            # 使用IN查询而不是日期减法
-            placeholders = ','.join(['?' for _ in latest_dates])
-            query = f"""
-            SELECT 
-                industry,
-                SUM(total_volume) as total_volume,
-                AVG(avg_pct_chg) as avg_pct_chg,
-                COUNT(DISTINCT trade_date) as days_count,
-                MAX(stock_count) as stock_count
-            FROM industry_stats 
-            WHERE trade_date IN ({placeholders})
-            GROUP BY industry
-            ORDER BY total_volume DESC
-            """
-            rows = conn.execute(query, latest_dates).fetchall()
+        """获取行业统计数据，按最近N天总成交量排序。
+        N 为预计算窗口（ROLLING_WINDOWS）时直接读 industry_stats_rolling 的最新一行；否则现场聚合 industry_stats。"""
+        with get_session() as conn:
+            rows = []
+            if int(days) in ROLLING_WINDOWS:
+                rows = conn.execute(
+                    """
+                    SELECT industry, total_volume, avg_pct_chg, days_count, stock_count, rising_count, falling_count
+                    FROM industry_stats_rolling
+                    WHERE window_days = ?
+                      AND trade_date = (SELECT MAX(trade_date) FROM industry_stats_rolling WHERE window_days = ?)
+                    ORDER BY total_volume DESC
+                    """,
+                    (int(days), int(days)),
+                ).fetchall()
+            if not rows:
+                rows = self._aggregate_latest(conn, days)
             return [
                 {
                     "id": row[0],
@@ -136,38 +536,117 @@ class IndustryRepository:
                     "total_volume": float(row[1]) if row[1] else 0,
                     "avg_pct_chg": float(row[2]) if row[2] else 0,
                     "days_count": row[3],
-                    "stock_count": row[4]
+                    "stock_count": row[4],
+                    "rising_count": int(row[5] or 0),
+                    "falling_count": int(row[6] or 0),
+                    # 上涨家数占涨跌家数之比（%）
+                    "breadth": round(row[5] / (row[5] + row[6]) * 100.0, 2) if (row[5] or 0) + (row[6] or 0) else None,
                 }
                 for row in rows
             ]
+
+    @staticmethod
+    def _aggregate_latest(conn, days: int) -> List[tuple]:
+        # 先获取最新的几个交易日
+        latest_dates_query = """
+        SELECT DISTINCT trade_date 
+        FROM industry_stats 
+        ORDER BY trade_date DESC 
+        LIMIT ?
+        """
+        latest_dates = [row[0] for row in conn.execute(latest_dates_query, (days,)).fetchall()]
+        
+        if not latest_dates:
+            return []
+        
+        # 使用IN查询而不是日期减法
+        placeholders = ','.join(['?' for _ in latest_dates])
+        query = f"""
+        SELECT 
+            industry,
+            SUM(total_volume) as total_volume,
+            AVG(avg_pct_chg) as avg_pct_chg,
+            COUNT(DISTINCT trade_date) as days_count,
+            MAX(stock_count) as stock_count,
+            SUM(rising_count) as rising_count,
+            SUM(falling_count) as falling_count
+        FROM industry_stats 
+        WHERE trade_date IN ({placeholders})
+        GROUP BY industry
+        ORDER BY total_volume DESC
+        """
+        return conn.execute(query, latest_dates).fetchall()
+
+    def refresh_rolling_stats(self, since: str | None = None, conn=None) -> int:
+        """按 industry_stats 重算 since（含）之后各交易日的滚动窗口聚合，since 为空时全量重建。
+        每个窗口一条窗口函数语句（按行业 ORDER BY trade_date 取前 N-1 行到当前行）；
+        industry_stats 每个交易日写入全部行业，因此与“最近 N 个交易日”口径一致。返回写入行数。"""
+        if conn is None:
+            with get_session() as c:
+                return self.refresh_rolling_stats(since, c)
+        lower = since
+        if since:
+            # 向前多取 max(N)-1 个交易日作为窗口的前置数据
+            prev = conn.execute(
+                "SELECT DISTINCT trade_date FROM industry_stats WHERE trade_date < ? ORDER BY trade_date DESC LIMIT ?",
+                (since, max(ROLLING_WINDOWS) - 1),
+            ).fetchall()
+            lower = prev[-1][0] if prev else since
+        before = conn.total_changes
+        for n in ROLLING_WINDOWS:
+            conn.execute(
+                f"""
+                INSERT OR REPLACE INTO industry_stats_rolling
+                (industry, trade_date, window_days, total_volume, avg_pct_chg, days_count, stock_count,
+                 rising_count, falling_count)
+                SELECT industry, trade_date, {int(n)}, total_volume, avg_pct_chg, days_count, stock_count,
+                       rising_count, falling_count
+                FROM (
+                    SELECT
+                        industry,
+                        trade_date,
+                        SUM(total_volume) OVER w AS total_volume,
+                        AVG(avg_pct_chg) OVER w AS avg_pct_chg,
+                        COUNT(*) OVER w AS days_count,
+                        MAX(stock_count) OVER w AS stock_count,
+                        SUM(rising_count) OVER w AS rising_count,
+                        SUM(falling_count) OVER w AS falling_count
+                    FROM industry_stats
+                    WHERE trade_date >= ?
+                    WINDOW w AS (PARTITION BY industry ORDER BY trade_date ROWS BETWEEN {int(n) - 1} PRECEDING AND CURRENT ROW)
+                )
+                WHERE trade_date >= ?
+                """,
+                (lower or "", since or ""),
+            )
+        return conn.total_changes - before
     
     def get_stocks_by_industry(self, industry: str, sort_by: str = "volume", limit: int = 100) -> List[dict]:
         """获取指定行业的股票列表，支持多种排序方式"""
         with get_session() as conn:
             # 构建排序字段
             order_field = {
-                "volume": "sds.volume DESC",
-                "amount": "sds.amount DESC", 
-                "pct_chg": "sds.pct_chg DESC",
-                "turnover_rate": "sds.turnover_rate DESC"
-            }.get(sort_by, "sds.volume DESC")
+                "volume": "dk.vol DESC",
+                "amount": "dk.amount DESC",
+                "pct_chg": "dk.pct_chg DESC",
+                "turnover_rate": "dk.turnover_rate DESC"
+            }.get(sort_by, "dk.vol DESC")
             
+            # 统计字段直接取自最新一根日K线（stock_daily_stats 为 daily_kline 上的视图）
             query = f"""
             SELECT 
                 si.ts_code,
                 si.name,
                 si.industry,
                 dk.close,
-                sds.volume,
-                sds.amount,
-                sds.pct_chg,
-                sds.turnover_rate,
-                sds.amplitude
+                dk.vol,
+                dk.amount,
+                dk.pct_chg,
+                dk.turnover_rate,
+                dk.amplitude
             FROM stock_info si
             LEFT JOIN daily_kline dk ON si.ts_code = dk.ts_code 
                 AND dk.trade_date = (SELECT MAX(trade_date) FROM daily_kline WHERE ts_code = si.ts_code)
-            LEFT JOIN stock_daily_stats sds ON si.ts_code = sds.ts_code 
-                AND sds.trade_date = (SELECT MAX(trade_date) FROM stock_daily_stats WHERE ts_code = si.ts_code)
             WHERE si.industry = ?
             ORDER BY {order_field}
             LIMIT ?
@@ -187,3 +666,60 @@ class IndustryRepository:
                 }
                 for row in rows
             ]
+
+    def index_codes(self, level: int | None = None, src: str | None = None) -> List[str]:
+        """已启用的行业指数代码，可按级别/来源筛选。"""
+        sql = "SELECT index_code FROM industry_index WHERE is_active=1"
+        args: list = []
+        if level is not None:
+            sql += " AND level=?"
+            args.append(int(level))
+        if src:
+            sql += " AND src=?"
+            args.append(src)
+        with get_session() as conn:
+            return [r[0] for r in conn.execute(sql + " ORDER BY index_code", args).fetchall()]
+
+    def index_names(self) -> Dict[str, str]:
+        """行业指数代码 -> 名称。"""
+        with get_session() as conn:
+            return dict(conn.execute("SELECT index_code, index_name FROM industry_index").fetchall())
+
+    def member_index_map(self) -> Dict[str, str]:
+        """成分股 -> 所属行业指数代码（键为无后缀代码；同时属于多级指数时取级别最高的一级行业）。"""
+        with get_session() as conn:
+            rows = conn.execute(
+                """
+                SELECT im.ts_code, im.index_code
+                FROM industry_members im
+                LEFT JOIN industry_index ii ON ii.index_code = im.index_code
+                ORDER BY COALESCE(ii.level, 1) DESC, im.index_code DESC
+                """
+            ).fetchall()
+        # 按级别倒序写入，最终保留 level 最小（一级行业）的映射
+        return {str(code).split('.')[0]: index_code for code, index_code in rows if code}
+
+    def index_bars(self, start: str, end: str, index_codes: Iterable[str] | None = None,
+                   fields: Iterable[str] = ("open", "close")) -> Dict[str, Any]:
+        """指数日线宽表：{字段: (trade_date × index_code) DataFrame}，数据来自 industry_index_daily。"""
+        import pandas as pd
+
+        fields = list(fields)
+        sql = f"SELECT index_code, trade_date, {', '.join(fields)} FROM industry_index_daily WHERE trade_date>=? AND trade_date<=?"
+        args: list = [start, end]
+        codes = list(index_codes) if index_codes is not None else None
+        if codes is not None:
+            if not codes:
+                return {f: pd.DataFrame() for f in fields}
+            sql += f" AND index_code IN ({','.join('?' for _ in codes)})"
+            args += codes
+        with get_session() as conn:
+            df = pd.read_sql_query(sql, conn, params=args)
+        if df.empty:
+            return {f: pd.DataFrame() for f in fields}
+        return {f: df.pivot_table(index="trade_date", columns="index_code", values=f, aggfunc="last").sort_index()
+                for f in fields}
+
+    def index_closes(self, start: str, end: str, index_codes: Iterable[str] | None = None):
+        """行业指数收盘价宽表 (trade_date × index_code)。"""
+        return self.index_bars(start, end, index_codes, ("close",))["close"]
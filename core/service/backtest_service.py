@@ -1,22 +1,245 @@
-from typing import Iterable, Dict, Any
+from typing import Iterable, Dict, Any, List
+
+from core.dao.repositories import IndustryRepository, StockRepository
+from core.service.price_service import PriceService
+from strategy.adjust import DEFAULT_ADJUST
+from strategy.cross_section import xs_specs
+
+
+def _load_benchmark(panel, spec: str | None, start: str, end: str):
+    """spec："industry"（每只股票对应其一级行业指数）或指数代码（统一基准，需已同步到 industry_index_daily）。"""
+    if not spec or spec == "market":
+        return None
+    from strategy.benchmark import Benchmark
+
+    repo = IndustryRepository()
+    if spec == "industry":
+        member_map = repo.member_index_map()
+        bars = repo.index_bars(start, end, sorted(set(member_map.values())))
+        return Benchmark.from_frames(panel, bars["close"], bars["open"], member_map=member_map)
+    bars = repo.index_bars(start, end, [spec])
+    return Benchmark.from_frames(panel, bars["close"], bars["open"], index_code=spec)
+
+
+def _grid_xs(base, grid) -> set:
+    """参数扫描中基准配置与各网格点用到的截面排名 (特征, 范围)。"""
+    from dataclasses import replace
+    from strategy.sweep import expand_grid
+
+    points = grid if isinstance(grid, list) else expand_grid(grid)
+    cfgs = [base] + [replace(base, **{k: v for k, v in p.items() if k.startswith("xs_")}) for p in points]
+    return xs_specs(cfgs)
 
 
 class BacktestService:
-    """回测服务(简版占位)
-    - 当前返回固定 summary 与空 signals
-    - 后续接入 core/backtest/engine 与真实策略
+    """回测服务
+    - run：面板化信号回测（逐信号统计）+ 组合级引擎（资金曲线/换手/仓位）+ 风险收益分析
+    - sweep/walk_forward：参数扫描与滚动优化
+    - run_incremental：结果持久化，重跑时只续算新交易日
+    - event_study/factor_ic：事件研究与连续因子 Rank IC 分析
+    面板统一经 PriceService 加载：价格按 cfg.adjust 复权（缺省前复权），同区间的重复回测复用缓存面板。
     """
-    def run(self, cfg: Dict[str, Any], start: str, end: str, codes: Iterable[str] | None = None, lookback: int = 60, forward_n: int = 5) -> Dict[str, Any]:
-        summary = {
+    def run(self, cfg: Dict[str, Any], start: str, end: str, codes: Iterable[str] | None = None, lookback: int = 60,
+            forward_n: int = 5, params: Dict[str, Any] | None = None, weights: Dict[str, float] | None = None,
+            engine: Dict[str, Any] | None = None, max_signals: int = 1000,
+            bootstrap: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """params：VectorBacktester.run 的其余参数（fee_single_side_bps/top_k_per_day/entry_mode/...），
+        其中 benchmark="industry" 或指数代码时信号明细附带同持有窗口的基准收益与超额收益；
+        engine：EngineConfig 字段（max_positions/sizing/initial_cash/...），持有期默认等于 forward_n；
+        bootstrap：{n_samples, block_days, seed}，给出时附带汇总指标的块自助法置信区间。
+        signals 只返回前 max_signals 条明细，汇总基于全部信号。"""
+        from dataclasses import fields as dc_fields
+        from core.backtest.engine import BacktestEngine, EngineConfig
+        from strategy.analytics import bootstrap_signals, nav_analytics, rolling_drawdown, signal_analytics
+        from strategy.limits import fill_masks, limit_up_mask
+        from strategy.selector import StrategyConfig
+        from strategy.vector_backtest import VectorBacktester
+
+        cfg_obj = StrategyConfig.from_dict(cfg)
+        params = dict(params or {})
+        bench_spec = params.pop("benchmark", None)
+        panel = PriceService().panel(start, end, codes, align="calendar", xs=xs_specs([cfg_obj]),
+                                     timeframe=cfg_obj.timeframe, adjust=cfg_obj.adjust)
+        if len(panel.index) == 0:
+            return {"summary": {"period": [start, end], "signals": 0}, "signals": [], "nav": []}
+        vbt = VectorBacktester(panel)
+        res = vbt.run(cfg_obj, lookback, forward_n, weights=weights,
+                      benchmark=_load_benchmark(panel, bench_spec, start, end), **params)
+
+        known = {f.name for f in dc_fields(EngineConfig)}
+        # 与逐信号统计保持同一套成交口径
+        eng_kwargs = {"hold_days": forward_n, "entry_mode": params.get("entry_mode", "close"),
+                      "exit_mode": params.get("exit_mode", "close"),
+                      "fee_single_side_bps": params.get("fee_single_side_bps", 3.0)}
+        eng_kwargs.update({k: v for k, v in (engine or {}).items() if k in known})
+        scores = vbt.signal_scores(cfg_obj, lookback, weights)
+        # 涨跌停成交约束：封板买不进、跌停卖不出（按 limit_status）
+        buyable, sellable = fill_masks(panel["limit_status"].to_numpy(), eng_kwargs["entry_mode"], eng_kwargs["exit_mode"])
+        if params.get("exclude_limit_up"):
+            buyable &= ~limit_up_mask(panel["limit_status"].to_numpy(), panel["pct_chg"].to_numpy(),
+                                      params.get("limit_up_threshold", 9.8))
+        port = BacktestEngine(EngineConfig(**eng_kwargs)).run(panel, scores, buyable=buyable, sellable=sellable)
+
+        summary = dict(res.summary)
+        summary["period"] = [start, end]
+        summary["portfolio"] = port.summary
+        analytics = {
+            "signals": signal_analytics(res.signals, forward_n, panel, StockRepository().info_map(), cache=vbt.cache),
+            "portfolio": nav_analytics(port.nav),
+        }
+        if bootstrap is not None:
+            analytics["bootstrap"] = bootstrap_signals(
+                res.signals, int(bootstrap.get("n_samples", 2000)),
+                int(bootstrap.get("block_days", forward_n)), bootstrap.get("seed"))
+        nav = port.nav.assign(drawdown=rolling_drawdown(port.nav["nav"]))
+        signals = res.signals.head(max_signals)
+        return {
+            "summary": summary,
+            "analytics": analytics,
+            "signals": signals.to_dict(orient="records"),
+            "nav": nav.round(6).to_dict(orient="records"),
+        }
+
+    def run_incremental(self, cfg: Dict[str, Any], start: str, end: str, codes: Iterable[str] | None = None,
+                        lookback: int = 60, forward_n: int = 5, params: Dict[str, Any] | None = None,
+                        weights: Dict[str, float] | None = None, force: bool = False,
+                        max_signals: int = 1000) -> Dict[str, Any]:
+        """按配置哈希续算已保存的回测；旧日期数据变化或 force=True 时全量重算。
+        signals 为本次新计算的信号（前 max_signals 条）。"""
+        from core.backtest.incremental import IncrementalBacktest
+        from strategy.selector import StrategyConfig
+
+        res = IncrementalBacktest().run(StrategyConfig.from_dict(cfg), start, end, codes, lookback, forward_n,
+                                        params=params, weights=weights, force=force)
+        signals = res["signals"].head(max_signals)
+        return {
+            "mode": res["mode"],
+            "run_id": res["run_id"],
+            "summary": res["summary"],
+            "signals": signals.to_dict(orient="records"),
+        }
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        from core.dao.repositories import BacktestRunRepository
+        return BacktestRunRepository().list_runs()
+
+    def sweep(self, cfg: Dict[str, Any], start: str, end: str, grid: Dict[str, List[Any]] | List[Dict[str, Any]],
+              codes: Iterable[str] | None = None, params: Dict[str, Any] | None = None,
+              weights: Dict[str, float] | None = None, processes: int | None = None,
+              early_stop: Dict[str, Any] | None = None, rank_by: str = "avg_ret_after_fee") -> Dict[str, Any]:
+        """参数扫描：一次加载 [start, end] 面板，按 grid 并行回测并返回排名表。"""
+        from strategy.selector import StrategyConfig
+        from strategy.sweep import EarlyStop, ParameterSweep
+
+        base = StrategyConfig.from_dict(cfg)
+        panel = PriceService().panel(start, end, codes, align="calendar", xs=_grid_xs(base, grid),
+                                     timeframe=base.timeframe, adjust=base.adjust)
+        sweeper = ParameterSweep(panel, base, params, weights)
+        table = sweeper.run(grid, processes=processes,
+                            early_stop=EarlyStop(**early_stop) if early_stop else None, rank_by=rank_by)
+        table = table.astype(object).where(table.notna(), None)
+        return {"period": [start, end], "points": len(table), "items": table.to_dict(orient="records")}
+
+    def walk_forward(self, cfg: Dict[str, Any], start: str, end: str, grid: Dict[str, List[Any]] | List[Dict[str, Any]],
+                     train_days: int, test_days: int, step_days: int | None = None, anchored: bool = False,
+                     codes: Iterable[str] | None = None, params: Dict[str, Any] | None = None,
+                     weights: Dict[str, float] | None = None, processes: int | None = 1,
+                     rank_by: str = "avg_ret_after_fee") -> Dict[str, Any]:
+        """滚动优化：训练窗寻优、测试窗检验，返回每折明细与样本外汇总。"""
+        from strategy.selector import StrategyConfig
+        from strategy.walk_forward import WalkForward
+
+        base = StrategyConfig.from_dict(cfg)
+        panel = PriceService().panel(start, end, codes, align="calendar", xs=_grid_xs(base, grid),
+                                     timeframe=base.timeframe, adjust=base.adjust)
+        res = WalkForward(panel, base, params, weights).run(
+            grid, train_days, test_days, step_days, anchored, rank_by=rank_by, processes=processes)
+        folds = res["folds"]
+        folds = folds.astype(object).where(folds.notna(), None)
+        return {"summary": res["summary"], "folds": folds.to_dict(orient="records")}
+
+    def event_study(self, start: str, end: str, cfg: Dict[str, Any] | None = None, patterns: List[str] | None = None,
+                    pattern_params: Dict[str, Any] | None = None, codes: Iterable[str] | None = None,
+                    lookback: int = 60, pre: int = 5, post: int = 20, benchmark: str | None = "industry") -> Dict[str, Any]:
+        """事件研究：事件为 patterns 中任一形态出现，或 cfg 全部规则通过（二者择一，patterns 优先）。
+        benchmark："industry"（industry_members/industry_index_daily）/ 指数代码 / "market"（等权市场），
+        无基准数据的股票退化为等权市场。"""
+        from strategy.event_study import EventStudy
+        from strategy.selector import StrategyConfig
+
+        cfg_obj = StrategyConfig.from_dict(cfg or {})
+        panel = PriceService().panel(start, end, codes, align="calendar", xs=None if patterns else xs_specs([cfg_obj]),
+                                     timeframe=cfg_obj.timeframe, adjust=cfg_obj.adjust)
+        if len(panel.index) == 0:
+            return {"summary": {"events": 0}, "curve": []}
+        study = EventStudy(panel)
+        if patterns:
+            events = study.events_from_patterns(patterns, pattern_params)
+        else:
+            events = study.events_from_config(cfg_obj, lookback)
+        bench = (_load_benchmark(panel, benchmark, start, end) or "market") if benchmark else None
+        res = study.run(events, pre, post, benchmark=bench)
+        curve = res.curve.reset_index()
+        curve = curve.astype(object).where(curve.notna(), None)
+        return {"period": [start, end], "summary": res.summary(), "curve": curve.to_dict(orient="records")}
+
+    def factor_ic(self, start: str, end: str, factors: Iterable[str] | None = None,
+                  horizons: Iterable[int] | None = None, quantiles: int = 5, quantile_horizon: int | None = None,
+                  codes: Iterable[str] | None = None, adjust: str = DEFAULT_ADJUST) -> Dict[str, Any]:
+        """因子 Rank IC 分析（见 strategy.factor_ic）：逐日 IC 汇总、IC 衰减与分组收益。
+        面板向前多加载因子预热所需的K线（按自然日估算），统计只覆盖 [start, end]。"""
+        from datetime import datetime, timedelta
+        from strategy.factor_ic import (DEFAULT_FACTORS, DEFAULT_IC_HORIZONS, FactorAnalyzer, factor_fields,
+                                        warmup_rows)
+
+        factors = list(factors or DEFAULT_FACTORS)
+        fields = factor_fields(factors)
+        warm = (datetime.strptime(start, "%Y%m%d") - timedelta(days=int(warmup_rows(factors) * 1.5) + 20)).strftime("%Y%m%d")
+        panel = PriceService().panel(warm, end, codes, align="calendar", fields=fields, adjust=adjust)
+        if len(panel.index) == 0:
+            return {"summary": [], "decay": [], "quantiles": [], "ic": []}
+        res = FactorAnalyzer(panel, start=start).run(factors, horizons or DEFAULT_IC_HORIZONS, quantiles, quantile_horizon)
+        decay = res.decay().reset_index()
+        ic = res.ic.round(4)
+        ic = ic.astype(object).where(ic.notna(), None).reset_index(names="trade_date")
+        summary = res.summary.astype(object).where(res.summary.notna(), None)
+        return {
             "period": [start, end],
-            "lookback_days": lookback,
-            "forward_n": forward_n,
-            "win_rate": 0.0,
-            "avg_ret": 0.0,
-            "avg_ret_after_fee": 0.0,
-            "median_ret": 0.0,
-            "mdd": 0.0,
-            "signals": 0,
+            "horizon": res.horizon,
+            "summary": summary.to_dict(orient="records"),
+            "decay": decay.astype(object).where(decay.notna(), None).to_dict(orient="records"),
+            "quantiles": res.quantiles.astype(object).where(res.quantiles.notna(), None).to_dict(orient="records"),
+            "ic": ic.to_dict(orient="records"),
+        }
+
+    def rotation(self, cfg: Dict[str, Any], start: str, end: str, level: int | None = 1,
+                 max_holdings: int = 200) -> Dict[str, Any]:
+        """行业轮动回测：cfg 为 RotationConfig 字段；level 选择参与轮动的行业指数级别（None 为全部）。
+        因子预热所需的历史从 start 之前的指数日线中取。"""
+        from core.backtest.rotation import RotationConfig, SectorRotation
+
+        rcfg = RotationConfig.from_dict(cfg)
+        repo = IndustryRepository()
+        codes = repo.index_codes(level)
+        bars = repo.index_bars("00000000", end, codes, ("close", "vol"))
+        close = bars["close"]
+        if close.empty:
+            return {"summary": {"days": 0, "rebalances": 0}, "nav": [], "holdings": []}
+        need = int(rcfg.lookback) * 4 + int(rcfg.skip) + int(rcfg.signal_lag) + 1
+        pos = int(close.index.searchsorted(start))
+        close = close.iloc[max(pos - need, 0):]
+        vol = bars["vol"].reindex(index=close.index, columns=close.columns) if not bars["vol"].empty else None
+        stock_close, member_map = None, None
+        if rcfg.hold == "stocks":
+            member_map = repo.member_index_map()
+            panel = PriceService().panel(str(close.index[0]), end, align="calendar", fields=["close"])
+            stock_close = panel["close"]
+        res = SectorRotation(rcfg).run(close, vol, start, stock_close, member_map)
+        holdings = res.holdings
+        if rcfg.hold != "stocks":
+            holdings = holdings.assign(name=holdings["code"].map(repo.index_names()))
+        return {
+            "summary": {"period": [start, end], **res.summary},
+            "nav": res.nav.round(6).to_dict(orient="records"),
+            "holdings": holdings.tail(max_holdings).round(6).to_dict(orient="records"),
         }
-        signals = []
-        return {"summary": summary, "signals": signals}
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from core.dao.repositories import KlineRepository
+from infrastructure.db.engine import get_session
+from strategy.correlation import CORR_BLOCK, CorrelationMatrix
+
+# 默认相关性窗口（交易日）
+DEFAULT_CORR_WINDOW = 60
+
+
+class CorrelationService:
+    """滚动收益相关矩阵服务：
+    - matrix：全市场（或给定代码）截至 end 的 window 日收益相关矩阵，按列分块计算（见 strategy.correlation）
+    - most_correlated / clusters：相关性最高的股票查询与收益共振聚类
+    矩阵按 (窗口截止日, 窗口, 代码集合, min_obs) 做进程级缓存，daily_kline 有新写入或原地回填（KlineRepository.data_version 变化）时失效。
+    全市场 5000 只的 float32 矩阵约 100MB，缓存只保留最近 MAX_CACHED 个。
+    """
+    MAX_CACHED = 2
+    _cache: "OrderedDict[Tuple, Tuple[Tuple[int, int], CorrelationMatrix]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, kline_repo: KlineRepository | None = None):
+        self.kline_repo = kline_repo or KlineRepository()
+
+    def matrix(self, end: str | None = None, window: int = DEFAULT_CORR_WINDOW,
+               codes: Iterable[str] | None = None, min_obs: int | None = None) -> CorrelationMatrix:
+        from strategy.panel import load_panel
+
+        window = max(int(window), 2)
+        codes_key = tuple(sorted(codes)) if codes else None
+        version = self.kline_repo.data_version()
+        with get_session() as conn:
+            if not end:
+                end = conn.execute("SELECT MAX(trade_date) FROM daily_kline").fetchone()[0] or ""
+            key = (end, window, codes_key, min_obs)
+            with self._lock:
+                hit = self._cache.get(key)
+                if hit is not None and hit[0] == version:
+                    self._cache.move_to_end(key)
+                    return hit[1]
+            # 按自然日估算向前加载 window+1 个交易日（首日只作为收益基准）
+            fmt = "%Y%m%d"
+            start = (datetime.strptime(end, fmt) - timedelta(days=int(window * 1.5) + 20)).strftime(fmt)
+            # 收益只依赖相邻收盘价之比，后复权即可消除除权缺口，无需前复权基准
+            panel = load_panel(conn, start, end, list(codes_key) if codes_key else None, fields=["close"], adjust="hfq")
+        result = CorrelationMatrix.from_panel(panel, window, min_obs, CORR_BLOCK)
+        with self._lock:
+            self._cache[key] = (version, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.MAX_CACHED:
+                self._cache.popitem(last=False)
+        return result
+
+    def most_correlated(self, code: str, end: str | None = None, window: int = DEFAULT_CORR_WINDOW,
+                        k: int = 10, ascending: bool = False) -> Dict[str, Any]:
+        cm = self.matrix(end, window)
+        return {"ts_code": code, "end_date": cm.end_date, "window": cm.window,
+                "items": cm.most_correlated(code, k, ascending)}
+
+    def clusters(self, end: str | None = None, window: int = DEFAULT_CORR_WINDOW, n_clusters: int = 20,
+                 codes: Iterable[str] | None = None) -> Dict[str, Any]:
+        """返回各簇成员（按簇大小降序）。"""
+        cm = self.matrix(end, window, codes)
+        labels = cm.clusters(n_clusters)
+        groups: List[Dict[str, Any]] = []
+        for cid, members in labels.groupby(labels, sort=True):
+            groups.append({"cluster": int(cid), "size": int(len(members)), "codes": [str(c) for c in members.index]})
+        return {"end_date": cm.end_date, "window": cm.window, "codes": int(len(cm.codes)), "clusters": groups}
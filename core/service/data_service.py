@@ -1,6 +1,7 @@
-from typing import Iterable
+from typing import Dict, Iterable, List
 import pandas as pd
-from core.dao.repositories import StockRepository
+from core.dao.repositories import (CrossSectionRepository, IndustryRepository, KlineRepository,
+                                  MarketSnapshotRepository, StockRepository, TimeframeRepository)
 from data.fetcher import DataFetcher
 
 
@@ -32,66 +33,110 @@ class DataService:
         return 0
     
     def calculate_industry_stats(self, trade_date: str) -> int:
-        """计算指定日期的行业统计数据"""
+        """计算指定日期的行业统计数据（总是重算），返回写入的行业数"""
         from infrastructure.db.engine import get_session
-        
+
         with get_session() as conn:
-            # 获取所有行业
-            industries = conn.execute("SELECT DISTINCT industry FROM stock_info WHERE industry IS NOT NULL AND industry != ''").fetchall()
-            
-            count = 0
-            for (industry,) in industries:
-                # 计算该行业当日的统计数据
-                stats_query = """
-                SELECT 
-                    COUNT(*) as stock_count,
-                    SUM(dk.vol) as total_volume,
-                    AVG(dk.vol) as avg_volume,
-                    SUM(dk.amount) as total_amount,
-                    AVG(dk.amount) as avg_amount,
-                    AVG(dk.pct_chg) as avg_pct_chg,
-                    MAX(dk.pct_chg) as max_pct_chg,
-                    MIN(dk.pct_chg) as min_pct_chg,
-                    SUM(CASE WHEN dk.pct_chg > 0 THEN 1 ELSE 0 END) as rising_count,
-                    SUM(CASE WHEN dk.pct_chg < 0 THEN 1 ELSE 0 END) as falling_count
+            count = self._industry_stats_for_dates(conn, [trade_date])
+            IndustryRepository().refresh_rolling_stats(trade_date, conn)
+            return count
+
+    def calculate_industry_stats_range(self, start: str, end: str, force: bool = False,
+                                       chunk_days: int = 20) -> Dict[str, int]:
+        """计算 [start, end] 内每个交易日的行业统计。
+        - 每批 chunk_days 个交易日一条 INSERT ... SELECT ... GROUP BY industry, trade_date，每批单独提交
+        - 已有统计的日期默认跳过，force=True 时重算
+        - 完成后刷新 industry_stats_rolling"""
+        from infrastructure.db.engine import get_session
+
+        dates = KlineRepository().trade_dates(start, end)
+        done: set = set()
+        if not force:
+            with get_session() as conn:
+                done = {r[0] for r in conn.execute(
+                    "SELECT DISTINCT trade_date FROM industry_stats WHERE trade_date>=? AND trade_date<=?", (start, end))}
+        todo = [d for d in dates if d not in done]
+        rows = 0
+        step = max(int(chunk_days), 1)
+        for i in range(0, len(todo), step):
+            with get_session() as conn:
+                rows += self._industry_stats_for_dates(conn, todo[i:i + step])
+        if todo:
+            # 重算日期之后的滚动窗口都可能受影响，从最早的重算日起刷新
+            IndustryRepository().refresh_rolling_stats(todo[0])
+        return {"dates": len(dates), "computed": len(todo), "skipped": len(dates) - len(todo), "rows": rows}
+
+    def calculate_market_snapshot(self, start: str, end: str | None = None) -> int:
+        """计算 [start, end]（end 为空时同 start）各交易日的市场宽度与异动快照，返回写入的交易日数"""
+        return MarketSnapshotRepository().refresh(start, end or start)
+
+    def calculate_xs_ranks(self, start: str, end: str | None = None, features: Iterable[str] | None = None) -> int:
+        """计算 [start, end] 各交易日的截面排名特征（features 缺省见 strategy.cross_section.DEFAULT_XS_FEATURES），
+        返回写入行数"""
+        return CrossSectionRepository().refresh(start, end or start, features)
+
+    def calculate_timeframe_bars(self, start: str | None = None, end: str | None = None,
+                                 timeframes: Iterable[str] | None = None) -> int:
+        """重算覆盖 [start, end] 的周/月K线（从 start 所在周期起，start 为空时全量重建），返回写入行数"""
+        return TimeframeRepository().refresh(start, end, timeframes)
+
+    @staticmethod
+    def _industry_stats_for_dates(conn, dates: List[str]) -> int:
+        """一条语句写入多个日期的全部行业统计，口径与逐行业版本一致
+        （stock_count 为行业内股票总数，当日无K线的行业也写入一行，聚合值为空）。
+        每只股票按 (ts_code, trade_date) 索引对整批日期做一次区间查找，再按 (行业, 日期) 分组。"""
+        if not dates:
+            return 0
+        dates = sorted(dates)
+        values = ",".join("(?)" for _ in dates)
+        before = conn.total_changes
+        conn.execute(f"""
+            WITH d(trade_date) AS (VALUES {values}),
+            ind AS (
+                SELECT industry, COUNT(*) AS stock_count
+                FROM stock_info
+                WHERE industry IS NOT NULL AND industry != ''
+                GROUP BY industry
+            ),
+            agg AS (
+                SELECT
+                    si.industry,
+                    dk.trade_date,
+                    SUM(dk.vol) AS total_volume,
+                    AVG(dk.vol) AS avg_volume,
+                    SUM(dk.amount) AS total_amount,
+                    AVG(dk.amount) AS avg_amount,
+                    AVG(dk.pct_chg) AS avg_pct_chg,
+                    MAX(dk.pct_chg) AS max_pct_chg,
+                    MIN(dk.pct_chg) AS min_pct_chg,
+                    SUM(CASE WHEN dk.pct_chg > 0 THEN 1 ELSE 0 END) AS rising_count,
+                    SUM(CASE WHEN dk.pct_chg < 0 THEN 1 ELSE 0 END) AS falling_count
                 FROM stock_info si
-                LEFT JOIN daily_kline dk ON si.ts_code = dk.ts_code AND dk.trade_date = ?
-                WHERE si.industry = ?
-                """
-                result = conn.execute(stats_query, (trade_date, industry)).fetchone()
-                
-                if result and result[0] > 0:  # 有数据
-                    conn.execute("""
-                        INSERT OR REPLACE INTO industry_stats 
-                        (industry, trade_date, total_volume, avg_volume, total_amount, avg_amount, 
-                         avg_pct_chg, max_pct_chg, min_pct_chg, stock_count, rising_count, falling_count)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        industry, trade_date, result[1], result[2], result[3], result[4],
-                        result[5], result[6], result[7], result[0], result[8], result[9]
-                    ))
-                    count += 1
-        return count
-    
+                CROSS JOIN daily_kline dk ON dk.ts_code = si.ts_code AND dk.trade_date >= ? AND dk.trade_date <= ?
+                WHERE si.industry IS NOT NULL AND si.industry != ''
+                  AND dk.trade_date IN (SELECT trade_date FROM d)
+                GROUP BY si.industry, dk.trade_date
+            )
+            INSERT OR REPLACE INTO industry_stats
+            (industry, trade_date, total_volume, avg_volume, total_amount, avg_amount,
+             avg_pct_chg, max_pct_chg, min_pct_chg, stock_count, rising_count, falling_count)
+            SELECT
+                ind.industry, d.trade_date,
+                agg.total_volume, agg.avg_volume, agg.total_amount, agg.avg_amount,
+                agg.avg_pct_chg, agg.max_pct_chg, agg.min_pct_chg,
+                ind.stock_count, COALESCE(agg.rising_count, 0), COALESCE(agg.falling_count, 0)
+            FROM d
+            CROSS JOIN ind
+            LEFT JOIN agg ON agg.industry = ind.industry AND agg.trade_date = d.trade_date
+        """, [*dates, dates[0], dates[-1]])
+        # 以 WITH 开头的语句 cursor.rowcount 恒为 -1，改用连接的累计变更数
+        return conn.total_changes - before
+
     def calculate_stock_daily_stats(self, trade_date: str) -> int:
-        """计算指定日期的股票日统计数据"""
+        """股票日统计已由 stock_daily_stats 视图直接读取 daily_kline，无需复制；
+        保留接口，返回该日可用的股票数"""
         from infrastructure.db.engine import get_session
-        
+
         with get_session() as conn:
-            # 获取当日所有股票数据
-            query = """
-            SELECT ts_code, vol, amount, pct_chg, turnover_rate, amplitude
-            FROM daily_kline 
-            WHERE trade_date = ?
-            """
-            rows = conn.execute(query, (trade_date,)).fetchall()
-            
-            count = 0
-            for row in rows:
-                conn.execute("""
-                    INSERT OR REPLACE INTO stock_daily_stats 
-                    (ts_code, trade_date, volume, amount, pct_chg, turnover_rate, amplitude)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (row[0], trade_date, row[1], row[2], row[3], row[4], row[5]))
-                count += 1
-        return count
+            row = conn.execute("SELECT COUNT(*) FROM daily_kline WHERE trade_date = ?", (trade_date,)).fetchone()
+            return int(row[0] or 0)
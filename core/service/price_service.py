@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from core.dao.repositories import CrossSectionRepository, KlineRepository
+from infrastructure.db.engine import get_session
+from strategy.adjust import DEFAULT_ADJUST, adjust_bars, normalize_adjust
+from strategy.panel import PANEL_FIELDS, Panel
+from strategy.timeframe import kline_table
+
+
+class PriceService:
+    """复权价格服务：库中只存原始价格与 adj_factor（见 strategy.adjust），复权价按需计算。
+    - panel：宽表面板（选股/回测/因子分析），价格字段为 raw / qfq / hfq
+    - bars：单只股票的K线序列（图表）
+    面板按 (区间, 代码集合, 字段, 对齐, 周期, 复权方式) 做进程级缓存，daily_kline 有新写入或被回填工具原地更新
+    （KlineRepository.data_version 变化，含新的复权因子）时失效；前复权基准（各股最新因子）同样按该版本缓存。
+    全市场多年的面板可达数百 MB，只缓存单元格数不超过 MAX_CACHED_CELLS 的最近 MAX_CACHED 个。
+    """
+    MAX_CACHED = 2
+    MAX_CACHED_CELLS = 20_000_000
+    _cache: "OrderedDict[Tuple, Tuple[Tuple[int, int], Panel]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, kline_repo: KlineRepository | None = None):
+        self.kline_repo = kline_repo or KlineRepository()
+
+    def panel(self, start: str, end: str, codes: Iterable[str] | None = None, align: str = "calendar",
+              xs: Iterable[tuple] | None = None, fields: Iterable[str] | None = None, timeframe: str = "daily",
+              adjust: str = DEFAULT_ADJUST) -> Panel:
+        """返回的面板是缓存的浅拷贝：xs 截面排名字段附加在拷贝上，调用方增删字段不影响缓存。"""
+        fields = list(fields or PANEL_FIELDS)
+        adjust = normalize_adjust(adjust)
+        codes = sorted(codes) if codes else None
+        key = (start, end, tuple(codes) if codes else None, tuple(fields), align, timeframe, adjust)
+        version = self.kline_repo.data_version()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] == version:
+                self._cache.move_to_end(key)
+                base = hit[1]
+            else:
+                base = None
+        if base is None:
+            base = self.kline_repo.get_panel(start, end, codes, align=align,
+                                             fields=fields, timeframe=timeframe, adjust=adjust)
+            if len(base.index) * len(base.codes) * len(fields) <= self.MAX_CACHED_CELLS:
+                with self._lock:
+                    self._cache[key] = (version, base)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.MAX_CACHED:
+                        self._cache.popitem(last=False)
+        panel = Panel(fields=dict(base.fields), align=base.align, last_dates=base.last_dates)
+        if xs:
+            CrossSectionRepository().attach(panel, xs)
+        return panel
+
+    def bars(self, ts_code: str, start: str, end: str, adjust: str = DEFAULT_ADJUST,
+             timeframe: str = "daily") -> List[Dict[str, Any]]:
+        """单只股票 [start, end] 的K线（trade_date/OHLC/vol/amount/pct_chg/adj_factor），价格按 adjust 复权。"""
+        adjust = normalize_adjust(adjust)
+        with get_session() as conn:
+            df = pd.read_sql_query(
+                f"SELECT trade_date, open, high, low, close, pre_close, vol, amount, pct_chg, adj_factor "
+                f"FROM {kline_table(timeframe)} WHERE ts_code=? AND trade_date>=? AND trade_date<=? ORDER BY trade_date",
+                conn, params=(ts_code, start, end)
+            )
+        latest = self.kline_repo.latest_factors().get(ts_code) if adjust == "qfq" else None
+        df = adjust_bars(df, adjust, latest)
+        return df.astype(object).where(df.notna(), None).to_dict(orient="records")
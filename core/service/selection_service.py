@@ -1,27 +1,154 @@
-from typing import Iterable, List, Dict
+import time
+from dataclasses import asdict
+from typing import Any, Iterable, Iterator, List, Dict
+
+import numpy as np
+
 from core.dao.repositories import StockRepository, KlineRepository
+from strategy.adjust import normalize_adjust
+from strategy.cross_section import xs_specs
+from strategy.selector import StrategyConfig
+from strategy.scoring import diversified_top_k, score_checks, top_k_indices
 
 
 class SelectionService:
-    """选股服务(最小可运行占位)：
-    - 当前不应用任何复杂策略，仅返回存在K线数据的股票与最新收盘价(若有)
+    """选股服务：
+    - select/iter_select：单配置选股，先 SQL 预筛，再按代码分块加载面板向量化评估，边算边产出
+    - select_many：多配置批量选股，共享一次数据加载与指标中间结果
+    评分与 Top-K 统一走 strategy.scoring（weights 缺省取 DEFAULT_WEIGHTS）。
+    max_corr 给定时 Top-K 加分散约束：与已选股票 corr_window 日收益相关系数超过 max_corr 的跳过（见 CorrelationService）。
     """
+    # 首块较小以尽快返回首批结果，后续块增大以摊薄查询开销
+    FIRST_CHUNK = 200
+    CHUNK = 800
+
     def __init__(self, stock_repo: StockRepository | None = None, kline_repo: KlineRepository | None = None):
         self.stock_repo = stock_repo or StockRepository()
         self.kline_repo = kline_repo or KlineRepository()
 
-    def select(self, cfg: Dict, start: str, end: str, codes: Iterable[str] | None = None) -> List[Dict]:
-        codes_list = list(codes) if codes else self.stock_repo.get_all_codes()
-        latest_map = self.kline_repo.latest_close_map()
+    def iter_select(self, cfg: Dict[str, Any] | StrategyConfig, start: str, end: str,
+                    codes: Iterable[str] | None = None,
+                    weights: Dict[str, float] | None = None) -> Iterator[Dict[str, Any]]:
+        """流式选股：逐块评估并立即产出通过的股票条目。"""
+        from strategy.panel import IndicatorCache
+        from strategy.bulk import BulkEvaluator
+
+        cfg = StrategyConfig.from_dict(cfg)
+        universe = list(codes) if codes else self.kline_repo.codes_between(start, end)
+        survivors = self.kline_repo.prefilter(cfg, start, end, universe)
+        if survivors is not None:
+            universe = [c for c in universe if c in survivors]
+        info_map = self.stock_repo.info_map()
+        xs = xs_specs([cfg])
+
+        pos, size = 0, self.FIRST_CHUNK
+        while pos < len(universe):
+            chunk = universe[pos:pos + size]
+            pos += size
+            size = self.CHUNK
+            panel = self.kline_repo.get_panel(start, end, chunk, align="bars", xs=xs, timeframe=cfg.timeframe,
+                                              adjust=cfg.adjust)
+            if len(panel.index) == 0:
+                continue
+            checks = BulkEvaluator(IndicatorCache(panel)).checks_at(cfg)
+            last_close = panel["close"].iloc[-1]
+            passed = checks[checks["pass"]]
+            yield from self._build_items(passed, last_close, info_map, score_checks(passed, cfg, weights, 3))
+
+    def select(self, cfg: Dict, start: str, end: str, codes: Iterable[str] | None = None,
+               weights: Dict[str, float] | None = None, top_k: int = 0,
+               max_corr: float | None = None, corr_window: int | None = None) -> List[Dict]:
+        """top_k>0 时按评分取前 K 只（降序）。"""
+        items = list(self.iter_select(cfg, start, end, codes, weights))
+        return self._top_k(items, top_k, self._corr(end, max_corr, corr_window), max_corr)
+
+    def select_many(self, configs: Iterable[Dict[str, Any] | StrategyConfig], start: str, end: str,
+                    codes: Iterable[str] | None = None, weights: Dict[str, float] | None = None,
+                    top_k: int = 0, max_corr: float | None = None,
+                    corr_window: int | None = None) -> Dict[str, Any]:
+        """批量选股：每个 (K线周期, 复权方式) 加载一次面板，其下的多个配置共享同一份指标中间结果。
+        返回 {"results": [每个配置的结果], "timing": {...}}。
+        """
+        from strategy.panel import IndicatorCache
+        from strategy.bulk import BulkEvaluator
+
+        t_all = time.perf_counter()
+        cfg_list = [StrategyConfig.from_dict(c) for c in configs]
+        t0 = time.perf_counter()
+        evaluators: Dict[tuple, BulkEvaluator] = {}
+        for tf, adjust in dict.fromkeys((c.timeframe, normalize_adjust(c.adjust)) for c in cfg_list):
+            group = [c for c in cfg_list if (c.timeframe, normalize_adjust(c.adjust)) == (tf, adjust)]
+            panel = self.kline_repo.get_panel(start, end, list(codes) if codes else None, align="bars",
+                                              xs=xs_specs(group), timeframe=tf, adjust=adjust)
+            evaluators[(tf, adjust)] = BulkEvaluator(IndicatorCache(panel))
+        load_ms = (time.perf_counter() - t0) * 1000.0
         info_map = self.stock_repo.info_map()
-        result: List[Dict] = []
-        for code in codes_list:
-            result.append({
-                "ts_code": code,
-                "name": info_map.get(code, {}).get("name"),
-                "industry": info_map.get(code, {}).get("industry"),
-                "close": latest_map.get(code),
-                "score": 0.0,       # TODO: 策略评分
-                "passed": True      # TODO: 策略判断
+
+        corr = self._corr(end, max_corr, corr_window)
+        results: List[Dict[str, Any]] = []
+        for i, cfg in enumerate(cfg_list):
+            t_cfg = time.perf_counter()
+            evaluator = evaluators[(cfg.timeframe, normalize_adjust(cfg.adjust))]
+            panel = evaluator.cache.panel
+            last_close = panel["close"].iloc[-1] if len(panel.index) else None
+            checks = evaluator.checks_at(cfg)
+            passed = checks[checks["pass"]]
+            items = self._build_items(passed, last_close, info_map, score_checks(passed, cfg, weights, 3))
+            items = self._top_k(items, top_k, corr, max_corr)
+            results.append({
+                "index": i,
+                "cfg": asdict(cfg),
+                "items": items,
+                "total": len(items),
+                "elapsed_ms": round((time.perf_counter() - t_cfg) * 1000.0, 2),
+            })
+        timing = {
+            "load_ms": round(load_ms, 2),
+            "total_ms": round((time.perf_counter() - t_all) * 1000.0, 2),
+            "codes": max((int(len(e.cache.panel.codes)) for e in evaluators.values()), default=0),
+            "configs": len(cfg_list),
+            # 单一面板时为其缓存统计，多个 (周期, 复权) 面板时按 "周期/复权" 分别给出
+            "indicator_cache": (next(iter(evaluators.values())).cache.stats() if len(evaluators) == 1
+                                else {f"{tf}/{adj}": e.cache.stats() for (tf, adj), e in evaluators.items()}),
+        }
+        return {"results": results, "timing": timing}
+
+    @staticmethod
+    def _corr(end: str, max_corr: float | None, window: int | None):
+        """分散约束用的全市场相关矩阵（进程级缓存），未设置 max_corr 时为 None。"""
+        if max_corr is None:
+            return None
+        from core.service.correlation_service import CorrelationService, DEFAULT_CORR_WINDOW
+        return CorrelationService().matrix(end, int(window or DEFAULT_CORR_WINDOW))
+
+    @staticmethod
+    def _top_k(items: List[Dict[str, Any]], k: int, corr=None, max_corr: float | None = None) -> List[Dict[str, Any]]:
+        scores = np.array([it["score"] for it in items], dtype=float)
+        if corr is not None and max_corr is not None:
+            sub = corr.sub_matrix([it["ts_code"] for it in items])
+            return [items[i] for i in diversified_top_k(scores, sub, k or 0, float(max_corr))]
+        if not k or k <= 0:
+            return items
+        idx = top_k_indices(scores, k)
+        return [items[i] for i in idx]
+
+    @staticmethod
+    def _build_items(passed, last_close, info_map: Dict[str, Dict[str, str]], scores=None) -> List[Dict[str, Any]]:
+        """把通过的检查矩阵（index=代码）转换为接口返回的条目列表。"""
+        rule_records = passed.drop(columns="pass").astype(bool).to_dict(orient="records")
+        closes = last_close.reindex(passed.index).tolist() if last_close is not None else [None] * len(passed)
+        score_list = scores.reindex(passed.index).tolist() if scores is not None else [0.0] * len(passed)
+        items = []
+        for code, close, score, checks in zip(passed.index, closes, score_list, rule_records):
+            code_no = code.split('.')[0] if code else code
+            info = info_map.get(code_no, {})
+            items.append({
+                "ts_code": code_no,
+                "name": info.get("name"),
+                "industry": info.get("industry"),
+                "close": float(close) if close is not None and close == close else None,
+                "score": float(score),
+                "passed": True,
+                "checks": checks,
             })
-        return result
+        return items
@@ -0,0 +1,94 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+
+from core.dao.repositories import KlineRepository
+from infrastructure.db.engine import get_session
+from strategy.similarity import DEFAULT_HORIZONS, ShapeIndex, znorm
+
+# 默认检索的历史年数与形态窗口（K线根数）
+DEFAULT_YEARS = 10
+DEFAULT_SHAPE_WINDOW = 60
+
+
+class SimilarityService:
+    """历史形态相似检索：
+    - 以某只股票截至 end 的最近 window 根K线（或直接给定的序列）为查询，z 标准化收盘价（可选叠加成交量）
+    - 在全市场近 years 年的所有代码、所有结束日上找相关系数最高的形态，并附带匹配之后的远期收益
+    索引（见 strategy.similarity.ShapeIndex）按年数做进程级缓存，daily_kline 有新写入或原地回填（KlineRepository.data_version 变化）时重建；
+    首次查询需要加载全部K线，之后每次查询只做一轮 FFT。
+    """
+    _cache: Dict[int, tuple] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, kline_repo: KlineRepository | None = None):
+        self.kline_repo = kline_repo or KlineRepository()
+
+    def index(self, years: int = DEFAULT_YEARS) -> ShapeIndex:
+        version = self.kline_repo.data_version()
+        with self._lock:
+            hit = self._cache.get(years)
+            if hit is not None and hit[0] == version:
+                return hit[1]
+            with get_session() as conn:
+                end = conn.execute("SELECT MAX(trade_date) FROM daily_kline").fetchone()[0]
+                start = (datetime.strptime(end, "%Y%m%d") - timedelta(days=int(365.25 * years))).strftime("%Y%m%d") if end else ""
+                df = pd.read_sql_query(
+                    "SELECT ts_code, trade_date, close, vol, adj_factor FROM daily_kline "
+                    "WHERE trade_date>=? AND trade_date<=? AND close IS NOT NULL ORDER BY ts_code, trade_date",
+                    conn, params=[start, end or ""]
+                )
+            # 形态与远期收益只依赖价格比值：按后复权消除除权缺口（缺失因子按同股最近的已知因子补齐，见 strategy.adjust）
+            factor = df.groupby("ts_code")["adj_factor"].bfill().groupby(df["ts_code"]).ffill()
+            df["close"] = df["close"] * factor.fillna(1.0)
+            idx = ShapeIndex.from_frame(df)
+            # 只保留最近一份索引：全市场 10 年约 1200 万根K线
+            self._cache.clear()
+            self._cache[years] = (version, idx)
+            return idx
+
+    def search(self, code: str | None = None, end: str | None = None, values: List[float] | None = None,
+               volumes: List[float] | None = None, window: int = DEFAULT_SHAPE_WINDOW, use_volume: bool = False,
+               vol_weight: float = 0.5, k: int = 20, per_code: int = 1, since: str | None = None,
+               until: str | None = None, codes: Iterable[str] | None = None, years: int = DEFAULT_YEARS,
+               horizons: Iterable[int] = DEFAULT_HORIZONS) -> Dict[str, Any]:
+        """code 与 values 二选一作为查询。查询某只股票自身的历史相似时传 codes=[code] 并调大 per_code。"""
+        t0 = time.perf_counter()
+        idx = self.index(years)
+        exclude = None
+        query: Dict[str, Any] = {}
+        if values:
+            queries = {"close": znorm(values)}
+            if use_volume and volumes:
+                queries["vol"] = znorm(volumes)
+            query["window"] = len(values)
+        elif code:
+            ci, pos = idx.position(code, int(end) if end else None)
+            window = int(window)
+            queries = {"close": znorm(idx.window("close", ci, pos, window))}
+            if use_volume:
+                queries["vol"] = znorm(idx.window("vol", ci, pos, window))
+            exclude = (ci, pos)
+            query.update({"ts_code": str(idx.codes[ci]), "window": window,
+                          "start_date": str(idx.dates[idx.offsets[ci] + pos - window + 1]),
+                          "end_date": str(idx.dates[idx.offsets[ci] + pos])})
+        else:
+            raise ValueError("需要提供 code 或 values")
+        horizons = [int(h) for h in horizons]
+        df = idx.search(queries, {"close": 1.0, "vol": float(vol_weight)}, k, per_code,
+                        int(since) if since else None, int(until) if until else None, codes, exclude, horizons)
+        summary = {}
+        for h in horizons:
+            r = df[f"fwd_ret_{h}"].dropna().astype(float)
+            summary[f"fwd_ret_{h}"] = {
+                "count": int(len(r)),
+                "mean": round(float(r.mean()), 3) if len(r) else None,
+                "median": round(float(r.median()), 3) if len(r) else None,
+                "win_rate": round(float((r > 0).mean()), 4) if len(r) else None,
+            }
+        items = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+        return {"query": query, "items": items, "total": len(items), "summary": summary,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 2)}
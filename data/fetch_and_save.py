@@ -7,16 +7,18 @@ import os
 import sys
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 import pandas as pd
 import toml
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from core.dao.repositories import CrossSectionRepository, MarketSnapshotRepository, TimeframeRepository
 from db.database import Database
 from data.fetcher import DataFetcher
 from data.save_data import DataSaver
+from strategy.cross_section import DEFAULT_XS_FEATURES
 
 
 @dataclass
@@ -28,6 +30,8 @@ class IngestOptions:
     use_batch_daily: bool = True
     daily_start_date: str = "20200101"
     rate_limit_per_min: int = 180
+    # 入库后计算截面排名的特征（见 strategy.cross_section）
+    xs_rank_features: Tuple[str, ...] = DEFAULT_XS_FEATURES
 
     @classmethod
     def load(cls, cfg_path: str) -> "IngestOptions":
@@ -54,6 +58,7 @@ class IngestOptions:
 
         daily_start = str(ingest.get("stocks_daily_start", "20200101"))
         rate_limit = int(ingest.get("rate_limit_per_min", 180))
+        xs_features = tuple(ingest.get("xs_rank_features", DEFAULT_XS_FEATURES))
 
         return cls(
             fetch_stock_list=_bool("stock_list", True),
@@ -61,6 +66,7 @@ class IngestOptions:
             use_batch_daily=_bool("stocks_daily_batch", True),
             daily_start_date=daily_start,
             rate_limit_per_min=rate_limit,
+            xs_rank_features=xs_features,
         )
 
 
@@ -149,6 +155,39 @@ def update_daily_incremental(db: Database, fetcher: DataFetcher, saver: DataSave
             print(f"[{idx+1}/{total}] {ts_code} 更新失败：{exc}")
 
 
+def refresh_market_snapshot(db: Database, latest_before: Optional[str]) -> None:
+    """入库后阶段：重算本次新增交易日（含原最新日，逐只更新可能补写当日数据）的市场快照。"""
+    try:
+        count = MarketSnapshotRepository().refresh(latest_before, None, conn=db.conn)
+        db.conn.commit()
+        print(f"市场快照：更新 {count} 个交易日")
+    except Exception as exc:
+        print(f"市场快照更新失败：{exc}")
+
+
+def refresh_xs_rank(db: Database, latest_before: Optional[str], features: Tuple[str, ...]) -> None:
+    """入库后阶段：计算新增交易日的截面排名；首次入库只算最新交易日，历史按需通过接口回填。"""
+    since = latest_before or _latest_trade_date_global(db)
+    if not since or not features:
+        return
+    try:
+        count = CrossSectionRepository().refresh(since, None, features, conn=db.conn)
+        db.conn.commit()
+        print(f"截面排名：写入 {count} 行")
+    except Exception as exc:
+        print(f"截面排名更新失败：{exc}")
+
+
+def refresh_timeframe_bars(db: Database, latest_before: Optional[str]) -> None:
+    """入库后阶段：重算原最新交易日所在周期至今的周/月K线（日常即只更新当前未结束的一周/一月），首次入库时全量构建。"""
+    try:
+        count = TimeframeRepository().refresh(latest_before, None, conn=db.conn)
+        db.conn.commit()
+        print(f"周/月K线：写入 {count} 行")
+    except Exception as exc:
+        print(f"周/月K线更新失败：{exc}")
+
+
 def main():
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     cfg_path = os.path.join(project_root, 'config.toml')
@@ -167,6 +206,7 @@ def main():
             stock_df = pd.read_sql_query("SELECT ts_code, name FROM stock_info", db.conn)
 
         if options.fetch_daily:
+            latest_before = _latest_trade_date_global(db)
             has_token = getattr(fetcher, 'ts_pro', None) is not None
             if options.use_batch_daily and has_token:
                 try:
@@ -176,6 +216,9 @@ def main():
                     update_daily_incremental(db, fetcher, saver, stock_df, options)
             else:
                 update_daily_incremental(db, fetcher, saver, stock_df, options)
+            refresh_market_snapshot(db, latest_before)
+            refresh_xs_rank(db, latest_before, options.xs_rank_features)
+            refresh_timeframe_bars(db, latest_before)
     finally:
         db.close()
 
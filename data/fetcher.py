@@ -84,7 +84,7 @@ class DataFetcher:
                 if progress_callback:
                     progress_callback(ts_code, "basic")
 
-                # 前收盘
+                # 复权因子：入库保存，复权价按需计算（见 strategy.adjust）
                 adj = self.ts_pro.adj_factor(ts_code=tushare_code, start_date=start_date, end_date=end_date)
                 if progress_callback:
                     progress_callback(ts_code, "adj")
@@ -104,7 +104,7 @@ class DataFetcher:
                 # 振幅 = (高-低)/前收
                 df['amplitude'] = (df['high'] - df['low']) / df['pre_close'] * 100
                 keep = ['trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount', 'pct_chg', 'turnover_rate',
-                        'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv']
+                        'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv', 'adj_factor']
                 
                 # 确保所有列都存在
                 for col in keep:
@@ -116,7 +116,7 @@ class DataFetcher:
             except Exception as e:
                 print(f"[TuShare接口失败] {ts_code}: {e}")
 
-        # 2. 备用接口：akshare
+        # 2. 备用接口：akshare（与 TuShare 一致取不复权价格，复权因子另取）
         symbol = self._tscode_to_akshare(ts_code)
         try:
             df = ak.stock_zh_a_hist(
@@ -124,7 +124,7 @@ class DataFetcher:
                 period="daily",
                 start_date=start_date,
                 end_date=end_date,
-                adjust="qfq"
+                adjust=""
             )
             if progress_callback:
                 progress_callback(ts_code, "akshare_hist")
@@ -141,8 +141,9 @@ class DataFetcher:
             df['volume_ratio'] = pd.NA
             df['circ_mv'] = pd.NA
             df['total_mv'] = pd.NA
+            df['adj_factor'] = self._akshare_adj_factor(symbol, df['trade_date'])
             keep = ['trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount', 'pct_chg', 'turnover_rate',
-                    'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv']
+                    'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv', 'adj_factor']
             
             # 确保所有列都存在
             for col in keep:
@@ -168,17 +169,51 @@ class DataFetcher:
             if daily is None or daily.empty:
                 return pd.DataFrame()
             df = pd.merge(daily, basic, on=['ts_code', 'trade_date'], how='left')
+            adj = self.fetch_adj_factor_by_date(trade_date)
+            if not adj.empty:
+                df = pd.merge(df, adj[['ts_code', 'adj_factor']], on='ts_code', how='left')
+            else:
+                df['adj_factor'] = pd.NA
             # TuShare daily 自带 pre_close
             if 'pre_close' not in df.columns or df['pre_close'].isna().all():
                 df['pre_close'] = df['close']  # 容错
             df['amplitude'] = (df['high'] - df['low']) / df['pre_close'] * 100
             keep = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'vol', 'amount', 'pct_chg',
-                    'turnover_rate', 'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv']
+                    'turnover_rate', 'pre_close', 'amplitude', 'volume_ratio', 'circ_mv', 'total_mv', 'adj_factor']
             return df[keep]
         except Exception as e:
             print(f"[TuShare 按日批量失败] {trade_date}: {e}")
             return pd.DataFrame()
 
+    # 新增：按交易日批量获取复权因子（TuShare，一次请求覆盖全市场；也用于回填历史因子）
+    def fetch_adj_factor_by_date(self, trade_date: str) -> pd.DataFrame:
+        if not self.ts_pro:
+            return pd.DataFrame()
+        try:
+            adj = self.ts_pro.adj_factor(trade_date=trade_date)
+            if adj is None or adj.empty:
+                return pd.DataFrame()
+            return adj[['ts_code', 'trade_date', 'adj_factor']]
+        except Exception as e:
+            print(f"[TuShare 复权因子失败] {trade_date}: {e}")
+            return pd.DataFrame()
+
+    def _akshare_adj_factor(self, symbol: str, trade_dates: pd.Series) -> pd.Series:
+        """akshare（新浪）后复权因子：只在除权日给出新值，按日期向前沿用到每个交易日；失败时为空（按不复权处理）。"""
+        try:
+            fac = ak.stock_zh_a_daily(symbol=symbol, adjust="hfq-factor")
+            fac = fac.rename(columns={'date': 'trade_date'})
+            fac['trade_date'] = pd.to_datetime(fac['trade_date'])
+            fac['hfq_factor'] = pd.to_numeric(fac['hfq_factor'], errors='coerce')
+            dates = pd.DataFrame({'trade_date': pd.to_datetime(trade_dates.astype(str))})
+            merged = pd.merge_asof(dates.reset_index().sort_values('trade_date'),
+                                   fac[['trade_date', 'hfq_factor']].sort_values('trade_date'),
+                                   on='trade_date', direction='backward')
+            return merged.set_index('index')['hfq_factor'].reindex(trade_dates.index)
+        except Exception as e:
+            print(f"[akshare 复权因子失败] {symbol}: {e}")
+            return pd.Series(pd.NA, index=trade_dates.index)
+
     # 新增：交易日历
     def fetch_trade_calendar(self, start_date: str, end_date: str) -> pd.DataFrame:
         if not self.ts_pro:
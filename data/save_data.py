@@ -1,10 +1,32 @@
+import numpy as np
 import pandas as pd
 from db.database import Database
+from strategy.limits import compute_limit_status
+
+
+def _factor(value):
+    """复权因子入库值：缺失（None/NaN/pd.NA）写 NULL。"""
+    return None if value is None or pd.isna(value) else float(value)
 
 
 class DataSaver:
     def __init__(self, db: Database):
         self.db = db
+        self._limit_ctx = None
+
+    def _limit_context(self):
+        """计算涨跌停状态所需的 ST 代码集合与上市日映射（按实例缓存，保存股票列表时失效）。"""
+        if self._limit_ctx is None:
+            rows = self.db.conn.execute("SELECT ts_code, name, is_st, list_date FROM stock_info").fetchall()
+            st_codes = {r[0] for r in rows if r[2] == 1 or (r[1] and 'ST' in r[1].upper())}
+            list_dates = {r[0]: str(r[3]) for r in rows if r[3]}
+            self._limit_ctx = (st_codes, list_dates)
+        return self._limit_ctx
+
+    def _limit_status(self, df: pd.DataFrame) -> list:
+        st_codes, list_dates = self._limit_context()
+        status = compute_limit_status(df, st_codes, list_dates)
+        return [None if np.isnan(v) else int(v) for v in status]
 
     def save_stock_list(self, stock_df: pd.DataFrame):
         cursor = self.db.conn.cursor()
@@ -24,14 +46,16 @@ class DataSaver:
                 row.get('list_status', '')
             ))
         self.db.conn.commit()
+        self._limit_ctx = None
 
     def save_daily_kline(self, ts_code: str, kline_df: pd.DataFrame):
         cursor = self.db.conn.cursor()
-        for _, row in kline_df.iterrows():
+        statuses = self._limit_status(kline_df.assign(ts_code=ts_code)) if not kline_df.empty else []
+        for (_, row), limit_status in zip(kline_df.iterrows(), statuses):
             cursor.execute('''
                 INSERT OR REPLACE INTO daily_kline
-                (ts_code, trade_date, open, high, low, close, vol, amount, pct_chg, turnover_rate, pre_close, amplitude, volume_ratio, circ_mv, total_mv)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (ts_code, trade_date, open, high, low, close, vol, amount, pct_chg, turnover_rate, pre_close, amplitude, volume_ratio, circ_mv, total_mv, limit_status, adj_factor)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 ts_code,
                 row.get('trade_date'),
@@ -48,6 +72,8 @@ class DataSaver:
                 row.get('volume_ratio'),
                 row.get('circ_mv'),
                 row.get('total_mv'),
+                limit_status,
+                _factor(row.get('adj_factor')),
             ))
         self.db.conn.commit()
 
@@ -55,16 +81,18 @@ class DataSaver:
     def bulk_save_daily_kline(self, df: pd.DataFrame):
         if df is None or df.empty:
             return
+        statuses = self._limit_status(df)
         records = [(
             row.get('ts_code'), row.get('trade_date'), row.get('open'), row.get('high'), row.get('low'),
             row.get('close'), row.get('vol'), row.get('amount'), row.get('pct_chg'), row.get('turnover_rate'),
-            row.get('pre_close'), row.get('amplitude'), row.get('volume_ratio'), row.get('circ_mv'), row.get('total_mv')
-        ) for _, row in df.iterrows()]
+            row.get('pre_close'), row.get('amplitude'), row.get('volume_ratio'), row.get('circ_mv'), row.get('total_mv'),
+            limit_status, _factor(row.get('adj_factor'))
+        ) for (_, row), limit_status in zip(df.iterrows(), statuses)]
         cursor = self.db.conn.cursor()
         cursor.executemany('''
             INSERT OR REPLACE INTO daily_kline
-            (ts_code, trade_date, open, high, low, close, vol, amount, pct_chg, turnover_rate, pre_close, amplitude, volume_ratio, circ_mv, total_mv)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (ts_code, trade_date, open, high, low, close, vol, amount, pct_chg, turnover_rate, pre_close, amplitude, volume_ratio, circ_mv, total_mv, limit_status, adj_factor)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', records)
         self.db.conn.commit()
 
@@ -51,11 +51,93 @@ class Database:
             volume_ratio REAL,
             circ_mv REAL,
             total_mv REAL,
+            limit_status INTEGER,
+            adj_factor REAL,
             UNIQUE(ts_code, trade_date)
         )
         ''')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_daily_kline_ts_code_date ON daily_kline (ts_code, trade_date)')
 
+        # 市场宽度与异动日快照（与 infrastructure/db/migrations.py 一致，采集脚本入库后写入）
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS market_snapshot (
+            trade_date TEXT PRIMARY KEY,
+            stock_count INTEGER,
+            advancers INTEGER,
+            decliners INTEGER,
+            unchanged INTEGER,
+            limit_up INTEGER,
+            limit_down INTEGER,
+            new_high_20 INTEGER,
+            new_high_60 INTEGER,
+            new_low_20 INTEGER,
+            new_low_60 INTEGER,
+            vol_spikes INTEGER,
+            total_volume REAL,
+            total_amount REAL,
+            avg_pct_chg REAL,
+            median_pct_chg REAL,
+            vol_spike_leaders TEXT,
+            turnover_leaders TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+        # 截面排名特征库（与 infrastructure/db/migrations.py 一致）
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS xs_rank (
+            trade_date TEXT NOT NULL,
+            feature TEXT NOT NULL,
+            ts_code TEXT NOT NULL,
+            pct INTEGER,
+            ind_pct INTEGER,
+            rank INTEGER,
+            ind_rank INTEGER,
+            PRIMARY KEY (trade_date, feature, ts_code)
+        ) WITHOUT ROWID
+        ''')
+
+        # 周/月K线（与 infrastructure/db/migrations.py 一致）
+        for table in ("weekly_kline", "monthly_kline"):
+            cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                ts_code TEXT NOT NULL,
+                period TEXT NOT NULL,
+                trade_date TEXT NOT NULL,
+                first_date TEXT,
+                last_date TEXT,
+                bars INTEGER,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                vol REAL,
+                amount REAL,
+                pct_chg REAL,
+                turnover_rate REAL,
+                pre_close REAL,
+                amplitude REAL,
+                volume_ratio REAL,
+                circ_mv REAL,
+                total_mv REAL,
+                limit_status INTEGER,
+                adj_factor REAL,
+                PRIMARY KEY (ts_code, period)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_ts_code_date ON {table} (ts_code, trade_date)')
+
+        # K线原地回填登记（与 infrastructure/db/migrations.py 一致）
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kline_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            source TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
         # 迁移：为已有表补充新增列
         # stock_info 新增列
         for col, col_def in [
@@ -73,8 +155,12 @@ class Database:
             ("volume_ratio", "REAL"),
             ("circ_mv", "REAL"),
             ("total_mv", "REAL"),
+            ("limit_status", "INTEGER"),
+            ("adj_factor", "REAL"),
         ]:
             self._ensure_column("daily_kline", col, col_def)
+        for table in ("weekly_kline", "monthly_kline"):
+            self._ensure_column(table, "adj_factor", "REAL")
 
         self.conn.commit()
 
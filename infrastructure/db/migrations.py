@@ -47,11 +47,20 @@ class MigrationManager:
                     volume_ratio REAL,
                     circ_mv REAL,
                     total_mv REAL,
+                    limit_status INTEGER,
+                    adj_factor REAL,
                     UNIQUE(ts_code, trade_date)
                 )
                 """
             )
             cur.execute('CREATE INDEX IF NOT EXISTS idx_daily_kline_ts_code_date ON daily_kline (ts_code, trade_date)')
+            # 已有库补列：涨跌停状态（见 strategy.limits，写入时计算，历史数据用 tools/backfill_limit_status.py 回填）
+            existing = {r[1] for r in cur.execute("PRAGMA table_info(daily_kline)").fetchall()}
+            if "limit_status" not in existing:
+                cur.execute("ALTER TABLE daily_kline ADD COLUMN limit_status INTEGER")
+            # 复权因子（见 strategy.adjust）：原始价格 × 因子 = 后复权价，历史数据用 tools/backfill_adj_factor.py 回填
+            if "adj_factor" not in existing:
+                cur.execute("ALTER TABLE daily_kline ADD COLUMN adj_factor REAL")
 
             # strategy & signals (占位)
             cur.execute(
@@ -99,81 +108,221 @@ class MigrationManager:
             )
             cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_stats_industry_date ON industry_stats (industry, trade_date)')
             
-        # 股票日统计表
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS stock_daily_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ts_code TEXT NOT NULL,
-                trade_date TEXT NOT NULL,
-                volume REAL,
-                amount REAL,
-                pct_chg REAL,
-                turnover_rate REAL,
-                amplitude REAL,
-                UNIQUE(ts_code, trade_date)
+            # 行业滚动窗口聚合（1/5/7/20/60 日，随 industry_stats 增量刷新，供首页看板直接读取）
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS industry_stats_rolling (
+                    industry TEXT NOT NULL,
+                    trade_date TEXT NOT NULL,
+                    window_days INTEGER NOT NULL,
+                    total_volume REAL,
+                    avg_pct_chg REAL,
+                    days_count INTEGER,
+                    stock_count INTEGER,
+                    rising_count INTEGER,
+                    falling_count INTEGER,
+                    UNIQUE(window_days, trade_date, industry)
+                )
+                """
+            )
+
+            # 市场宽度与异动日快照（见 strategy.market_snapshot，入库后计算，首页与 /stocks/stats 直接读取）
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS market_snapshot (
+                    trade_date TEXT PRIMARY KEY,
+                    stock_count INTEGER,
+                    advancers INTEGER,
+                    decliners INTEGER,
+                    unchanged INTEGER,
+                    limit_up INTEGER,
+                    limit_down INTEGER,
+                    new_high_20 INTEGER,
+                    new_high_60 INTEGER,
+                    new_low_20 INTEGER,
+                    new_low_60 INTEGER,
+                    vol_spikes INTEGER,
+                    total_volume REAL,
+                    total_amount REAL,
+                    avg_pct_chg REAL,
+                    median_pct_chg REAL,
+                    vol_spike_leaders TEXT,
+                    turnover_leaders TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+
+            # 截面排名特征库（见 strategy.cross_section）：百分位为万分位整数，无 rowid 按主键聚簇存储
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS xs_rank (
+                    trade_date TEXT NOT NULL,
+                    feature TEXT NOT NULL,
+                    ts_code TEXT NOT NULL,
+                    pct INTEGER,
+                    ind_pct INTEGER,
+                    rank INTEGER,
+                    ind_rank INTEGER,
+                    PRIMARY KEY (trade_date, feature, ts_code)
+                ) WITHOUT ROWID
+                """
+            )
+
+            # 周/月K线（见 strategy.timeframe）：由日线按自然周/月聚合，入库后只重算当前未结束的周期；
+            # period 为周一日期 / 当月 1 日，trade_date 为周期内全市场最后一个交易日
+            for table in ("weekly_kline", "monthly_kline"):
+                cur.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        ts_code TEXT NOT NULL,
+                        period TEXT NOT NULL,
+                        trade_date TEXT NOT NULL,
+                        first_date TEXT,
+                        last_date TEXT,
+                        bars INTEGER,
+                        open REAL,
+                        high REAL,
+                        low REAL,
+                        close REAL,
+                        vol REAL,
+                        amount REAL,
+                        pct_chg REAL,
+                        turnover_rate REAL,
+                        pre_close REAL,
+                        amplitude REAL,
+                        volume_ratio REAL,
+                        circ_mv REAL,
+                        total_mv REAL,
+                        limit_status INTEGER,
+                        adj_factor REAL,
+                        PRIMARY KEY (ts_code, period)
+                    ) WITHOUT ROWID
+                    """
+                )
+                if "adj_factor" not in {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}:
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN adj_factor REAL")
+                cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_ts_code_date ON {table} (ts_code, trade_date)')
+
+            # 股票日统计：字段均已在 daily_kline 中，改为视图直接读取（旧版为逐行复制的表，迁移时删除）
+            row = cur.execute("SELECT type FROM sqlite_master WHERE name='stock_daily_stats'").fetchone()
+            if row and row[0] == 'table':
+                cur.execute("DROP TABLE stock_daily_stats")
+            cur.execute(
+                """
+                CREATE VIEW IF NOT EXISTS stock_daily_stats AS
+                SELECT ts_code, trade_date, vol AS volume, amount, pct_chg, turnover_rate, amplitude
+                FROM daily_kline
+                """
             )
-            """
-        )
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_stock_daily_stats_code_date ON stock_daily_stats (ts_code, trade_date)')
         
-        # 行业指数表
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS industry_index (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                index_code TEXT NOT NULL,
-                index_name TEXT NOT NULL,
-                industry_name TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                src TEXT DEFAULT 'SW',
-                is_active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(index_code)
+            # 行业指数表
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS industry_index (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    index_code TEXT NOT NULL,
+                    index_name TEXT NOT NULL,
+                    industry_name TEXT NOT NULL,
+                    level INTEGER DEFAULT 1,
+                    src TEXT DEFAULT 'SW',
+                    is_active INTEGER DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(index_code)
+                )
+                """
             )
-            """
-        )
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_code ON industry_index (index_code)')
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_name ON industry_index (industry_name)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_code ON industry_index (index_code)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_name ON industry_index (industry_name)')
         
-        # 行业指数日线数据表
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS industry_index_daily (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                index_code TEXT NOT NULL,
-                trade_date TEXT NOT NULL,
-                open REAL,
-                high REAL,
-                low REAL,
-                close REAL,
-                pre_close REAL,
-                change REAL,
-                pct_chg REAL,
-                vol REAL,
-                amount REAL,
-                UNIQUE(index_code, trade_date)
+            # 行业指数日线数据表
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS industry_index_daily (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    index_code TEXT NOT NULL,
+                    trade_date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    pre_close REAL,
+                    change REAL,
+                    pct_chg REAL,
+                    vol REAL,
+                    amount REAL,
+                    UNIQUE(index_code, trade_date)
+                )
+                """
             )
-            """
-        )
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_daily_code_date ON industry_index_daily (index_code, trade_date)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_index_daily_code_date ON industry_index_daily (index_code, trade_date)')
         
-        # 行业成分股表
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS industry_members (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                index_code TEXT NOT NULL,
-                ts_code TEXT NOT NULL,
-                con_date TEXT,
-                is_new INTEGER DEFAULT 0,
-                UNIQUE(index_code, ts_code)
+            # 行业成分股表
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS industry_members (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    index_code TEXT NOT NULL,
+                    ts_code TEXT NOT NULL,
+                    con_date TEXT,
+                    is_new INTEGER DEFAULT 0,
+                    UNIQUE(index_code, ts_code)
+                )
+                """
+            )
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_members_index ON industry_members (index_code)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_members_stock ON industry_members (ts_code)')
+
+            # 回测结果持久化（增量续算）
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS backtest_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    config_hash TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    last_date TEXT,
+                    resume_date TEXT,
+                    data_version INTEGER,
+                    state TEXT,
+                    summary TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(config_hash)
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS backtest_signals (
+                    run_id INTEGER NOT NULL,
+                    trade_date TEXT NOT NULL,
+                    ts_code TEXT NOT NULL,
+                    entry_date TEXT,
+                    entry_price REAL,
+                    exit_date TEXT,
+                    exit_price REAL,
+                    ret_pct REAL,
+                    ret_pct_after_fee REAL,
+                    score REAL
+                )
+                """
+            )
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_backtest_signals_run_date ON backtest_signals (run_id, trade_date)')
+
+            # K线原地回填登记（limit_status / adj_factor 等按列 UPDATE 不改 rowid，增量回测据此重查指纹）
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS kline_revisions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL,
+                    source TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
             )
-            """
-        )
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_members_index ON industry_members (index_code)')
-        cur.execute('CREATE INDEX IF NOT EXISTS idx_industry_members_stock ON industry_members (ts_code)')
 
     def downgrade(self):
         # 简化实现：不执行回滚
@@ -0,0 +1,86 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 复权方式：raw 不复权（库中原始价格）| qfq 前复权（以各股最新因子为基准，最新价不变）| hfq 后复权（历史价不随新除权变化）
+ADJUST_MODES: Tuple[str, ...] = ("raw", "qfq", "hfq")
+DEFAULT_ADJUST = "qfq"
+# 随复权缩放的价格字段；成交量/额、涨跌幅、换手率、市值等不变
+PRICE_FIELDS: Tuple[str, ...] = ("open", "high", "low", "close", "pre_close")
+
+# SQLite 单条语句可绑定变量数的保守上限（老版本为 999）
+_MAX_IN_PARAMS = 900
+
+
+def normalize_adjust(adjust: str | None) -> str:
+    """复权方式校验，空值视为 raw；未知取值抛 ValueError。"""
+    mode = (adjust or "raw").lower()
+    if mode not in ADJUST_MODES:
+        raise ValueError(f"未知的复权方式: {adjust}")
+    return mode
+
+
+def latest_factors(conn, codes: Optional[Iterable[str]] = None) -> pd.Series:
+    """各代码最后一个非空的 adj_factor（前复权基准），index 为 ts_code；没有因子的代码不出现。"""
+    codes_list = list(codes) if codes is not None else None
+    where, args = "adj_factor IS NOT NULL", []
+    if codes_list is not None and len(codes_list) <= _MAX_IN_PARAMS:
+        if not codes_list:
+            return pd.Series(dtype=float)
+        where += f" AND ts_code IN ({','.join('?' for _ in codes_list)})"
+        args = codes_list
+    rows = conn.execute(
+        f"""
+        SELECT k.ts_code, k.adj_factor
+        FROM daily_kline k
+        JOIN (SELECT ts_code, MAX(trade_date) AS md FROM daily_kline WHERE {where} GROUP BY ts_code) t
+          ON k.ts_code = t.ts_code AND k.trade_date = t.md
+        """, args
+    ).fetchall()
+    out = pd.Series({r[0]: float(r[1]) for r in rows}, dtype=float)
+    if codes_list is not None and len(codes_list) > _MAX_IN_PARAMS:
+        out = out[out.index.isin(set(codes_list))]
+    return out
+
+
+def price_ratio(factors: pd.DataFrame, adjust: str, latest: Optional[pd.Series] = None) -> np.ndarray:
+    """(行 × 代码) 的 adj_factor 宽表 -> 价格乘数。
+
+    缺失因子按同一代码最近的已知因子补齐（先取其后、再取其前），整段都没有因子的代码乘数为 1（保持原始价格）；
+    hfq 乘数为因子本身，qfq 为 因子 / latest（各代码最新因子，缺省取窗口内最后的已知因子）。"""
+    f = factors.bfill().ffill()
+    if adjust == "qfq" and len(f.index):
+        base = f.iloc[-1]
+        if latest is not None:
+            base = latest.reindex(f.columns).fillna(base)
+        f = f / base.where(base > 0)
+    return f.fillna(1.0).to_numpy(dtype=float)
+
+
+def adjust_fields(fields: Dict[str, pd.DataFrame], factors: pd.DataFrame, adjust: str,
+                  latest: Optional[pd.Series] = None) -> None:
+    """宽表字段字典中的价格字段原地替换为复权价：每个字段一次整表乘法。"""
+    if adjust == "raw" or not len(factors.index):
+        return
+    ratio = price_ratio(factors, adjust, latest)
+    for name in PRICE_FIELDS:
+        if name in fields:
+            wide = fields[name]
+            fields[name] = pd.DataFrame(wide.to_numpy(dtype=float) * ratio, index=wide.index, columns=wide.columns)
+
+
+def adjust_bars(df: pd.DataFrame, adjust: str, latest: Optional[float] = None) -> pd.DataFrame:
+    """单只股票按日期排序的K线长表（价格字段 + adj_factor）复权，返回新表；口径同 price_ratio，latest 为该股最新因子。"""
+    if adjust == "raw" or df is None or df.empty or "adj_factor" not in df.columns:
+        return df
+    f = pd.to_numeric(df["adj_factor"], errors="coerce").bfill().ffill()
+    if adjust == "qfq":
+        base = latest if latest is not None and latest > 0 else f.iloc[-1]
+        f = f / base
+    ratio = f.fillna(1.0).to_numpy(dtype=float)
+    out = df.copy()
+    for name in PRICE_FIELDS:
+        if name in out.columns:
+            out[name] = pd.to_numeric(out[name], errors="coerce").to_numpy(dtype=float) * ratio
+    return out
@@ -0,0 +1,301 @@
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.panel import IndicatorCache, Panel
+
+TRADING_DAYS = 252
+# 默认的持有期分析与分布统计参数
+DEFAULT_HORIZONS = (1, 3, 5, 10, 20)
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_BINS = (-np.inf, -10, -5, -3, -1, 0, 1, 3, 5, 10, np.inf)
+
+
+def _r(x: float, nd: int = 4) -> Optional[float]:
+    return round(float(x), nd) if np.isfinite(x) else None
+
+
+# ====== 收益序列指标 ======
+def ratio_metrics(returns: np.ndarray, periods_per_year: float = TRADING_DAYS) -> Dict[str, Any]:
+    """周期收益率序列（小数）-> 年化收益/波动、Sharpe、Sortino、Calmar、最大回撤。"""
+    r = np.asarray(returns, dtype=float)
+    r = r[np.isfinite(r)]
+    if len(r) < 2:
+        return {"periods": int(len(r)), "annual_return": None, "annual_vol": None, "sharpe": None,
+                "sortino": None, "calmar": None, "mdd": None}
+    eq = np.cumprod(1.0 + r)
+    mdd = float((eq / np.maximum.accumulate(np.maximum(eq, 1.0)) - 1.0).min())
+    annual = eq[-1] ** (periods_per_year / len(r)) - 1.0 if eq[-1] > 0 else -1.0
+    std = r.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))
+    scale = np.sqrt(periods_per_year)
+    return {
+        "periods": int(len(r)),
+        "annual_return": _r(annual * 100.0, 3),
+        "annual_vol": _r(std * scale * 100.0, 3),
+        "sharpe": _r(r.mean() / std * scale) if std > 0 else None,
+        "sortino": _r(r.mean() / downside * scale) if downside > 0 else None,
+        "calmar": _r(annual / -mdd) if mdd < 0 else None,
+        "mdd": _r(mdd * 100.0, 2),
+    }
+
+
+def rolling_drawdown(equity: pd.Series | np.ndarray, window: Optional[int] = None) -> np.ndarray:
+    """回撤序列（小数，<=0）：window 为 None 时相对历史最高点，否则相对最近 window 期的最高点。"""
+    eq = pd.Series(np.asarray(equity, dtype=float))
+    peak = eq.cummax() if window is None else eq.rolling(int(window), min_periods=1).max()
+    return (eq / peak - 1.0).to_numpy()
+
+
+def nav_analytics(nav: pd.DataFrame | pd.Series, window: int = 60) -> Dict[str, Any]:
+    """组合日净值分析：收益风险比率 + 回撤持续期。nav 为净值序列或含 nav 列的 DataFrame。"""
+    s = nav["nav"] if isinstance(nav, pd.DataFrame) else nav
+    v = s.to_numpy(dtype=float)
+    if len(v) < 2:
+        return ratio_metrics(np.array([]))
+    rets = v[1:] / v[:-1] - 1.0
+    out = ratio_metrics(np.r_[v[0] - 1.0, rets])
+    dd = rolling_drawdown(v)
+    # 最长水下期（连续处于回撤中的交易日数）
+    under = dd < 0
+    run_id = np.cumsum(~under)
+    longest = int(np.bincount(run_id[under]).max()) if under.any() else 0
+    out.update({
+        "win_days": _r((rets > 0).mean() * 100.0, 2),
+        "max_underwater_days": longest,
+        f"worst_{window}d_drawdown": _r(rolling_drawdown(v, window).min() * 100.0, 2),
+    })
+    return out
+
+
+# ====== 信号级分析 ======
+def _group_stats(keys: np.ndarray, n_groups: int, ret: np.ndarray, ret_fee: np.ndarray) -> Dict[str, np.ndarray]:
+    cnt = np.bincount(keys, minlength=n_groups)
+    safe = np.maximum(cnt, 1)
+    return {
+        "signals": cnt,
+        "win_rate": np.bincount(keys, ret_fee > 0, n_groups) / safe * 100.0,
+        "avg_ret": np.bincount(keys, ret, n_groups) / safe,
+        "avg_ret_after_fee": np.bincount(keys, ret_fee, n_groups) / safe,
+        "sum_ret_after_fee": np.bincount(keys, ret_fee, n_groups),
+    }
+
+
+def _stats_table(labels: Iterable[Any], stats: Dict[str, np.ndarray], name: str) -> pd.DataFrame:
+    df = pd.DataFrame({name: list(labels), **stats})
+    df = df[df["signals"] > 0]
+    return df.round({"win_rate": 2, "avg_ret": 3, "avg_ret_after_fee": 3, "sum_ret_after_fee": 3}).reset_index(drop=True)
+
+
+def _breakdown(keys: np.ndarray, uniques: Iterable[Any], signals: pd.DataFrame, by: str,
+               industry_map: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """keys/uniques 为 trade_date（行业分组时为 ts_code）factorize 的结果：只对唯一值映射分组标签。"""
+    if by == "industry":
+        imap = industry_map or {}
+        names = []
+        for u in uniques:
+            v = imap.get(str(u).split('.')[0], imap.get(u))
+            v = v.get("industry") if isinstance(v, Mapping) else v
+            names.append(v or "-")
+        labels_per_unique = np.asarray(names, dtype=object)
+    else:
+        width = 4 if by == "year" else 6
+        labels_per_unique = np.asarray([str(u)[:width] for u in uniques], dtype=object)
+    group_codes, labels = pd.factorize(labels_per_unique, sort=True)
+    stats = _group_stats(group_codes[keys], len(labels), signals["ret_pct"].to_numpy(dtype=float),
+                         signals["ret_pct_after_fee"].to_numpy(dtype=float))
+    return _stats_table(labels, stats, by)
+
+
+def breakdown(signals: pd.DataFrame, by: str = "month",
+              industry_map: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """按月份(by="month") / 年份(by="year") / 行业(by="industry") 分组统计。
+    日期与代码先 factorize，再对唯一值做映射，分组聚合为 np.bincount，百万级信号也只需一次遍历。
+    industry_map 的键为无后缀代码（与 StockRepository.info_map 一致），值可为行业名或 {industry: ...}。"""
+    if signals.empty:
+        return pd.DataFrame()
+    keys, uniques = pd.factorize(signals["ts_code" if by == "industry" else "trade_date"])
+    return _breakdown(keys, uniques, signals, by, industry_map)
+
+
+def return_distribution(signals: pd.DataFrame, column: str = "ret_pct_after_fee",
+                        bins: Iterable[float] = DEFAULT_BINS,
+                        quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+    """收益分布：分位数、偏度/峰度与直方图（区间为左闭右开，单位 %）。"""
+    if signals.empty:
+        return {}
+    x = signals[column].to_numpy(dtype=float)
+    x = x[np.isfinite(x)]
+    if len(x) == 0:
+        return {}
+    bins = np.asarray(list(bins), dtype=float)
+    hist = np.bincount(np.searchsorted(bins, x, side="right") - 1, minlength=len(bins) - 1)[:len(bins) - 1]
+    qs = list(quantiles)
+    mean = x.mean()
+    dev = x - mean
+    dev2 = dev * dev
+    sd = np.sqrt(dev2.mean())
+    return {
+        "count": int(len(x)),
+        "mean": _r(mean, 3),
+        "std": _r(sd, 3),
+        "skew": _r((dev2 * dev).mean() / sd ** 3, 3) if sd > 0 else None,
+        "kurtosis": _r((dev2 * dev2).mean() / sd ** 4 - 3.0, 3) if sd > 0 else None,
+        "quantiles": {f"p{int(round(q * 100))}": _r(v, 3) for q, v in zip(qs, np.quantile(x, qs))},
+        "histogram": [{"bin": f"[{lo:g}, {hi:g})", "count": int(c)} for lo, hi, c in zip(bins[:-1], bins[1:], hist)],
+    }
+
+
+def hit_rate_by_horizon(signals: pd.DataFrame, panel: Panel, horizons: Iterable[int] = DEFAULT_HORIZONS,
+                        cache: Optional[IndicatorCache] = None) -> pd.DataFrame:
+    """以信号的入场价为基准，统计持有 n 根K线（按个股自身K线计数，停牌跳过）后按收盘价计的胜率与平均收益。
+    面板末尾不足 n 根的信号不计入该持有期。"""
+    if signals.empty or panel.align != "calendar" or len(panel.index) == 0:
+        return pd.DataFrame()
+    cache = cache or IndicatorCache(panel)
+    rows = panel.index.get_indexer(signals["entry_date"].astype(str) if "entry_date" in signals
+                                   else signals["trade_date"].astype(str))
+    cols = panel.codes.get_indexer(signals["ts_code"])
+    ok = (rows >= 0) & (cols >= 0)
+    rows, cols = rows[ok], cols[ok]
+    entry = signals["entry_price"].to_numpy(dtype=float)[ok]
+    close = panel["close"].to_numpy(dtype=float)
+    out = []
+    for n in horizons:
+        fwd = cache.forward_row(int(n))[rows, cols]
+        has = fwd >= 0
+        ret = (close[fwd[has], cols[has]] / entry[has] - 1.0) * 100.0
+        out.append({
+            "horizon": int(n),
+            "signals": int(has.sum()),
+            "hit_rate": _r((ret > 0).mean() * 100.0, 2) if len(ret) else None,
+            "avg_ret": _r(ret.mean(), 3) if len(ret) else None,
+            "median_ret": _r(np.median(ret), 3) if len(ret) else None,
+        })
+    return pd.DataFrame(out)
+
+
+def signal_analytics(signals: pd.DataFrame, forward_n: int = 5, panel: Optional[Panel] = None,
+                     industry_map: Optional[Mapping[str, Any]] = None, window: int = 60,
+                     cache: Optional[IndicatorCache] = None) -> Dict[str, Any]:
+    """信号明细的完整分析。
+    - ratios：按信号日等权的组合收益（每日一组，持有 forward_n 根K线）计算 Sharpe/Sortino/Calmar，
+      年化周期数为 252 / forward_n
+    - drawdown：与 summarize_signals 相同的串行资金曲线上的回撤与滚动 window 笔回撤
+    - horizons：需要 panel（可传入回测时的 IndicatorCache 复用前移行号）；by_month / by_year / by_industry：分组统计；distribution：收益分布"""
+    if signals.empty:
+        return {"ratios": ratio_metrics(np.array([])), "distribution": {}, "by_month": [], "by_year": [],
+                "by_industry": [], "horizons": [], "drawdown": {}}
+    ret_fee = signals["ret_pct_after_fee"].to_numpy(dtype=float) / 100.0
+    day_keys, days = pd.factorize(signals["trade_date"], sort=True)
+    daily = np.bincount(day_keys, ret_fee) / np.bincount(day_keys)
+    ratios = ratio_metrics(daily, TRADING_DAYS / max(int(forward_n), 1))
+
+    eq = np.cumprod(1.0 + ret_fee)
+    dd = rolling_drawdown(eq)
+    result = {
+        "ratios": ratios,
+        "distribution": return_distribution(signals),
+        "by_month": _breakdown(day_keys, days, signals, "month").to_dict(orient="records"),
+        "by_year": _breakdown(day_keys, days, signals, "year").to_dict(orient="records"),
+        "by_industry": (breakdown(signals, "industry", industry_map).to_dict(orient="records")
+                        if industry_map is not None else []),
+        "horizons": (hit_rate_by_horizon(signals, panel, cache=cache).to_dict(orient="records")
+                     if panel is not None else []),
+        "drawdown": {
+            "mdd": _r(dd.min() * 100.0, 2),
+            f"worst_{window}_signals": _r(rolling_drawdown(eq, window).min() * 100.0, 2),
+            "trough_date": str(signals["trade_date"].iloc[int(np.argmin(dd))]),
+        },
+    }
+    return result
+
+
+# ====== 自助法置信区间 ======
+DEFAULT_BOOTSTRAP_PERCENTILES = (2.5, 5.0, 25.0, 50.0, 75.0, 95.0, 97.5)
+
+
+def _daily_blocks(signals: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """按信号日聚合为可叠加的分量：条数/盈利数/收益和，以及串行资金曲线的对数段统计
+    （段内总增长、段内最低/最高累计值、段内最大回撤），重采样后按日拼接即可还原 summarize_signals 的口径。"""
+    keys, days = pd.factorize(signals["trade_date"], sort=True)
+    n = len(days)
+    ret = signals["ret_pct"].to_numpy(dtype=float)
+    ret_fee = signals["ret_pct_after_fee"].to_numpy(dtype=float)
+    # 同一天内保持原有信号顺序
+    order = np.argsort(keys, kind="stable")
+    k, lr = keys[order], np.log1p(ret_fee[order] / 100.0)
+    starts = np.r_[0, np.flatnonzero(np.diff(k)) + 1]
+    csum = np.cumsum(lr)
+    base = np.repeat(np.r_[0.0, csum[starts[1:] - 1]], np.diff(np.r_[starts, len(k)]))
+    level = csum - base
+    seg_peak = pd.Series(level).groupby(k).cummax().to_numpy()
+    return {
+        "count": np.bincount(keys, minlength=n).astype(float),
+        "wins": np.bincount(keys, ret_fee > 0, n),
+        "sum_ret": np.bincount(keys, ret, n),
+        "sum_ret_fee": np.bincount(keys, ret_fee, n),
+        "growth": np.bincount(k, lr, n),
+        "low": np.minimum.reduceat(level, starts),
+        "high": np.maximum.reduceat(level, starts),
+        "mdd": np.minimum.reduceat(level - seg_peak, starts),
+    }
+
+
+def bootstrap_signals(signals: pd.DataFrame, n_samples: int = 2000, block_days: int = 5,
+                      seed: Optional[int] = None,
+                      percentiles: Iterable[float] = DEFAULT_BOOTSTRAP_PERCENTILES) -> Dict[str, Any]:
+    """信号汇总指标的块自助法（circular block bootstrap）置信区间。
+    以信号日为单位整块重采样（连续 block_days 个信号日为一块），保留同日截面相关与相邻持有期的重叠；
+    全部样本的抽样为一次 (n_samples × 信号日数) 的下标矩阵，指标由按日聚合量直接求和得到。
+    返回各指标（win_rate/avg_ret/avg_ret_after_fee/mdd/signals）的点估计、均值、标准差与分位数带；seed 固定时结果可复现。"""
+    if signals.empty:
+        return {"samples": 0, "block_days": int(block_days), "seed": seed, "metrics": {}}
+    blocks = _daily_blocks(signals)
+    n_days = len(blocks["count"])
+    block = int(min(max(int(block_days), 1), n_days))
+    n_blocks = -(-n_days // block)
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, n_days, size=(int(n_samples), n_blocks))
+    idx = ((starts[:, :, None] + np.arange(block)) % n_days).reshape(int(n_samples), -1)[:, :n_days]
+
+    cnt = blocks["count"][idx].sum(axis=1)
+    safe = np.maximum(cnt, 1.0)
+    sampled = {
+        "signals": cnt,
+        "win_rate": blocks["wins"][idx].sum(axis=1) / safe * 100.0,
+        "avg_ret": blocks["sum_ret"][idx].sum(axis=1) / safe,
+        "avg_ret_after_fee": blocks["sum_ret_fee"][idx].sum(axis=1) / safe,
+    }
+    # 串行资金曲线的最大回撤：逐日拼接段统计（对样本维度向量化）
+    level = np.zeros(len(idx))
+    peak = np.full(len(idx), -np.inf)
+    worst = np.zeros(len(idx))
+    for j in range(n_days):
+        d = idx[:, j]
+        worst = np.minimum(worst, np.minimum(blocks["mdd"][d], level + blocks["low"][d] - peak))
+        peak = np.maximum(peak, level + blocks["high"][d])
+        level = level + blocks["growth"][d]
+    sampled["mdd"] = np.expm1(worst) * 100.0
+
+    ret_fee = signals["ret_pct_after_fee"].to_numpy(dtype=float)
+    eq = np.cumprod(1.0 + ret_fee / 100.0)
+    point = {
+        "signals": float(len(signals)),
+        "win_rate": float((ret_fee > 0).mean() * 100.0),
+        "avg_ret": float(signals["ret_pct"].mean()),
+        "avg_ret_after_fee": float(ret_fee.mean()),
+        "mdd": float((eq / np.maximum.accumulate(eq) - 1.0).min() * 100.0),
+    }
+    pcts = list(percentiles)
+    metrics = {}
+    for name, values in sampled.items():
+        bands = np.percentile(values, pcts)
+        metrics[name] = {
+            "point": _r(point[name], 3),
+            "mean": _r(values.mean(), 3),
+            "std": _r(values.std(ddof=1), 3) if len(values) > 1 else None,
+            **{f"p{p:g}": _r(v, 3) for p, v in zip(pcts, bands)},
+        }
+    return {"samples": int(n_samples), "block_days": block, "seed": seed, "days": int(n_days), "metrics": metrics}
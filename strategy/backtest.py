@@ -1,13 +1,55 @@
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Tuple
+from strategy.adjust import normalize_adjust
 from strategy.selector import StrategyConfig, StockSelector
+from strategy.limits import limit_up_mask
+from strategy.scoring import SCORE_RULES, score_array, top_k_indices
 
 
 @dataclass
 class BacktestResult:
     signals: pd.DataFrame
     summary: Dict[str, Any]
+    # 首个仍有候选信号等待入场/离场K线的信号日；该日及之后的结果会随新数据变化（增量回测据此续算）
+    pending_from: Optional[str] = None
+
+
+def summarize_signals(signals: pd.DataFrame, start: str, end: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """信号明细 -> 汇总指标（胜率/平均收益/中位数/费后收益/串行资金曲线最大回撤）。"""
+    if signals.empty:
+        return {
+            'signals': 0,
+            'win_rate': 0.0,
+            'avg_ret': 0.0,
+            'median_ret': 0.0,
+            'avg_ret_after_fee': 0.0,
+            'mdd': 0.0,
+            'period': (start, end),
+        }
+    # 统计
+    wins = (signals['ret_pct_after_fee'] > 0).sum()
+    total = len(signals)
+    avg_ret = float(signals['ret_pct'].mean())
+    med_ret = float(signals['ret_pct'].median())
+    avg_ret_fee = float(signals['ret_pct_after_fee'].mean())
+    # 简单资金曲线（按信号顺序串行叠加）
+    eq = (1.0 + signals['ret_pct_after_fee'] / 100.0).cumprod()
+    roll_max = eq.cummax()
+    dd = (eq / roll_max - 1.0)
+    mdd = float(dd.min()) * 100.0 if not dd.empty else 0.0
+    summary = {
+        'signals': total,
+        'win_rate': round(wins / total * 100.0, 2),
+        'avg_ret': round(avg_ret, 3),
+        'median_ret': round(med_ret, 3),
+        'avg_ret_after_fee': round(avg_ret_fee, 3),
+        'mdd': round(mdd, 2),
+        'period': (start, end),
+    }
+    summary.update(params or {})
+    return summary
 
 
 class Backtester:
@@ -37,12 +79,15 @@ class Backtester:
         ).fetchone()
         return float(row[0]) if row and row[0] is not None else None
 
-    def _get_pct_chg_on(self, ts_code: str, trade_date: str) -> Optional[float]:
-        row = self.conn.execute(
-            "SELECT pct_chg FROM daily_kline WHERE ts_code=? AND trade_date=?",
-            (ts_code, trade_date)
-        ).fetchone()
-        return float(row[0]) if row and row[0] is not None else None
+    def _get_limit_up_days(self, ts_codes: List[str], start: str, end: str, threshold: float) -> set:
+        """区间内涨停的 (代码, 日期) 集合：一次查询读出 limit_status，未回填的行按 pct_chg 阈值判定。"""
+        df = pd.read_sql_query(
+            "SELECT ts_code, trade_date, pct_chg, limit_status FROM daily_kline WHERE trade_date>=? AND trade_date<=?",
+            self.conn, params=(start, end)
+        )
+        df = df[df['ts_code'].isin(set(ts_codes))]
+        hit = limit_up_mask(df['limit_status'].to_numpy(dtype=float), df['pct_chg'].to_numpy(dtype=float), threshold)
+        return set(zip(df['ts_code'][hit], df['trade_date'][hit]))
 
     def _get_next_trade_date_for_code(self, ts_code: str, date_: str) -> Optional[str]:
         row = self.conn.execute(
@@ -63,20 +108,14 @@ class Backtester:
             return None
         return rows[-1][0], float(rows[-1][1])
 
-    def _calc_score(self, checks: Dict[str, bool], cfg: StrategyConfig, weights: Dict[str, float]) -> float:
-        # 与UI一致：仅对启用项计分并归一化
-        items = []
-        items.append((cfg.volume_mode is not None, bool(checks.get('volume', False)), float(weights.get('vol', 30))))
-        items.append(((cfg.ma_alignment is not None) or (cfg.price_above_ma is not None), bool(checks.get('ma', False)), float(weights.get('ma', 20))))
-        items.append((cfg.breakout_n is not None, bool(checks.get('breakout', False)), float(weights.get('brk', 25))))
-        items.append((bool(cfg.enable_patterns), bool(checks.get('pattern', False)), float(weights.get('pat', 15))))
-        items.append((bool(cfg.macd_enable), bool(checks.get('macd', False)), float(weights.get('macd', 5))))
-        items.append((bool(cfg.rsi_enable), bool(checks.get('rsi', False)), float(weights.get('rsi', 5))))
-        total = sum(w for used, _pass, w in items if used and w > 0)
-        if total <= 0:
-            return 0.0
-        earned = sum(w for used, _pass, w in items if used and _pass)
-        return round(earned / total * 100.0, 3)
+    def _factor_ratio(self, ts_code: str, from_date: str, to_date: str) -> float:
+        """两日复权因子之比（to / from），用于把离场价折算到入场日口径；任一日缺因子时为 1。"""
+        rows = dict(self.conn.execute(
+            "SELECT trade_date, adj_factor FROM daily_kline WHERE ts_code=? AND trade_date IN (?, ?)",
+            (ts_code, from_date, to_date)
+        ).fetchall())
+        a, b = rows.get(from_date), rows.get(to_date)
+        return float(b) / float(a) if a and b else 1.0
 
     def run(
         self,
@@ -95,7 +134,9 @@ class Backtester:
         limit_up_threshold: float = 9.8,
     ) -> BacktestResult:
         weights = weights or {}
+        adjusted = normalize_adjust(cfg.adjust) != "raw"
         dates = self._get_all_trade_dates(start, end)
+        limit_up_days = self._get_limit_up_days(ts_codes, start, end, limit_up_threshold) if exclude_limit_up else set()
         records = []
         # 遍历每个交易日
         for i, d in enumerate(dates):
@@ -104,13 +145,11 @@ class Backtester:
             win_start = self._get_window_start(dates, i, lookback_days)
             day_candidates = []
             for code in ts_codes:
-                # 排除信号日涨停（以信号日pct_chg判定）
-                if exclude_limit_up:
-                    pct = self._get_pct_chg_on(code, d)
-                    if pct is not None and pct >= limit_up_threshold:
-                        continue
+                # 排除信号日涨停（按板块规则的 limit_status，缺失时以 pct_chg 阈值判定）
+                if (code, d) in limit_up_days:
+                    continue
                 # 用窗口[win_start, d]评估信号
-                res = self.selector.evaluate_single(code, win_start, d, cfg)
+                res = self.selector.evaluate_single(code, win_start, d, cfg, explain=False)
                 if not res.get('pass'):
                     continue
                 # 入场日期与价格
@@ -124,18 +163,23 @@ class Backtester:
                     entry_price = self._get_price_on(code, entry_date, 'close')
                 if entry_price is None:
                     continue
-                score = self._calc_score(res.get('checks', {}), cfg, weights)
-                day_candidates.append((code, entry_date, entry_price, score, res.get('checks', {})))
-            # 排序并按top_k限制
-            if top_k_per_day and top_k_per_day > 0 and len(day_candidates) > top_k_per_day:
-                day_candidates.sort(key=lambda x: x[3], reverse=True)
-                day_candidates = day_candidates[:top_k_per_day]
+                day_candidates.append((code, entry_date, entry_price, res.get('checks', {})))
+            if not day_candidates:
+                continue
+            # 当日候选一次性打分（先保留 3 位小数，浮点尾差不打破同分），并按top_k取前K（argpartition，无需全排序）
+            checks_mat = np.array([[bool(c[3].get(r, True)) for r in SCORE_RULES] for c in day_candidates], dtype=bool)
+            scores = score_array(checks_mat, cfg, weights, decimals=3)
+            keep = top_k_indices(scores, top_k_per_day) if top_k_per_day and top_k_per_day > 0 else range(len(day_candidates))
+            day_candidates = [(*day_candidates[j][:3], float(scores[j]), day_candidates[j][3]) for j in keep]
             # 计算前瞻收益（从入场日起往后n日）
             for code, entry_date, entry_price, score, checks in day_candidates:
                 fwd = self._get_forward_price(code, entry_date, forward_n, 'open' if exit_mode == 'open' else 'close')
                 if not fwd:
                     continue
                 exit_date, exit_price = fwd
+                # 持有期内除权：离场价按复权因子折算到入场日口径（与面板回测的复权价格一致）
+                if adjusted:
+                    exit_price *= self._factor_ratio(code, entry_date, exit_date)
                 raw_ret = (exit_price - entry_price) / entry_price * 100.0
                 fee_pct = 2.0 * fee_single_side_bps / 10.0  # 单边‰ 转为百分比并双边
                 ret_after_fee = raw_ret - fee_pct
@@ -152,35 +196,7 @@ class Backtester:
                     'passed': True,
                 })
         signals = pd.DataFrame(records)
-        if signals.empty:
-            return BacktestResult(signals=signals, summary={
-                'signals': 0,
-                'win_rate': 0.0,
-                'avg_ret': 0.0,
-                'median_ret': 0.0,
-                'avg_ret_after_fee': 0.0,
-                'mdd': 0.0,
-                'period': (start, end),
-            })
-        # 统计
-        wins = (signals['ret_pct_after_fee'] > 0).sum()
-        total = len(signals)
-        avg_ret = float(signals['ret_pct'].mean())
-        med_ret = float(signals['ret_pct'].median())
-        avg_ret_fee = float(signals['ret_pct_after_fee'].mean())
-        # 简单资金曲线（按信号顺序串行叠加）
-        eq = (1.0 + signals['ret_pct_after_fee'] / 100.0).cumprod()
-        roll_max = eq.cummax()
-        dd = (eq / roll_max - 1.0)
-        mdd = float(dd.min()) * 100.0 if not dd.empty else 0.0
-        summary = {
-            'signals': total,
-            'win_rate': round(wins / total * 100.0, 2),
-            'avg_ret': round(avg_ret, 3),
-            'median_ret': round(med_ret, 3),
-            'avg_ret_after_fee': round(avg_ret_fee, 3),
-            'mdd': round(mdd, 2),
-            'period': (start, end),
+        summary = summarize_signals(signals, start, end, {
             'lookback_days': lookback_days,
             'forward_n': forward_n,
             'fee_single_side_bps': fee_single_side_bps,
@@ -189,5 +205,5 @@ class Backtester:
             'exit_mode': exit_mode,
             'exclude_limit_up': exclude_limit_up,
             'limit_up_threshold': limit_up_threshold,
-        }
+        })
         return BacktestResult(signals=signals, summary=summary)
@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.panel import Panel
+
+
+@dataclass
+class Benchmark:
+    """与面板行对齐的基准行情，用于计算超额收益。
+
+    - open/close：(日期 × 基准指数) 数组，行与面板相同；指数缺失的交易日沿用前值，开盘缺失时取前一日收盘
+    - cols：每只股票（面板列）对应的基准列号，无基准为 -1
+    对齐在构建时完成一次，回测中只做整数下标取值。
+    """
+    name: str
+    open: np.ndarray
+    close: np.ndarray
+    cols: np.ndarray
+
+    @classmethod
+    def from_frames(cls, panel: Panel, closes: pd.DataFrame, opens: Optional[pd.DataFrame] = None,
+                    member_map: Optional[Mapping[str, str]] = None, index_code: Optional[str] = None,
+                    name: Optional[str] = None) -> "Benchmark":
+        """closes/opens：(trade_date × index_code) 宽表。
+        member_map 为 {无后缀代码: index_code} 时按所属行业指数；index_code 为统一基准，
+        二者同时给出时 index_code 作为无行业归属股票的兜底。"""
+        close = closes.reindex(panel.index).ffill() if not closes.empty else pd.DataFrame(index=panel.index)
+        if opens is not None and not opens.empty:
+            open_ = opens.reindex(index=panel.index, columns=close.columns)
+            open_ = open_.fillna(close.shift(1)).fillna(close)
+        else:
+            open_ = close.shift(1).fillna(close)
+        col_of = {c: i for i, c in enumerate(close.columns)}
+        default = col_of.get(index_code, -1) if index_code else -1
+        mapping = member_map or {}
+        cols = np.array([col_of.get(mapping.get(str(c).split('.')[0]), default) for c in panel.codes], dtype=np.int64)
+        return cls(name=name or index_code or "industry", open=open_.to_numpy(dtype=float),
+                   close=close.to_numpy(dtype=float), cols=cols)
+
+    def prices(self, field: str, rows: np.ndarray, code_cols: np.ndarray) -> np.ndarray:
+        """取 (rows, 面板列 code_cols) 处对应基准的价格；无基准或行号 < 0 处为 NaN。"""
+        arr = self.open if field == "open" else self.close
+        bcol = self.cols[code_cols]
+        ok = (bcol >= 0) & (rows >= 0)
+        if arr.size == 0:
+            return np.full(np.broadcast(rows, bcol).shape, np.nan)
+        return np.where(ok, arr[np.maximum(rows, 0), np.maximum(bcol, 0)], np.nan)
+
+    def holding_return(self, entry_rows: np.ndarray, exit_rows: np.ndarray, code_cols: np.ndarray,
+                       entry_field: str = "close", exit_field: str = "close") -> np.ndarray:
+        """与个股相同持有窗口（同入场/离场行与成交价位）上的基准收益率（%）。"""
+        e = self.prices(entry_field, entry_rows, code_cols)
+        x = self.prices(exit_field, exit_rows, code_cols)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (x - e) / e * 100.0
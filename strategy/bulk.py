@@ -0,0 +1,207 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.cross_section import xs_condition, xs_field
+from strategy.panel import IndicatorCache
+from strategy.selector import StrategyConfig, RULE_ENABLED, DEFAULT_RULE_ORDER
+
+
+class BulkEvaluator:
+    """面板级规则评估：把 StockSelector 的八类原子规则改写为整张宽表上的向量化布尔运算。
+
+    - 指标来自 IndicatorCache，多个配置共享同一份中间结果
+    - rule_frames 返回每条已启用规则的 (行 × 代码) 布尔表
+    - checks_at 取某一行得到 (代码 × 规则) 的检查矩阵，供选股/评分使用
+    在 bars 对齐的面板上按最后一行评估时，结果与 StockSelector.evaluate_single 一致。
+    """
+    def __init__(self, cache: IndicatorCache):
+        self.cache = cache
+        self.panel = cache.panel
+
+    # ====== 各规则 ======
+    def _price(self, cfg: StrategyConfig) -> pd.DataFrame:
+        close = self.panel["close"]
+        ok = close.notna()
+        if cfg.price_min is not None:
+            ok &= close >= cfg.price_min
+        if cfg.price_max is not None:
+            ok &= close <= cfg.price_max
+        return ok
+
+    def _volume(self, cfg: StrategyConfig) -> pd.DataFrame:
+        p = self.panel
+        ratio = p["vol"] / np.maximum(self.cache.vol_ma(cfg.volume_ma_days), 1e-6)
+        ok = pd.DataFrame(True, index=ratio.index, columns=ratio.columns)
+        if cfg.volume_mode == 'volume_breakout':
+            if cfg.volume_ratio_min is not None:
+                ok &= ratio >= cfg.volume_ratio_min
+        elif cfg.volume_mode == 'volume_pullback':
+            if cfg.volume_ratio_max is not None:
+                ok &= ratio <= cfg.volume_ratio_max
+            if cfg.pullback_require_red:
+                ok &= p["close"] < p["open"]
+            if cfg.pullback_touch_ma:
+                ma_s = self.cache.ma(cfg.pullback_touch_ma)
+                near = (p["close"] - ma_s).abs() / np.maximum(ma_s.abs(), 1e-6) < 0.01
+                touched = ((p["low"] <= ma_s) & (ma_s <= p["high"])) | near
+                ok &= touched
+        return ok
+
+    def _ma(self, cfg: StrategyConfig) -> pd.DataFrame:
+        close = self.panel["close"]
+        ok = pd.DataFrame(True, index=close.index, columns=close.columns)
+        # 与 StockSelector 口径一致：price_above_ma 仅在其属于 ma_days 时生效
+        if cfg.price_above_ma and cfg.price_above_ma in cfg.ma_days:
+            ok &= close >= self.cache.ma(cfg.price_above_ma)
+        if cfg.ma_alignment in ('long', 'short'):
+            ordered = sorted(cfg.ma_days)
+            for a, b in zip(ordered, ordered[1:]):
+                if cfg.ma_alignment == 'long':
+                    ok &= self.cache.ma(a) >= self.cache.ma(b)
+                else:
+                    ok &= self.cache.ma(a) <= self.cache.ma(b)
+        return ok
+
+    def _range(self, cfg: StrategyConfig, lookback: Optional[int]) -> pd.DataFrame:
+        close = self.panel["close"]
+        count = self.cache.bar_count()
+        ok = pd.DataFrame(True, index=close.index, columns=close.columns)
+        if cfg.range_increase_min_pct is not None:
+            if cfg.range_increase_days is None:
+                # 参考价为回看窗口（按交易日）内该股的首根K线：窗口起点停牌时取其后第一根；
+                # 滚动窗口历史不足时退化为面板首个收盘价
+                first = pd.DataFrame(np.broadcast_to(self.cache.first_close().values, close.shape),
+                                     index=close.index, columns=close.columns)
+                ref = close.bfill().shift(lookback - 1).combine_first(first) if lookback else first
+            else:
+                # N 根K线前的收盘价（停牌日不计）
+                ok &= count >= cfg.range_increase_days
+                ref = self.cache.shift_bars("close", int(cfg.range_increase_days) - 1)
+            chg = (close - ref) / np.maximum(ref, 1e-6) * 100
+            ok &= chg >= cfg.range_increase_min_pct
+        if cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None:
+            ok &= self.cache.pct_chg_max(cfg.exists_day_increase_within_days) >= cfg.exists_day_increase_min_pct
+        if cfg.last_pct_chg_min is not None:
+            ok &= self.panel["pct_chg"] >= cfg.last_pct_chg_min
+        if cfg.limit_up_streak_min:
+            ok &= self.cache.limit_up_streak() >= cfg.limit_up_streak_min
+        return ok
+
+    def _pattern(self, cfg: StrategyConfig) -> pd.DataFrame:
+        params_key = tuple(sorted((k, tuple(sorted(v.items()))) for k, v in (cfg.pattern_params or {}).items()))
+        frames = self.cache.patterns(tuple(cfg.enable_patterns), params_key, cfg.pattern_params or {})
+        close = self.panel["close"]
+        hit = pd.DataFrame(False, index=close.index, columns=close.columns)
+        for m in frames.values():
+            hit |= m
+        window = max(int(cfg.pattern_window), 1)
+        # 最近 window 根K线内出现过形态（停牌日不计）
+        return self.cache.per_bar(lambda h: h.rolling(window, min_periods=1).max(), hit.astype(float)) > 0
+
+    def _breakout(self, cfg: StrategyConfig) -> pd.DataFrame:
+        n = int(cfg.breakout_n)
+        prev_high = self.cache.prev_high_max(n)
+        ok = self.cache.bar_count() >= n + 1
+        return ok & (self.panel["close"] >= prev_high * (1 + (cfg.breakout_min_pct or 0) / 100.0))
+
+    def _atr(self, cfg: StrategyConfig) -> pd.DataFrame:
+        close = self.panel["close"]
+        atr_s = self.cache.atr(cfg.atr_period)
+        return (close != 0) & (atr_s / close.where(close != 0) * 100.0 <= cfg.atr_max_pct_of_price)
+
+    def _macd(self, cfg: StrategyConfig) -> pd.DataFrame:
+        dif, dea, hist = self.cache.macd(cfg.macd_fast, cfg.macd_slow, cfg.macd_signal)
+        rule = cfg.macd_rule or 'hist>0'
+        if rule == 'dif>dea':
+            return dif > dea
+        if rule == '金叉':
+            # 前一根K线（停牌日不计）
+            prev_dif = self.cache.per_bar(lambda d: d.shift(1), dif)
+            prev_dea = self.cache.per_bar(lambda d: d.shift(1), dea)
+            return (prev_dif <= prev_dea) & (dif > dea)
+        return hist > 0
+
+    def _rsi(self, cfg: StrategyConfig) -> pd.DataFrame:
+        r = self.cache.rsi(cfg.rsi_period)
+        # 与 _rsi_signal 一致：RSI 为 NaN 时不因阈值判否（停牌行由 valid_mask 排除）
+        ok = pd.DataFrame(True, index=r.index, columns=r.columns)
+        if cfg.rsi_min is not None:
+            ok &= ~(r < cfg.rsi_min)
+        if cfg.rsi_max is not None:
+            ok &= ~(r > cfg.rsi_max)
+        return ok
+
+    def _xsrank(self, cfg: StrategyConfig) -> pd.DataFrame:
+        # 截面排名依赖全市场数据，由服务层从 xs_rank 特征库附加到面板（KlineRepository.attach_xs_ranks）
+        scope = cfg.xs_scope or "market"
+        pct = self.panel.fields.get(xs_field(cfg.xs_feature, scope, "pct"))
+        rank = self.panel.fields.get(xs_field(cfg.xs_feature, scope, "rank"))
+        if pct is None or rank is None:
+            raise ValueError(f"面板未附加截面排名: {cfg.xs_feature}/{scope}")
+        return pd.DataFrame(xs_condition(cfg, pct.to_numpy(), rank.to_numpy()), index=pct.index, columns=pct.columns)
+
+    # ====== 对外接口 ======
+    def warm(self, cfg: StrategyConfig) -> None:
+        """预先计算 cfg 已启用规则所依赖的指标（不生成规则布尔表），
+        用于在分发到多进程前把公共中间结果算好。"""
+        c = self.cache
+        c.bar_count()
+        if RULE_ENABLED["volume"](cfg):
+            c.vol_ma(cfg.volume_ma_days)
+            if cfg.volume_mode == 'volume_pullback' and cfg.pullback_touch_ma:
+                c.ma(cfg.pullback_touch_ma)
+        if RULE_ENABLED["ma"](cfg):
+            for n in cfg.ma_days:
+                c.ma(n)
+        if RULE_ENABLED["range"](cfg):
+            c.first_close()
+            if cfg.exists_day_increase_within_days:
+                c.pct_chg_max(cfg.exists_day_increase_within_days)
+            if cfg.limit_up_streak_min:
+                c.limit_up_streak()
+        if RULE_ENABLED["pattern"](cfg):
+            self._pattern(cfg)
+        if RULE_ENABLED["breakout"](cfg):
+            c.prev_high_max(int(cfg.breakout_n))
+        if RULE_ENABLED["atr"](cfg):
+            c.atr(cfg.atr_period)
+        if RULE_ENABLED["macd"](cfg):
+            c.macd(cfg.macd_fast, cfg.macd_slow, cfg.macd_signal)
+        if RULE_ENABLED["rsi"](cfg):
+            c.rsi(cfg.rsi_period)
+
+    def valid_mask(self) -> pd.DataFrame:
+        """当行有K线且累计至少 3 根（与 evaluate_single 的 no_data 判定一致）。"""
+        return self.panel["close"].notna() & (self.cache.bar_count() >= 3)
+
+    def rule_frames(self, cfg: StrategyConfig, lookback: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """返回已启用规则的布尔宽表；lookback 为滚动窗口长度（None 表示整个面板）。"""
+        funcs = {
+            "price": lambda: self._price(cfg),
+            "volume": lambda: self._volume(cfg),
+            "ma": lambda: self._ma(cfg),
+            "range": lambda: self._range(cfg, lookback),
+            "pattern": lambda: self._pattern(cfg),
+            "breakout": lambda: self._breakout(cfg),
+            "atr": lambda: self._atr(cfg),
+            "macd": lambda: self._macd(cfg),
+            "rsi": lambda: self._rsi(cfg),
+            "xsrank": lambda: self._xsrank(cfg),
+        }
+        return {name: funcs[name]() for name in DEFAULT_RULE_ORDER if RULE_ENABLED[name](cfg)}
+
+    def checks_at(self, cfg: StrategyConfig, row: int = -1, lookback: Optional[int] = None) -> pd.DataFrame:
+        """取第 row 行，返回 index=代码、列=全部规则 + pass 的布尔检查矩阵。
+        未启用规则恒为 True；无有效数据的代码 pass=False。"""
+        codes = self.panel.codes
+        out = pd.DataFrame(True, index=codes, columns=list(DEFAULT_RULE_ORDER))
+        if len(self.panel.index) == 0:
+            out["pass"] = False
+            return out
+        for name, frame in self.rule_frames(cfg, lookback).items():
+            out[name] = frame.iloc[row].reindex(codes).fillna(False).astype(bool).values
+        valid = self.valid_mask().iloc[row].reindex(codes).fillna(False).astype(bool)
+        out["pass"] = out[DEFAULT_RULE_ORDER].all(axis=1) & valid
+        return out
@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.panel import Panel
+
+# 分块计算时每块的列数：单块中间结果为 (块 × 全体) float32，5000 只约 20MB
+CORR_BLOCK = 1000
+
+
+def normalized_returns(panel: Panel, window: int, min_obs: Optional[int] = None) -> tuple:
+    """calendar 面板最后 window 个交易日的日收益，逐列去均值并缩放到单位范数（float32）。
+    返回 (代码, (window × 代码) 矩阵)；有效收益数不足 min_obs（默认 window 的 80%）或无波动的代码被剔除。
+    缺失收益（停牌）记为 0，即按该股窗口均值处理：数据完整时列向量点积即 Pearson 相关系数，
+    有缺失时相关性略向 0 收缩。"""
+    close = panel["close"]
+    n = int(window)
+    min_obs = int(min_obs if min_obs is not None else max(int(n * 0.8), 2))
+    ret = (close / close.ffill().shift(1) - 1.0).iloc[-n:].to_numpy(dtype=np.float64)
+    ok = np.isfinite(ret)
+    cnt = ok.sum(axis=0)
+    mean = np.where(ok, ret, 0.0).sum(axis=0) / np.maximum(cnt, 1)
+    z = np.where(ok, ret - mean, 0.0)
+    norm = np.sqrt((z * z).sum(axis=0))
+    keep = (cnt >= min_obs) & (norm > 0)
+    z = (z[:, keep] / norm[keep]).astype(np.float32)
+    return close.columns[keep], z
+
+
+def blocked_corr(z: np.ndarray, block: int = CORR_BLOCK) -> np.ndarray:
+    """单位化收益矩阵 z (T × N) -> N × N 相关矩阵（float32）。
+    按列分块做矩阵乘法写入预分配的结果，峰值内存 ≈ 结果本身 + 一块。"""
+    n = z.shape[1]
+    out = np.empty((n, n), dtype=np.float32)
+    step = max(int(block), 1)
+    for i in range(0, n, step):
+        np.matmul(z[:, i:i + step].T, z, out=out[i:i + step])
+    np.clip(out, -1.0, 1.0, out=out)
+    np.fill_diagonal(out, 1.0)
+    return out
+
+
+@dataclass
+class CorrelationMatrix:
+    """窗口截止日 end_date 的滚动收益相关矩阵。z 为单位化收益（聚类用），matrix 为 N × N float32。"""
+    end_date: str
+    window: int
+    codes: pd.Index
+    matrix: np.ndarray
+    z: np.ndarray
+
+    @classmethod
+    def from_panel(cls, panel: Panel, window: int, min_obs: Optional[int] = None,
+                   block: int = CORR_BLOCK) -> "CorrelationMatrix":
+        codes, z = normalized_returns(panel, window, min_obs)
+        end = str(panel.index[-1]) if len(panel.index) else ""
+        return cls(end_date=end, window=int(window), codes=codes, matrix=blocked_corr(z, block), z=z)
+
+    def _pos(self, codes) -> np.ndarray:
+        """代码 -> 矩阵下标（缺失为 -1），带后缀与不带后缀的代码均可。"""
+        codes = [str(c) for c in codes]
+        pos = self.codes.get_indexer(pd.Index(codes, dtype=object))
+        if (pos < 0).any():
+            bare = {str(c).split('.')[0]: i for i, c in enumerate(self.codes)}
+            pos = np.array([p if p >= 0 else bare.get(c.split('.')[0], -1) for p, c in zip(pos, codes)])
+        return pos
+
+    def most_correlated(self, code: str, k: int = 10, ascending: bool = False) -> List[Dict[str, object]]:
+        """与 code 相关性最高（ascending=True 时最低）的 k 只股票。"""
+        i = int(self._pos([code])[0])
+        if i < 0:
+            return []
+        row = self.matrix[i].astype(np.float64)
+        row[i] = np.inf if ascending else -np.inf
+        order = np.argsort(row if ascending else -row, kind="stable")[:max(int(k), 0)]
+        return [{"ts_code": str(self.codes[j]), "corr": round(float(row[j]), 4)} for j in order]
+
+    def sub_matrix(self, codes) -> np.ndarray:
+        """按给定代码顺序取子矩阵；不在矩阵中的代码与其他代码的相关性记为 0。"""
+        pos = self._pos(codes)
+        ok = pos >= 0
+        safe = np.maximum(pos, 0)
+        sub = self.matrix[np.ix_(safe, safe)]
+        sub = np.where(ok[:, None] & ok[None, :], sub, 0.0)
+        np.fill_diagonal(sub, 1.0)
+        return sub
+
+    def clusters(self, n_clusters: int = 20, n_iter: int = 50, seed: int = 0) -> pd.Series:
+        """按收益共振聚类：单位化收益向量上的球面 k-means（相似度即相关系数），
+        k-means++ 初始化，每轮一次 (N × T) @ (T × k) 的矩阵乘法。返回 {代码: 簇号}，簇号按簇大小降序编号。"""
+        z = self.z
+        n = z.shape[1]
+        k = max(min(int(n_clusters), n), 1) if n else 0
+        if k == 0:
+            return pd.Series(dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        centers = [int(rng.integers(n))]
+        best = z.T @ z[:, centers[0]]
+        for _ in range(1, k):
+            # 距离取 1 - 相关系数，按距离平方加权抽样下一个中心
+            d = np.maximum(1.0 - best, 0.0) ** 2
+            total = d.sum()
+            nxt = int(rng.choice(n, p=d / total)) if total > 0 else int(rng.integers(n))
+            centers.append(nxt)
+            best = np.maximum(best, z.T @ z[:, nxt])
+        c = z[:, centers].astype(np.float64)
+        labels = np.full(n, -1)
+        for _ in range(int(n_iter)):
+            new = np.argmax(z.T @ c, axis=1)
+            if np.array_equal(new, labels):
+                break
+            labels = new
+            sums = np.zeros((z.shape[0], k))
+            np.add.at(sums.T, labels, z.T)
+            norm = np.linalg.norm(sums, axis=0)
+            # 空簇保留原中心
+            c = np.where(norm > 0, sums / np.where(norm > 0, norm, 1.0), c)
+        sizes = np.bincount(labels, minlength=k)
+        relabel = np.empty(k, dtype=np.int64)
+        relabel[np.argsort(-sizes, kind="stable")] = np.arange(k)
+        return pd.Series(relabel[labels], index=self.codes, name="cluster")
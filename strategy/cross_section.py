@@ -0,0 +1,139 @@
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.panel import Panel
+
+# 截面排名特征：ret_N = N 日收盘涨幅（%），其余直接取 daily_kline 同名字段
+XS_BASE_FEATURES: Dict[str, str] = {"turnover": "turnover_rate", "amplitude": "amplitude", "volume_ratio": "volume_ratio"}
+DEFAULT_XS_FEATURES: Tuple[str, ...] = ("ret_5", "ret_20", "ret_60", "turnover", "amplitude", "volume_ratio")
+# 计算特征所需的 daily_kline 字段
+XS_FIELDS: List[str] = ["close", *XS_BASE_FEATURES.values()]
+XS_SCOPES = ("market", "industry")
+# 百分位以整数存储（0~10000，即万分位），排名为降序名次（1 = 截面最大值）
+PCT_SCALE = 10000
+
+_RET_RE = re.compile(r"^ret_(\d+)$")
+
+
+def parse_feature(name: str) -> Tuple[str, int]:
+    """特征名 -> (源字段, 收益窗口)；窗口为 0 表示直接取字段值。未知特征抛 ValueError。"""
+    m = _RET_RE.match(str(name))
+    if m and int(m.group(1)) > 0:
+        return "close", int(m.group(1))
+    if name in XS_BASE_FEATURES:
+        return XS_BASE_FEATURES[name], 0
+    raise ValueError(f"未知的截面特征: {name}")
+
+
+def warmup_rows(features: Iterable[str]) -> int:
+    """计算这些特征需要的前置交易日数。"""
+    return max([parse_feature(f)[1] for f in features] or [0])
+
+
+def feature_frame(panel: Panel, name: str) -> pd.DataFrame:
+    """calendar 面板上的特征宽表；ret_N 按个股自身K线计数（停牌日跳过）。"""
+    field, n = parse_feature(name)
+    if n == 0:
+        return panel[field]
+    close = panel["close"]
+    arr = close.to_numpy(dtype=float)
+    valid = np.isfinite(arr)
+    # 有效K线按 (代码, 行) 展平，N 根前的收盘价即展平位置 -N（同一只股票内）
+    cols, rows = np.nonzero(valid.T)
+    flat = arr[rows, cols]
+    n_per_code = valid.sum(axis=0)
+    pos_in_code = np.arange(len(rows)) - np.repeat(np.cumsum(n_per_code) - n_per_code, n_per_code)
+    has_prev = pos_in_code >= n
+    out = np.full(arr.shape, np.nan)
+    cur = np.flatnonzero(has_prev)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[rows[cur], cols[cur]] = (flat[cur] / flat[cur - n] - 1.0) * 100.0
+    return pd.DataFrame(out, index=close.index, columns=close.columns)
+
+
+def rank_frames(values: pd.DataFrame, groups: Optional[pd.Series] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """逐日截面排名：返回 (百分位 0~1，降序名次)。groups 为 {代码: 组}（如行业）时按组内排名，
+    无组别的代码为 NaN。组内排名对转置后的宽表做一次 groupby rank，不逐日循环。"""
+    if groups is None:
+        return values.rank(axis=1, pct=True), values.rank(axis=1, ascending=False, method="min")
+    g = groups.reindex(values.columns)
+    t = values.T[g.notna().to_numpy()]
+    by = g[g.notna()].to_numpy()
+    grouped = t.groupby(by, sort=False)
+    pct = grouped.rank(pct=True).T.reindex(columns=values.columns)
+    rank = grouped.rank(ascending=False, method="min").T.reindex(columns=values.columns)
+    return pct, rank
+
+
+def compute_ranks(panel: Panel, features: Iterable[str], industry: Optional[Mapping[str, str]] = None,
+                  dates: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """全市场 calendar 面板 -> 长表 (trade_date, feature, ts_code, pct, ind_pct, rank, ind_rank)。
+    industry：{无后缀代码: 行业}；dates 只决定输出哪些行，面板需含 warmup_rows 个前置交易日。"""
+    if panel.align != "calendar":
+        raise ValueError("截面排名需要 calendar 对齐的面板")
+    index = np.asarray(panel.index)
+    keep = np.isin(index, np.asarray(list(dates), dtype=object)) if dates is not None else np.ones(len(index), bool)
+    codes = panel.codes
+    groups = None
+    if industry:
+        groups = pd.Series([industry.get(str(c).split('.')[0]) for c in codes], index=codes, dtype=object)
+        groups = groups.where(groups.astype(bool) & groups.notna())
+    parts = []
+    for name in features:
+        values = feature_frame(panel, name).iloc[keep]
+        pct, rank = rank_frames(values)
+        ind_pct, ind_rank = rank_frames(values, groups) if groups is not None else (pct * np.nan, rank * np.nan)
+        ok = values.notna().to_numpy()
+        r, c = np.nonzero(ok)
+        parts.append(pd.DataFrame({
+            "trade_date": values.index.to_numpy()[r],
+            "feature": name,
+            "ts_code": codes.to_numpy()[c],
+            "pct": np.rint(pct.to_numpy()[r, c] * PCT_SCALE),
+            "ind_pct": np.rint(ind_pct.to_numpy()[r, c] * PCT_SCALE),
+            "rank": rank.to_numpy()[r, c],
+            "ind_rank": ind_rank.to_numpy()[r, c],
+        }))
+    if not parts:
+        return pd.DataFrame(columns=["trade_date", "feature", "ts_code", "pct", "ind_pct", "rank", "ind_rank"])
+    return pd.concat(parts, ignore_index=True)
+
+
+# ====== 选股条件 ======
+def xs_enabled(cfg) -> bool:
+    return bool(cfg.xs_feature) and (cfg.xs_pct_min is not None or cfg.xs_pct_max is not None or bool(cfg.xs_top_n))
+
+
+def xs_columns(scope: str) -> Tuple[str, str]:
+    """scope -> (百分位列, 名次列)。"""
+    if scope not in XS_SCOPES:
+        raise ValueError(f"未知的截面排名范围: {scope}")
+    return ("ind_pct", "ind_rank") if scope == "industry" else ("pct", "rank")
+
+
+def xs_field(feature: str, scope: str, kind: str) -> str:
+    """附加到面板上的排名字段名，kind 为 pct / rank。"""
+    return f"xs_{kind}:{feature}:{scope}"
+
+
+def xs_specs(cfgs: Iterable) -> Set[Tuple[str, str]]:
+    """一组配置用到的 (特征, 范围)。"""
+    return {(c.xs_feature, c.xs_scope or "market") for c in cfgs if xs_enabled(c)}
+
+
+def xs_condition(cfg, pct: np.ndarray, rank: np.ndarray) -> np.ndarray:
+    """按配置判定：pct 为存储的万分位、rank 为降序名次；xs_pct_min/max 为 0~100 的百分位。缺失为 False。"""
+    pct = np.asarray(pct, dtype=float)
+    rank = np.asarray(rank, dtype=float)
+    ok = np.isfinite(pct)
+    with np.errstate(invalid="ignore"):
+        if cfg.xs_pct_min is not None:
+            ok &= pct >= float(cfg.xs_pct_min) * PCT_SCALE / 100.0
+        if cfg.xs_pct_max is not None:
+            ok &= pct <= float(cfg.xs_pct_max) * PCT_SCALE / 100.0
+        if cfg.xs_top_n:
+            ok &= np.isfinite(rank) & (rank <= int(cfg.xs_top_n))
+    return ok
@@ -0,0 +1,163 @@
+import warnings
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from strategy.benchmark import Benchmark
+from strategy.panel import IndicatorCache, Panel
+
+
+@dataclass
+class EventStudyResult:
+    """事件研究结果。
+    curve：index=相对事件日的K线偏移 k（-pre..post），列为 n/mean/median/std/t_stat/hit_rate，
+           有基准时另有 excess_mean/excess_median/excess_hit_rate；收益单位为 %
+    paths：(事件 × 偏移) 的累计收益矩阵（%），excess_paths 为相对基准的超额部分
+    """
+    curve: pd.DataFrame
+    events: pd.DataFrame
+    paths: np.ndarray
+    excess_paths: Optional[np.ndarray] = None
+
+    def summary(self) -> Dict[str, object]:
+        post = self.curve[self.curve.index > 0]
+        last = post.iloc[-1] if not post.empty else None
+        return {
+            "events": int(len(self.events)),
+            "codes": int(self.events["ts_code"].nunique()) if not self.events.empty else 0,
+            "horizon": int(post.index[-1]) if last is not None else 0,
+            "mean": None if last is None or pd.isna(last["mean"]) else round(float(last["mean"]), 3),
+            "hit_rate": None if last is None or pd.isna(last["hit_rate"]) else round(float(last["hit_rate"]), 2),
+            "excess_mean": (round(float(last["excess_mean"]), 3)
+                            if last is not None and "excess_mean" in last and pd.notna(last["excess_mean"]) else None),
+        }
+
+
+class EventStudy:
+    """事件研究：给定事件集合（信号/形态出现的 (日期, 代码)），统计事件日前后 -pre..+post 根K线的累计收益。
+
+    - 累计收益以事件日收盘为基准：CR(k) = close[t+k] / close[t] - 1，k 按个股自身K线计数（停牌跳过）
+    - 全部有效K线按 (代码, 行) 展平为一维数组，事件的各偏移只是展平位置 +k，
+      一次 (事件 × 偏移) 的数组下标取值即可得到全部路径，越过该股首末K线处为 NaN
+    - 基准（行业指数或等权市场）在同一批日期上取值，得到超额累计收益
+    """
+    def __init__(self, panel: Panel, cache: Optional[IndicatorCache] = None):
+        if panel.align != "calendar":
+            raise ValueError("EventStudy 需要 calendar 对齐的面板")
+        self.panel = panel
+        self.cache = cache or IndicatorCache(panel)
+
+    # ====== 事件来源 ======
+    def events_from_config(self, cfg, lookback_days: int = 60) -> np.ndarray:
+        """StrategyConfig 全部已启用规则通过的 (日期 × 代码) 布尔数组（与 VectorBacktester 的信号口径一致）。"""
+        from strategy.vector_backtest import VectorBacktester
+        return VectorBacktester(self.panel, self.cache).signal_mask(cfg, lookback_days)
+
+    def events_from_patterns(self, patterns: Iterable[str], params: Optional[Dict] = None) -> np.ndarray:
+        """任一形态出现的 (日期 × 代码) 布尔数组。"""
+        names = tuple(patterns)
+        params = params or {}
+        params_key = tuple(sorted((k, tuple(sorted(v.items()))) for k, v in params.items()))
+        hit = np.zeros(self.panel["close"].shape, dtype=bool)
+        for frame in self.cache.patterns(names, params_key, params).values():
+            hit |= frame.to_numpy(dtype=bool)
+        return hit
+
+    # ====== 基准 ======
+    def market_benchmark(self) -> np.ndarray:
+        """等权市场指数（按当日有K线个股的平均涨跌幅复利），形状 (日期,)。"""
+        def _calc():
+            close = self.panel["close"]
+            ret = (close / close.ffill().shift(1) - 1.0).mean(axis=1).fillna(0.0).to_numpy()
+            return np.cumprod(1.0 + ret)
+        return self.cache.get(("market_benchmark",), _calc)
+
+    # ====== 计算 ======
+    def _flat_bars(self):
+        """有效K线按 (代码, 行) 展平：返回 (收盘, 所在行, 每只股票的起止位置, 行×代码 -> 展平位置)。"""
+        def _calc():
+            close = self.panel["close"].to_numpy(dtype=float)
+            valid = np.isfinite(close)
+            cols, rows = np.nonzero(valid.T)
+            n_per_code = valid.sum(axis=0)
+            ends = np.cumsum(n_per_code)
+            pos = np.full(close.shape, -1, dtype=np.int64)
+            pos[rows, cols] = np.arange(len(rows))
+            return close[rows, cols], rows, ends - n_per_code, ends, pos
+        return self.cache.get(("flat_bars",), _calc)
+
+    def _event_index(self, events) -> tuple:
+        if isinstance(events, pd.DataFrame) and "ts_code" in events:
+            rows = self.panel.index.get_indexer(events["trade_date"].astype(str))
+            cols = self.panel.codes.get_indexer(events["ts_code"])
+            ok = (rows >= 0) & (cols >= 0)
+            return rows[ok], cols[ok]
+        mask = np.asarray(events.to_numpy() if isinstance(events, pd.DataFrame) else events, dtype=bool)
+        return np.nonzero(mask)
+
+    def run(self, events, pre: int = 5, post: int = 20,
+            benchmark: Union[str, Benchmark, None] = None) -> EventStudyResult:
+        """events：(日期 × 代码) 布尔数组/宽表，或含 trade_date、ts_code 列的 DataFrame（如 BacktestResult.signals）。
+        benchmark：None / "market"（等权市场）/ Benchmark（行业或指定指数，无基准的股票退化为等权市场）。"""
+        close_flat, row_flat, starts, ends, pos = self._flat_bars()
+        rows, cols = self._event_index(events)
+        p = pos[rows, cols]
+        keep = p >= 0
+        rows, cols, p = rows[keep], cols[keep], p[keep]
+        offsets = np.arange(-int(pre), int(post) + 1)
+
+        idx = p[:, None] + offsets[None, :]
+        inside = (idx >= starts[cols][:, None]) & (idx < ends[cols][:, None])
+        idx = np.where(inside, idx, p[:, None])
+        base = close_flat[p][:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            paths = np.where(inside, close_flat[idx] / base - 1.0, np.nan) * 100.0
+
+        excess = None
+        if benchmark:
+            at_rows = row_flat[idx]
+            market = self.market_benchmark()
+            bench = market[at_rows]
+            bench_base = market[rows][:, None]
+            if isinstance(benchmark, Benchmark):
+                ind_val = benchmark.prices("close", at_rows, cols[:, None])
+                ind_base = benchmark.prices("close", rows, cols)[:, None]
+                use = np.isfinite(ind_val) & np.isfinite(ind_base)
+                bench = np.where(use, ind_val, bench)
+                bench_base = np.where(use, ind_base, bench_base)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                excess = paths - (bench / bench_base - 1.0) * 100.0
+
+        curve = _curve(paths, offsets)
+        if excess is not None:
+            ex = _curve(excess, offsets)
+            curve["excess_mean"] = ex["mean"]
+            curve["excess_median"] = ex["median"]
+            curve["excess_hit_rate"] = ex["hit_rate"]
+        ev = pd.DataFrame({"trade_date": np.asarray(self.panel.index)[rows], "ts_code": np.asarray(self.panel.codes)[cols]})
+        return EventStudyResult(curve=curve, events=ev, paths=paths, excess_paths=excess)
+
+
+def _curve(paths: np.ndarray, offsets: np.ndarray) -> pd.DataFrame:
+    """逐偏移的截面统计（忽略 NaN）。"""
+    ok = np.isfinite(paths)
+    n = ok.sum(axis=0)
+    safe = np.maximum(n, 1)
+    filled = np.where(ok, paths, 0.0)
+    mean = filled.sum(axis=0) / safe
+    dev = np.where(ok, paths - mean, 0.0)
+    std = np.sqrt((dev * dev).sum(axis=0) / np.maximum(n - 1, 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_stat = np.where((n > 1) & (std > 0), mean / (std / np.sqrt(safe)), np.nan)
+    hit = ((paths > 0) & ok).sum(axis=0) / safe * 100.0
+    median = np.full(len(offsets), np.nan)
+    if paths.shape[0]:
+        with warnings.catch_warnings():
+            # 全为 NaN 的偏移（事件都在面板边缘）不告警
+            warnings.simplefilter("ignore", RuntimeWarning)
+            median = np.nanmedian(paths, axis=0)
+    df = pd.DataFrame({"n": n, "mean": mean, "median": median, "std": std, "t_stat": t_stat, "hit_rate": hit},
+                      index=pd.Index(offsets, name="offset"))
+    return df.where(df["n"] > 0).assign(n=n).round({"mean": 3, "median": 3, "std": 3, "t_stat": 3, "hit_rate": 2})
@@ -0,0 +1,245 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.analytics import _r
+from strategy.indicators import percent_distance_to
+from strategy.panel import IndicatorCache, Panel
+
+# IC 衰减默认考察的持有期（K线数，按个股自身K线计数）
+DEFAULT_IC_HORIZONS = (1, 2, 3, 5, 10, 20)
+DEFAULT_FACTORS = ("rsi_14", "ma_dist_20", "vol_ratio_5", "atr_pct_14", "ret_20")
+# 单日截面有效样本少于该数时不计算当日 IC
+MIN_CROSS_SECTION = 20
+
+# 连续因子：名称模式 -> (所需面板字段, 计算函数(cache, n) -> 宽表, 预热K线数(n))
+_FACTORS: List[Tuple[re.Pattern, Tuple[str, ...], Callable, Callable[[int], int]]] = []
+
+
+def _factor(pattern: str, fields: Tuple[str, ...], warmup: Callable[[int], int] = lambda n: n):
+    def deco(fn):
+        _FACTORS.append((re.compile(pattern), fields, fn, warmup))
+        return fn
+    return deco
+
+
+@_factor(r"^rsi_(\d+)$", ("close",), lambda n: 3 * n)
+def _rsi(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    return cache.rsi(n)
+
+
+@_factor(r"^ma_dist_(\d+)$", ("close",))
+def _ma_dist(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    """收盘价相对 n 日均线的偏离（%）。"""
+    return percent_distance_to(cache.panel["close"], cache.ma(n))
+
+
+@_factor(r"^ema_dist_(\d+)$", ("close",), lambda n: 3 * n)
+def _ema_dist(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    return percent_distance_to(cache.panel["close"], cache.ema(n))
+
+
+@_factor(r"^vol_ratio_(\d+)$", ("vol",), lambda n: n + 1)
+def _vol_ratio(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    """当日成交量 / 前 n 日均量。"""
+    prior = cache.get(("vol_ma_prior", n), lambda: cache.panel["vol"].shift(1).rolling(n, min_periods=n).mean())
+    return cache.panel["vol"] / prior.where(prior > 0)
+
+
+@_factor(r"^atr_pct_(\d+)$", ("high", "low", "close"), lambda n: 3 * n)
+def _atr_pct(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    """ATR 占收盘价的百分比。"""
+    close = cache.panel["close"]
+    return cache.atr(n) / close.where(close > 0) * 100.0
+
+
+@_factor(r"^ret_(\d+)$", ("close",))
+def _ret(cache: IndicatorCache, n: int) -> pd.DataFrame:
+    from strategy.cross_section import feature_frame
+    return cache.get(("ret", n), lambda: feature_frame(cache.panel, f"ret_{n}"))
+
+
+@_factor(r"^(turnover_rate|amplitude|volume_ratio|pct_chg)$", ())
+def _field(cache: IndicatorCache, name: str) -> pd.DataFrame:
+    return cache.panel[name]
+
+
+def _resolve(name: str):
+    for pattern, fields, fn, warmup in _FACTORS:
+        m = pattern.match(str(name))
+        if m:
+            arg = m.group(1)
+            if arg.isdigit():
+                return fn, int(arg), fields, warmup(int(arg))
+            return fn, arg, (arg,), 0
+    raise ValueError(f"未知的因子: {name}")
+
+
+def factor_fields(factors: Iterable[str]) -> List[str]:
+    """计算这些因子需要加载的面板字段（总含 close，用于远期收益）。"""
+    fields = {"close"}
+    for f in factors:
+        fields.update(_resolve(f)[2])
+    return sorted(fields)
+
+
+def warmup_rows(factors: Iterable[str]) -> int:
+    """这些因子需要的前置K线数。"""
+    return max([_resolve(f)[3] for f in factors] or [0])
+
+
+def _rank_rows(values: np.ndarray) -> np.ndarray:
+    """逐行截面排名（平均秩，NaN 不参与）。"""
+    return pd.DataFrame(values).rank(axis=1).to_numpy()
+
+
+def _rank_parts(ranks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """秩矩阵 -> (有效掩码, 缺失补 0 的秩)，float32 存储（秩为半整数且不超过代码数，可精确表示）。"""
+    return np.isfinite(ranks).astype(np.float32), np.nan_to_num(ranks, nan=0.0).astype(np.float32)
+
+
+def _row_corr(a: Tuple[np.ndarray, np.ndarray], b: Tuple[np.ndarray, np.ndarray],
+              min_obs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """逐行 Pearson 相关系数（只用两者均有效的位置），a/b 为 _rank_parts 的结果；返回 (相关系数, 样本数)。
+    各项和都是一次逐行点积（einsum 按 float64 累加，不生成中间数组）：缺失位置补 0 后乘以对方的有效掩码即为共同样本上的和。"""
+    ok_a, a0 = a
+    ok_b, b0 = b
+
+    def dot(*ops):
+        return np.einsum(",".join(["ij"] * len(ops)) + "->i", *ops, dtype=np.float64)
+
+    n = dot(ok_a, ok_b)
+    sa, sb = dot(a0, ok_b), dot(b0, ok_a)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * dot(a0, b0) - sa * sb
+        var_a = np.maximum(n * dot(a0, a0, ok_b) - sa * sa, 0.0)
+        var_b = np.maximum(n * dot(b0, b0, ok_a) - sb * sb, 0.0)
+        den = np.sqrt(var_a * var_b)
+        corr = np.where((n >= min_obs) & (den > 0), cov / den, np.nan)
+    return corr, n.astype(np.int64)
+
+
+@dataclass
+class FactorICResult:
+    """因子 IC 分析结果。
+    summary：每个 (因子, 持有期) 一行：ic_mean / ic_std / icir / t_stat / pos_ratio / days
+    ic：主持有期的逐日 Rank IC（index=交易日，列为因子）
+    quantiles：每个因子一行，q1..qN 为按因子值分组后主持有期的日均远期收益（%，q1 为因子值最小组），spread = qN - q1
+    """
+    summary: pd.DataFrame
+    ic: pd.DataFrame
+    quantiles: pd.DataFrame
+    horizon: int
+
+    def decay(self) -> pd.DataFrame:
+        """IC 衰减：index=持有期，列为因子的 IC 均值。"""
+        return self.summary.pivot(index="horizon", columns="factor", values="ic_mean")
+
+
+class FactorAnalyzer:
+    """连续因子的截面预测力分析（Rank IC）。
+
+    - 因子为面板上的宽表（见 _FACTORS：rsi_N、ma_dist_N、ema_dist_N、vol_ratio_N、atr_pct_N、ret_N 及原始字段），
+      经 IndicatorCache 计算，多个因子共享中间结果
+    - 远期收益以当日收盘为基准，持有 h 根K线（按个股自身K线计数，停牌跳过）后的收盘涨幅
+    - 每个交易日一个截面：因子与远期收益各自做一次整表逐行排名，再逐行求秩的 Pearson 相关（Rank IC），
+      全部为 (日期 × 代码) 数组运算，不逐日循环。两者缺失集合不同时（如面板末尾），秩在各自有效样本内计算
+    - 持有期大于 1 时相邻交易日的远期收益重叠，t_stat 按逐日 IC 独立计算，会偏高
+    start 之前的行只作为指标预热，不计入统计。
+    """
+    def __init__(self, panel: Panel, cache: Optional[IndicatorCache] = None, start: Optional[str] = None):
+        if panel.align != "calendar":
+            raise ValueError("因子 IC 分析需要 calendar 对齐的面板")
+        self.panel = panel
+        self.cache = cache or IndicatorCache(panel)
+        self.first_row = int(np.searchsorted(np.asarray(panel.index), start)) if start else 0
+
+    def factor(self, name: str) -> pd.DataFrame:
+        """因子宽表；底层指标经 IndicatorCache 复用，因子本身不缓存（全市场十年一张约 100MB）。"""
+        fn, arg, _, _ = _resolve(name)
+        return fn(self.cache, arg)
+
+    def forward_returns(self, h: int) -> np.ndarray:
+        """(日期 × 代码) 的 h 根K线远期收益（%），不足 h 根为 NaN。"""
+        close = self.panel["close"].to_numpy(dtype=float)
+        fwd = self.cache.forward_row(int(h))
+        cols = np.broadcast_to(np.arange(close.shape[1]), close.shape)
+        out = np.full(close.shape, np.nan)
+        ok = (fwd >= 0) & (close > 0)
+        out[ok] = (close[fwd[ok], cols[ok]] / close[ok] - 1.0) * 100.0
+        return out
+
+    def run(self, factors: Iterable[str] = DEFAULT_FACTORS, horizons: Iterable[int] = DEFAULT_IC_HORIZONS,
+            quantiles: int = 5, quantile_horizon: Optional[int] = None,
+            min_obs: int = MIN_CROSS_SECTION) -> FactorICResult:
+        """quantile_horizon 为主持有期（逐日 IC 与分组收益），缺省取 horizons 中不小于 5 的最小值。"""
+        factors = list(dict.fromkeys(factors))
+        horizons = sorted({int(h) for h in horizons if int(h) > 0})
+        if not horizons:
+            raise ValueError("至少需要一个正的持有期")
+        main = int(quantile_horizon or next((h for h in horizons if h >= 5), horizons[-1]))
+        if main not in horizons:
+            horizons = sorted(horizons + [main])
+        rows = slice(self.first_row, None)
+        dates = self.panel.index[rows]
+        tradable = self.panel["close"].notna().to_numpy()[rows]
+        ret_ranks = {h: _rank_parts(_rank_rows(self.forward_returns(h)[rows])) for h in horizons}
+        main_ret = self.forward_returns(main)[rows]
+        nq = max(int(quantiles), 2)
+
+        summary, ic_main, q_rows = [], {}, []
+        for name in factors:
+            values = self.factor(name).to_numpy(dtype=float)[rows]
+            values = np.where(tradable & np.isfinite(values), values, np.nan)
+            f_rank = _rank_rows(values)
+            f_parts = _rank_parts(f_rank)
+            for h in horizons:
+                ic, _ = _row_corr(f_parts, ret_ranks[h], min_obs)
+                s = ic[np.isfinite(ic)]
+                sd = s.std(ddof=1) if len(s) > 1 else np.nan
+                summary.append({
+                    "factor": name, "horizon": h,
+                    "ic_mean": _r(s.mean()) if len(s) else None,
+                    "ic_std": _r(sd),
+                    "icir": _r(s.mean() / sd) if len(s) > 1 and sd > 0 else None,
+                    "t_stat": _r(s.mean() / sd * np.sqrt(len(s)), 2) if len(s) > 1 and sd > 0 else None,
+                    "pos_ratio": _r((s > 0).mean()) if len(s) else None,
+                    "days": int(len(s)),
+                })
+                if h == main:
+                    ic_main[name] = ic
+            q_rows.append({"factor": name, **self._quantile_returns(f_rank, main_ret, nq, min_obs)})
+        return FactorICResult(
+            summary=pd.DataFrame(summary),
+            ic=pd.DataFrame(ic_main, index=dates),
+            quantiles=pd.DataFrame(q_rows),
+            horizon=main,
+        )
+
+    @staticmethod
+    def _quantile_returns(f_rank: np.ndarray, ret: np.ndarray, nq: int, min_obs: int) -> Dict[str, Optional[float]]:
+        """逐日按因子秩等分为 nq 组，求组内平均远期收益，再对交易日等权平均。
+        (日期, 组) 编码为一个整数键（无效样本落入每行额外的第 nq 组），一次 bincount 得到全部日期各组的和与计数。"""
+        ok = np.isfinite(f_rank) & np.isfinite(ret)
+        ok &= ok.sum(axis=1, keepdims=True) >= min_obs
+        cnt = np.isfinite(f_rank).sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore"):
+            bucket = np.clip(np.floor((f_rank - 1.0) / np.maximum(cnt, 1) * nq), 0, nq - 1)
+        bucket = np.where(ok, bucket, nq).astype(np.int64)
+        n_rows = f_rank.shape[0]
+        key = (bucket + (np.arange(n_rows) * (nq + 1))[:, None]).ravel()
+        size = n_rows * (nq + 1)
+        sums = np.bincount(key, weights=np.where(ok, ret, 0.0).ravel(), minlength=size).reshape(n_rows, nq + 1)[:, :nq]
+        counts = np.bincount(key, minlength=size).reshape(n_rows, nq + 1)[:, :nq]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            daily = np.where(counts > 0, sums / counts, np.nan)
+        has = np.isfinite(daily).any(axis=0)
+        means = np.full(nq, np.nan)
+        if has.any():
+            means[has] = np.nanmean(daily[:, has], axis=0)
+        out: Dict[str, Optional[float]] = {f"q{i + 1}": _r(m) for i, m in enumerate(means)}
+        out["spread"] = _r(means[-1] - means[0])
+        return out
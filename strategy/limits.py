@@ -0,0 +1,112 @@
+from typing import Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# daily_kline.limit_status 取值
+LIMIT_NONE = 0
+LIMIT_UP = 1                # 收盘涨停
+LIMIT_UP_ONE_WORD = 2       # 一字涨停（全天最低价即涨停价）
+LIMIT_DOWN = -1             # 收盘跌停
+LIMIT_DOWN_ONE_WORD = -2    # 一字跌停（全天最高价即跌停价）
+
+# 创业板注册制改革：该日起 300/301 涨跌幅限制由 10% 调整为 20%
+CHINEXT_REFORM_DATE = "20200824"
+# 价格比较容差（半分钱）
+_PRICE_EPS = 0.005
+
+
+def board_limit_ratio(ts_codes: Iterable[str], trade_dates: Iterable[str], is_st: Iterable[bool]) -> np.ndarray:
+    """逐行的涨跌幅限制比例。
+    - 科创板 688/689、创业板 300/301（改革后）：20%，ST 同样为 20%
+    - 北交所（.BJ 或 8/4/92 开头）：30%
+    - 主板：10%，ST 为 5%
+    代码先 factorize，板块判断只对唯一代码做一次。"""
+    codes = pd.Series(list(ts_codes), dtype=object).astype(str)
+    keys, uniques = pd.factorize(codes)
+    uniq = pd.Series(uniques, dtype=object)
+    num = uniq.str[:6]
+    star = num.str.startswith(("688", "689")).to_numpy()
+    chinext = num.str.startswith(("300", "301")).to_numpy()
+    bj = (uniq.str.endswith(".BJ") | num.str.startswith(("8", "4", "92"))).to_numpy()
+    star, chinext, bj = star[keys], chinext[keys], bj[keys]
+    dates = np.asarray(list(trade_dates), dtype=object).astype(str)
+    st = np.asarray(list(is_st), dtype=bool)
+    ratio = np.where(st, 0.05, 0.10)
+    ratio = np.where(chinext & (dates >= CHINEXT_REFORM_DATE), 0.20, ratio)
+    ratio = np.where(star, 0.20, ratio)
+    return np.where(bj, 0.30, ratio)
+
+
+def _round_price(x: np.ndarray) -> np.ndarray:
+    # 交易所按四舍五入到分计算涨跌停价
+    return np.floor(x * 100.0 + 0.5 + 1e-9) / 100.0
+
+
+def compute_limit_status(df: pd.DataFrame, st_codes: Optional[Iterable[str]] = None,
+                         list_dates: Optional[Mapping[str, str]] = None) -> np.ndarray:
+    """由 (ts_code, trade_date, open, high, low, close, pre_close) 向量化计算 limit_status。
+    st_codes：ST 股票代码集合（带或不带后缀均可）；list_dates：{代码: 上市日}，上市首日无涨跌幅限制记为 0。
+    pre_close 缺失时为 NaN（入库为 NULL，使用方退化为按涨跌幅阈值判断）。"""
+    if df is None or df.empty:
+        return np.zeros(0)
+    codes = df["ts_code"].astype(str)
+    st_set = {str(c).split('.')[0] for c in (st_codes or [])}
+    is_st = codes.str.split('.').str[0].isin(st_set).to_numpy() if st_set else np.zeros(len(df), dtype=bool)
+    ratio = board_limit_ratio(codes, df["trade_date"], is_st)
+    pre = pd.to_numeric(df["pre_close"], errors="coerce").to_numpy(dtype=float)
+    close = pd.to_numeric(df["close"], errors="coerce").to_numpy(dtype=float)
+    high = pd.to_numeric(df["high"], errors="coerce").to_numpy(dtype=float)
+    low = pd.to_numeric(df["low"], errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        up_px = _round_price(pre * (1.0 + ratio))
+        down_px = _round_price(pre * (1.0 - ratio))
+        ok = np.isfinite(pre) & (pre > 0) & np.isfinite(close)
+        up = ok & (close >= up_px - _PRICE_EPS)
+        down = ok & (close <= down_px + _PRICE_EPS)
+        status = np.where(up, np.where(low >= up_px - _PRICE_EPS, LIMIT_UP_ONE_WORD, LIMIT_UP), LIMIT_NONE)
+        status = np.where(down, np.where(high <= down_px + _PRICE_EPS, LIMIT_DOWN_ONE_WORD, LIMIT_DOWN), status)
+    if list_dates:
+        first = codes.map(lambda c: list_dates.get(c, list_dates.get(c.split('.')[0]))).to_numpy(dtype=object)
+        status = np.where(first == df["trade_date"].astype(str).to_numpy(dtype=object), LIMIT_NONE, status)
+    return np.where(np.isfinite(pre) & (pre > 0), status, np.nan)
+
+
+def limit_up_mask(status: np.ndarray, pct_chg: Optional[np.ndarray] = None, threshold: float = 9.8) -> np.ndarray:
+    """涨停判定：有 limit_status 时按板块规则，缺失（NaN，未回填的历史数据）时退化为 pct_chg >= threshold。"""
+    status = np.asarray(status, dtype=float)
+    hit = status > 0
+    if pct_chg is not None:
+        with np.errstate(invalid="ignore"):
+            hit = np.where(np.isnan(status), np.asarray(pct_chg, dtype=float) >= threshold, hit)
+    return hit
+
+
+def limit_down_mask(status: np.ndarray, pct_chg: Optional[np.ndarray] = None, threshold: float = 9.8) -> np.ndarray:
+    """跌停判定，口径同 limit_up_mask：状态缺失时退化为 pct_chg <= -threshold。"""
+    status = np.asarray(status, dtype=float)
+    hit = status < 0
+    if pct_chg is not None:
+        with np.errstate(invalid="ignore"):
+            hit = np.where(np.isnan(status), np.asarray(pct_chg, dtype=float) <= -threshold, hit)
+    return hit
+
+
+def fill_masks(status: np.ndarray, entry_mode: str = "close", exit_mode: str = "close") -> Tuple[np.ndarray, np.ndarray]:
+    """组合回测的成交约束 (buyable, sellable)：
+    - 收盘买入：收盘涨停（封板）不可买；次日开盘买入：一字涨停不可买
+    - 收盘卖出：收盘跌停不可卖；开盘卖出：一字跌停不可卖"""
+    s = np.nan_to_num(np.asarray(status, dtype=float), nan=LIMIT_NONE)
+    buyable = ~(s == LIMIT_UP_ONE_WORD) if entry_mode == "next_open" else ~(s > 0)
+    sellable = ~(s == LIMIT_DOWN_ONE_WORD) if exit_mode == "open" else ~(s < 0)
+    return buyable, sellable
+
+
+def limit_up_streak(status: pd.DataFrame, valid: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """(行 × 代码) 截至每行的连续涨停天数；valid 为有K线的掩码（默认 status 非空），停牌行不打断连板。"""
+    valid = status.notna() if valid is None else valid
+    up = status.fillna(LIMIT_NONE) > 0
+    total = up.cumsum()
+    # 最近一个有K线且未涨停的行上的累计值作为基准
+    base = total.where(valid & ~up).ffill().fillna(0)
+    return (total - base).where(valid)
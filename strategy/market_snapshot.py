@@ -0,0 +1,121 @@
+import json
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.limits import limit_down_mask, limit_up_mask
+from strategy.panel import Panel
+
+# 计算市场快照所需的 daily_kline 字段
+SNAPSHOT_FIELDS: List[str] = ["high", "low", "close", "vol", "amount", "pct_chg", "turnover_rate", "limit_status"]
+# N 日新高/新低窗口
+HIGH_LOW_WINDOWS = (20, 60)
+# 成交量异动：相对前 VOL_Z_WINDOW 个交易日均值的 z-score 不低于 VOL_Z_THRESHOLD
+VOL_Z_WINDOW = 20
+VOL_Z_THRESHOLD = 3.0
+# 换手率/放量榜单长度
+LEADERS_TOP_N = 10
+
+# market_snapshot 表的数值列（与 compute_snapshots 输出一致，另有 trade_date 与两个 JSON 榜单列）
+SNAPSHOT_COLUMNS: List[str] = [
+    "stock_count", "advancers", "decliners", "unchanged", "limit_up", "limit_down",
+    *[f"new_high_{n}" for n in HIGH_LOW_WINDOWS], *[f"new_low_{n}" for n in HIGH_LOW_WINDOWS],
+    "vol_spikes", "total_volume", "total_amount", "avg_pct_chg", "median_pct_chg",
+]
+
+
+def warmup_rows() -> int:
+    """滚动窗口需要的前置交易日数。"""
+    return max(max(HIGH_LOW_WINDOWS), VOL_Z_WINDOW)
+
+
+def _leaders(values: np.ndarray, codes: np.ndarray, extra: dict, top_n: int) -> List[str]:
+    """逐行取 values 最大的前 top_n 只（NaN 不参与），序列化为 JSON 列表。"""
+    n_rows, n_cols = values.shape
+    k = min(int(top_n), n_cols)
+    if k <= 0:
+        return ["[]"] * n_rows
+    filled = np.where(np.isfinite(values), values, -np.inf)
+    top = np.argpartition(-filled, k - 1, axis=1)[:, :k]
+    top_vals = np.take_along_axis(filled, top, axis=1)
+    order = np.argsort(-top_vals, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    out = []
+    for r in range(n_rows):
+        items = []
+        for c in top[r]:
+            if not np.isfinite(values[r, c]):
+                break
+            item = {"ts_code": str(codes[c])}
+            for name, arr in extra.items():
+                v = arr[r, c]
+                item[name] = round(float(v), 3) if np.isfinite(v) else None
+            items.append(item)
+        out.append(json.dumps(items, ensure_ascii=False))
+    return out
+
+
+def compute_snapshots(panel: Panel, dates: Optional[Iterable[str]] = None,
+                      top_n: int = LEADERS_TOP_N) -> pd.DataFrame:
+    """由 calendar 对齐的面板逐日计算市场宽度与异动快照，返回每个交易日一行。
+
+    - 涨跌家数、涨跌停（按 limit_status，缺失时退化为涨跌幅阈值）、成交量/成交额合计
+    - new_high_N / new_low_N：当日最高（最低）价为近 N 个交易日最高（最低），窗口内至少一半交易日有K线
+    - vol_spikes：成交量相对前 VOL_Z_WINDOW 日均值的 z-score >= VOL_Z_THRESHOLD 的家数；
+      vol_spike_leaders / turnover_leaders 为 z-score / 换手率前 top_n 的 JSON 列表
+    全部为整张 (日期 × 代码) 宽表上的滚动与截面运算；dates 只决定输出哪些行，面板应含 warmup_rows() 个前置交易日。"""
+    if panel.align != "calendar":
+        raise ValueError("市场快照需要 calendar 对齐的面板")
+    index = np.asarray(panel.index)
+    if dates is not None:
+        keep = np.isin(index, np.asarray(list(dates), dtype=object))
+    else:
+        keep = np.ones(len(index), dtype=bool)
+    if not keep.any() or len(panel.codes) == 0:
+        return pd.DataFrame(columns=["trade_date", *SNAPSHOT_COLUMNS, "vol_spike_leaders", "turnover_leaders"])
+
+    close = panel["close"]
+    valid = close.notna().to_numpy()[keep]
+    pct = panel["pct_chg"].to_numpy(dtype=float)[keep]
+    status = panel["limit_status"].to_numpy(dtype=float)[keep]
+    out = {"trade_date": index[keep], "stock_count": valid.sum(axis=1)}
+    with np.errstate(invalid="ignore"):
+        out["advancers"] = (pct > 0).sum(axis=1)
+        out["decliners"] = (pct < 0).sum(axis=1)
+        out["unchanged"] = (valid & (pct == 0)).sum(axis=1)
+    out["limit_up"] = (limit_up_mask(status, pct) & valid).sum(axis=1)
+    out["limit_down"] = (limit_down_mask(status, pct) & valid).sum(axis=1)
+
+    high, low = panel["high"], panel["low"]
+    for n in HIGH_LOW_WINDOWS:
+        mp = max(n // 2, 1)
+        hh = high.rolling(n, min_periods=mp).max().to_numpy()[keep]
+        ll = low.rolling(n, min_periods=mp).min().to_numpy()[keep]
+        out[f"new_high_{n}"] = (high.to_numpy()[keep] >= hh).sum(axis=1)
+        out[f"new_low_{n}"] = (low.to_numpy()[keep] <= ll).sum(axis=1)
+
+    vol = panel["vol"]
+    prior = vol.shift(1).rolling(VOL_Z_WINDOW, min_periods=max(VOL_Z_WINDOW // 2, 2))
+    mean = prior.mean().to_numpy()[keep]
+    std = prior.std().to_numpy()[keep]
+    v = vol.to_numpy(dtype=float)[keep]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(std > 0, (v - mean) / std, np.nan)
+        out["vol_spikes"] = (z >= VOL_Z_THRESHOLD).sum(axis=1)
+    out["total_volume"] = np.nansum(v, axis=1)
+    out["total_amount"] = np.nansum(panel["amount"].to_numpy(dtype=float)[keep], axis=1)
+    cnt = np.isfinite(pct).sum(axis=1)
+    out["avg_pct_chg"] = np.where(cnt > 0, np.nansum(pct, axis=1) / np.maximum(cnt, 1), np.nan)
+    med = np.full(len(pct), np.nan)
+    has = cnt > 0
+    if has.any():
+        med[has] = np.nanmedian(pct[has], axis=1)
+    out["median_pct_chg"] = med
+
+    codes = np.asarray(panel.codes)
+    turnover = panel["turnover_rate"].to_numpy(dtype=float)[keep]
+    out["vol_spike_leaders"] = _leaders(np.where(z >= VOL_Z_THRESHOLD, z, np.nan), codes,
+                                        {"vol_z": z, "pct_chg": pct}, top_n)
+    out["turnover_leaders"] = _leaders(turnover, codes, {"turnover_rate": turnover, "pct_chg": pct}, top_n)
+    return pd.DataFrame(out)
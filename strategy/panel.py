@@ -0,0 +1,288 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.adjust import adjust_fields, latest_factors, normalize_adjust
+
+# 面板默认加载的列（daily_kline 中的字段）
+PANEL_FIELDS: List[str] = ["open", "high", "low", "close", "vol", "pct_chg", "limit_status"]
+
+# SQLite 单条语句可绑定变量数的保守上限（老版本为 999）
+_MAX_IN_PARAMS = 900
+
+
+@dataclass
+class Panel:
+    """宽表行情面板：每个字段一张 (行 × 代码) 的 DataFrame。
+
+    两种对齐方式：
+    - calendar：行 = 交易日，停牌日为 NaN，适合逐日回测
+    - bars：每只股票的K线右对齐到最后一行（行 = 距最后一根K线的位置），
+      与 StockSelector 逐只加载 [start, end] 后的口径完全一致，适合按末日选股
+    """
+    fields: Dict[str, pd.DataFrame]
+    align: str = "calendar"
+    # bars 对齐时记录每只股票最后一根K线的日期
+    last_dates: Optional[pd.Series] = None
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.fields[name]
+
+    @property
+    def codes(self) -> pd.Index:
+        return next(iter(self.fields.values())).columns
+
+    @property
+    def index(self) -> pd.Index:
+        return next(iter(self.fields.values())).index
+
+    @property
+    def dates(self) -> List[str]:
+        return list(self.index) if self.align == "calendar" else []
+
+    def take_codes(self, codes: Iterable[str]) -> "Panel":
+        cols = self.codes.intersection(pd.Index(list(codes)), sort=False)
+        return Panel(
+            fields={k: v[cols] for k, v in self.fields.items()},
+            align=self.align,
+            last_dates=self.last_dates.reindex(cols) if self.last_dates is not None else None,
+        )
+
+    def take_rows(self, rows: slice) -> "Panel":
+        """按行切片（如只取前若干交易日）；指标均为因果计算，切片上的结果与全量一致。"""
+        return Panel(fields={k: v.iloc[rows] for k, v in self.fields.items()},
+                     align=self.align, last_dates=self.last_dates)
+
+    @classmethod
+    def from_long(cls, df: pd.DataFrame, fields: Iterable[str] = PANEL_FIELDS, align: str = "calendar") -> "Panel":
+        """由长表 (ts_code, trade_date, 字段...) 构建面板。"""
+        fields = list(fields)
+        if df is None or df.empty:
+            empty = pd.DataFrame(dtype=float)
+            return cls(fields={f: empty for f in fields}, align=align,
+                       last_dates=pd.Series(dtype=object) if align == "bars" else None)
+        # 直接按整数下标散布到 NumPy 数组，避免逐字段 pivot 的开销
+        code_idx, codes = pd.factorize(df["ts_code"], sort=True)
+        date_idx, dates = pd.factorize(df["trade_date"], sort=True)
+        codes = pd.Index(codes, name="ts_code")
+        last_dates = None
+        if align == "bars":
+            # 行号 = 深度 - 该股剩余根数，使每只股票最后一根K线落在最后一行
+            order = np.lexsort((date_idx, code_idx))
+            sorted_codes = code_idx[order]
+            n_per_code = np.bincount(code_idx, minlength=len(codes))
+            starts = np.r_[0, np.cumsum(n_per_code)[:-1]]
+            pos_in_code = np.arange(len(order)) - starts[sorted_codes]
+            depth = int(n_per_code.max())
+            row_idx = np.empty(len(order), dtype=np.int64)
+            row_idx[order] = depth - n_per_code[sorted_codes] + pos_in_code
+            index = pd.RangeIndex(depth)
+            last_pos = starts + n_per_code - 1
+            last_dates = pd.Series(np.asarray(dates)[date_idx[order][last_pos]], index=codes)
+        else:
+            row_idx = date_idx
+            index = pd.Index(dates, name="trade_date")
+        wide = {}
+        for f in fields:
+            arr = np.full((len(index), len(codes)), np.nan)
+            arr[row_idx, code_idx] = pd.to_numeric(df[f], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            wide[f] = pd.DataFrame(arr, index=index, columns=codes)
+        return cls(fields=wide, align=align, last_dates=last_dates)
+
+
+def load_panel(conn, start: str, end: str, codes: Optional[Iterable[str]] = None,
+               fields: Iterable[str] = PANEL_FIELDS, align: str = "calendar", table: str = "daily_kline",
+               adjust: str = "raw", latest: Optional[pd.Series] = None) -> Panel:
+    """一次查询加载 [start, end] 的全部K线并转为宽表面板；table 为周/月K线表时每行是一个周期。
+    adjust 为 qfq/hfq 时价格字段按 adj_factor 复权（见 strategy.adjust），qfq 的基准 latest 缺省现查。"""
+    fields = list(fields)
+    adjust = normalize_adjust(adjust)
+    query_fields = fields + (["adj_factor"] if adjust != "raw" and "adj_factor" not in fields else [])
+    codes_list = list(codes) if codes is not None else None
+    sql = f"SELECT ts_code, trade_date, {', '.join(query_fields)} FROM {table} WHERE trade_date>=? AND trade_date<=?"
+    args: list = [start, end]
+    if codes_list is not None and len(codes_list) <= _MAX_IN_PARAMS:
+        sql += f" AND ts_code IN ({','.join('?' for _ in codes_list)})"
+        args += codes_list
+    df = pd.read_sql_query(sql, conn, params=args)
+    if codes_list is not None and len(codes_list) > _MAX_IN_PARAMS:
+        df = df[df["ts_code"].isin(set(codes_list))]
+    panel = Panel.from_long(df, query_fields, align)
+    if adjust != "raw":
+        if adjust == "qfq" and latest is None and len(panel.codes):
+            latest = latest_factors(conn, panel.codes)
+        adjust_fields(panel.fields, panel["adj_factor"], adjust, latest)
+        if "adj_factor" not in fields:
+            del panel.fields["adj_factor"]
+    return panel
+
+
+class IndicatorCache:
+    """面板级指标缓存：同一指标(名称+参数)只计算一次，跨多个策略配置复用。
+    所有指标均为对整张宽表的列向量化运算。
+    滚动/前移/EMA 类指标按每只股票自身的K线计数（停牌日跳过，见 per_bar），与逐只加载K线的口径一致。
+    """
+    def __init__(self, panel: Panel):
+        self.panel = panel
+        self._store: Dict[Tuple[Hashable, ...], object] = {}
+        self.hits = 0
+        self.misses = 0
+        self.compute_seconds = 0.0
+
+    def get(self, key: Tuple[Hashable, ...], compute: Callable[[], object]):
+        if key in self._store:
+            self.hits += 1
+            return self._store[key]
+        t0 = time.perf_counter()
+        val = compute()
+        self.compute_seconds += time.perf_counter() - t0
+        self.misses += 1
+        self._store[key] = val
+        return val
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "indicators": len(self._store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "compute_ms": round(self.compute_seconds * 1000.0, 2),
+        }
+
+    # ====== 基础序列 ======
+    def bar_count(self) -> pd.DataFrame:
+        """截至每行的累计K线根数（停牌日不计）。"""
+        return self.get(("bar_count",), lambda: self.panel["close"].notna().cumsum())
+
+    def forward_row(self, n: int) -> np.ndarray:
+        """(行 × 代码) 整数数组：从当行起该股第 n 根后续K线所在的行号，不存在为 -1。
+        按每只股票自身的K线计数（停牌日跳过），与逐只 SQL 的 LIMIT n 口径一致；当行无K线为 -1。"""
+        def _calc():
+            valid = self.panel["close"].notna().to_numpy()
+            n_rows, n_codes = valid.shape
+            cols, rows = np.nonzero(valid.T)  # 按代码、再按行排序的有效K线位置
+            n_per_code = valid.sum(axis=0)
+            starts = np.r_[0, np.cumsum(n_per_code)[:-1]]
+            target = np.cumsum(valid, axis=0) + int(n)  # 目标K线在该股内的序号（从 1 起）
+            ok = valid & (target <= n_per_code)
+            out = np.full((n_rows, n_codes), -1, dtype=np.int64)
+            flat = (starts[None, :] + target - 1)[ok]
+            out[ok] = rows[flat]
+            return out
+        return self.get(("forward_row", int(n)), _calc)
+
+    def _bar_layout(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """calendar 面板上有效K线的 (行号, 列号, 股内序号) 与单只股票最多的K线根数。"""
+        def _calc():
+            valid = self.panel["close"].notna().to_numpy()
+            rows, cols = np.nonzero(valid)
+            pos = np.cumsum(valid, axis=0)[rows, cols] - 1
+            depth = int(valid.sum(axis=0).max()) if valid.size else 0
+            return rows, cols, pos, depth
+        return self.get(("bar_layout",), _calc)
+
+    def per_bar(self, func: Callable[..., object], *frames: pd.DataFrame):
+        """按每只股票自身的K线序列计算逐列运算 func（停牌日跳过）。
+
+        calendar 宽表先压缩为 (股内序号 × 代码)：停牌行剔除、各股K线上对齐，
+        func 在压缩表上做 rolling/shift/ewm 等逐列运算，结果（DataFrame 或其字典）再散布回原行，停牌行为 NaN。
+        bars 面板本身没有停牌空行，直接计算。"""
+        if self.panel.align != "calendar":
+            return func(*frames)
+        rows, cols, pos, depth = self._bar_layout()
+        like = self.panel["close"]
+
+        def _compact(frame: pd.DataFrame) -> pd.DataFrame:
+            arr = np.full((depth, frame.shape[1]), np.nan)
+            arr[pos, cols] = frame.to_numpy(dtype=float)[rows, cols]
+            return pd.DataFrame(arr, columns=frame.columns)
+
+        def _expand(frame: pd.DataFrame) -> pd.DataFrame:
+            arr = np.full(like.shape, np.nan)
+            arr[rows, cols] = frame.to_numpy(dtype=float)[pos, cols]
+            return pd.DataFrame(arr, index=like.index, columns=like.columns)
+
+        out = func(*(_compact(f) for f in frames))
+        if isinstance(out, dict):
+            return {k: _expand(v) for k, v in out.items()}
+        return _expand(out)
+
+    def first_close(self) -> pd.Series:
+        """窗口内每只股票的首个收盘价。"""
+        return self.get(("first_close",), lambda: self.panel["close"].bfill().iloc[0] if len(self.panel.index) else pd.Series(dtype=float))
+
+    # ====== 指标 ======
+    def ma(self, n: int) -> pd.DataFrame:
+        return self.get(("ma", int(n)),
+                        lambda: self.per_bar(lambda c: c.rolling(int(n), min_periods=1).mean(), self.panel["close"]))
+
+    def vol_ma(self, n: int) -> pd.DataFrame:
+        return self.get(("vol_ma", int(n)),
+                        lambda: self.per_bar(lambda v: v.rolling(int(n), min_periods=1).mean(), self.panel["vol"]))
+
+    def ema(self, span: int) -> pd.DataFrame:
+        return self.get(("ema", int(span)),
+                        lambda: self.per_bar(lambda c: c.ewm(span=int(span), adjust=False).mean(), self.panel["close"]))
+
+    def macd(self, fast: int, slow: int, signal: int) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        def _calc():
+            dif = self.ema(fast) - self.ema(slow)
+            dea = self.per_bar(lambda d: d.ewm(span=int(signal), adjust=False).mean(), dif)
+            return dif, dea, dif - dea
+        return self.get(("macd", int(fast), int(slow), int(signal)), _calc)
+
+    def rsi(self, period: int) -> pd.DataFrame:
+        def _rsi(close: pd.DataFrame) -> pd.DataFrame:
+            delta = close.diff()
+            up = delta.clip(lower=0).fillna(0.0)
+            down = (-delta).clip(lower=0).fillna(0.0)
+            roll_up = up.ewm(alpha=1 / period, adjust=False).mean()
+            roll_down = down.ewm(alpha=1 / period, adjust=False).mean()
+            rs = roll_up / (roll_down + 1e-12)
+            return 100 - (100 / (1 + rs))
+        return self.get(("rsi", int(period)), lambda: self.per_bar(_rsi, self.panel["close"]))
+
+    def true_range(self) -> pd.DataFrame:
+        def _tr(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame) -> pd.DataFrame:
+            prev_close = close.shift(1)
+            tr = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+            return pd.DataFrame(tr, index=close.index, columns=close.columns)
+        p = self.panel
+        return self.get(("true_range",), lambda: self.per_bar(_tr, p["high"], p["low"], p["close"]))
+
+    def atr(self, period: int) -> pd.DataFrame:
+        return self.get(("atr", int(period)),
+                        lambda: self.per_bar(lambda tr: tr.ewm(alpha=1 / period, adjust=False).mean(), self.true_range()))
+
+    def prev_high_max(self, n: int) -> pd.DataFrame:
+        """前 n 根K线（不含当日）的最高价。"""
+        return self.get(("prev_high_max", int(n)),
+                        lambda: self.per_bar(lambda h: h.shift(1).rolling(int(n), min_periods=int(n)).max(),
+                                             self.panel["high"]))
+
+    def shift_bars(self, name: str, n: int) -> pd.DataFrame:
+        """字段 name 在该股 n 根K线之前的值（停牌日不计）。"""
+        return self.get(("shift_bars", name, int(n)),
+                        lambda: self.per_bar(lambda x: x.shift(int(n)), self.panel[name]))
+
+    def limit_up_streak(self) -> pd.DataFrame:
+        """截至每行的连续涨停天数（按 limit_status，停牌不打断）。"""
+        from strategy.limits import limit_up_streak
+        return self.get(("limit_up_streak",),
+                        lambda: limit_up_streak(self.panel["limit_status"], self.panel["close"].notna()))
+
+    def pct_chg_max(self, n: int) -> pd.DataFrame:
+        return self.get(("pct_chg_max", int(n)),
+                        lambda: self.per_bar(lambda x: x.rolling(int(n), min_periods=1).max(), self.panel["pct_chg"]))
+
+    def patterns(self, names: Tuple[str, ...], params_key: Tuple, params: Dict) -> Dict[str, pd.DataFrame]:
+        from strategy.patterns import detect_pattern_frames
+        p = self.panel
+
+        def _calc():
+            frames = self.per_bar(lambda o, h, l, c: detect_pattern_frames(o, h, l, c, list(names), params),
+                                  p["open"], p["high"], p["low"], p["close"])
+            return {k: v.fillna(0.0).astype(bool) for k, v in frames.items()}
+        return self.get(("patterns", names, params_key), _calc)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 # 基础K线形态识别工具（可被筛选与绘图复用）
@@ -171,3 +172,67 @@ def detect_patterns(df: pd.DataFrame, patterns: list, window: int = 5, params: d
         if 'three_black_crows' in patterns and is_three_black_crows(df, i):
             res['three_black_crows'].append(i)
     return res
+
+
+# ====== 向量化版本：对宽表 (行 × 代码) 一次性识别，口径与上面逐行函数一致 ======
+def detect_pattern_frames(o: pd.DataFrame, h: pd.DataFrame, low: pd.DataFrame, c: pd.DataFrame,
+                          patterns: list, params: dict | None = None) -> dict:
+    """
+    返回 {形态名: 布尔宽表}，True 表示该行出现形态。
+    前一/前两根K线用 shift 获取，缺失时比较结果为 False，与逐行版本的边界判断一致。
+    """
+    params = params or {}
+    o1, c1 = o.shift(1), c.shift(1)
+    o2, c2 = o.shift(2), c.shift(2)
+    body = (c - o).abs()
+    rng = h - low
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    res = {}
+    for p in patterns:
+        kw = params.get(p, {})
+        if p == 'bullish_engulfing':
+            m = (c1 < o1) & (c > o) & (o < c1) & (c > o1)
+        elif p == 'bearish_engulfing':
+            m = (c1 > o1) & (c < o) & (o > c1) & (c < o1)
+        elif p == 'hammer':
+            brm = kw.get('body_ratio_max', 0.35)
+            lsm = kw.get('lower_shadow_min', 2.0)
+            m = (rng > 0) & (body / rng.where(rng > 0) <= brm) & (bottom - low >= lsm * body) & (h - top <= body)
+        elif p == 'shooting_star':
+            brm = kw.get('body_ratio_max', 0.35)
+            usm = kw.get('upper_shadow_min', 2.0)
+            m = (rng > 0) & (body / rng.where(rng > 0) <= brm) & (h - top >= usm * body) & (bottom - low <= body)
+        elif p == 'doji':
+            th = kw.get('threshold', 0.001)
+            m = (o != 0) & (body / np.maximum(o.abs(), 1e-6) <= th)
+        elif p in ('morning_star', 'evening_star'):
+            bmr = kw.get('body_min_ratio', 0.5)
+            mid_body = (c1 - o1).abs()
+            mid_rng = h.shift(1) - low.shift(1)
+            cond2 = (mid_rng > 0) & (mid_body / mid_rng.where(mid_rng > 0) < 0.4)
+            first_body = (o2 - c2).abs()
+            if p == 'morning_star':
+                m = (c2 < o2) & (first_body > 0) & cond2 & (c > o) & ((c - np.minimum(o2, c2)) >= bmr * first_body)
+            else:
+                m = (c2 > o2) & (first_body > 0) & cond2 & (c < o) & ((np.maximum(o2, c2) - c) >= bmr * first_body)
+        elif p in ('bullish_harami', 'bearish_harami'):
+            inside = (bottom > np.minimum(o1, c1)) & (top < np.maximum(o1, c1))
+            if p == 'bullish_harami':
+                m = (c1 < o1) & (c > o) & inside
+            else:
+                m = (c1 > o1) & (c < o) & inside
+        elif p == 'piercing_line':
+            mid = (o1 + c1) / 2
+            m = (c1 < o1) & (c > o) & (c > mid) & (o < c1)
+        elif p == 'dark_cloud_cover':
+            mid = (o1 + c1) / 2
+            m = (c1 > o1) & (c < o) & (c < mid) & (o > c1)
+        elif p == 'three_white_soldiers':
+            m = (c2 > o2) & (c1 > o1) & (c > o) & (c1 >= c2) & (c >= c1)
+        elif p == 'three_black_crows':
+            m = (c2 < o2) & (c1 < o1) & (c < o) & (c1 <= c2) & (c <= c1)
+        else:
+            m = pd.DataFrame(False, index=c.index, columns=c.columns)
+        res[p] = m.fillna(False).astype(bool) if hasattr(m, 'fillna') else m
+    return res
@@ -0,0 +1,149 @@
+import sqlite3
+from typing import List, Optional, Set, Tuple
+
+from strategy.adjust import normalize_adjust
+from strategy.cross_section import PCT_SCALE, xs_columns, xs_enabled
+from strategy.selector import StrategyConfig
+
+# SQLite 单条语句可绑定变量数的保守上限（老版本为 999）
+_MAX_IN_PARAMS = 900
+# 浮点比较容差：SQL 侧聚合与 pandas 计算可能存在末位误差，预筛只能放宽不能收紧
+_EPS = 1e-9
+
+
+class SelectionPlanner:
+    """选股计划器：把 StrategyConfig 中可由 SQLite 表达的条件编译为一条查询，
+    先在数据库侧缩小候选股票范围，幸存者再交给 pandas/NumPy 规则逐只评估。
+
+    下推的条件与 StockSelector 的判定口径一致（窗口为 [start, end] 内该股自身的K线）：
+    - 最后一日涨跌幅 last_pct_chg_min、最后收盘价区间 price_min/price_max（仅 adjust=raw）
+    - 最近N日内存在单日涨幅 exists_day_increase_*、区间涨幅 range_increase_*（仅 adjust=raw）
+    - 量比（当日量 / N日均量）volume_ratio_min/max 与回调收阴
+    - 截面排名 xs_*（按最后一日点查 xs_rank）
+    - 至少 3 根K线（与 evaluate_single 的 no_data 判定一致）
+    预筛结果是最终结果的超集：所有规则在幸存者上仍会完整复核。
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def compile(self, cfg: StrategyConfig, start: str, end: str, codes: Optional[List[str]] = None) -> Optional[Tuple[str, list]]:
+        """返回 (sql, params)；若无可下推的条件则返回 None。
+
+        查询形态：先按代码聚合出窗口内首/末交易日与K线根数（覆盖索引扫描），
+        再用 (ts_code, trade_date) 索引点查最后一根K线；“最近N根”类条件以
+        LIMIT/OFFSET 定位第N根的日期后做区间聚合，只在前置条件的幸存者上执行。
+        """
+        # 预筛条件按日线表达，周/月K线周期不下推
+        if (cfg.timeframe or "daily") != "daily":
+            return None
+        conds: List[str] = []
+        args: list = []
+        # 复权后的价格需按代码补齐因子后折算，SQL 侧只下推与复权无关的条件（涨跌幅、同日开收比较、量能、截面排名）
+        raw_prices = normalize_adjust(cfg.adjust) == "raw"
+
+        if cfg.last_pct_chg_min is not None:
+            conds.append("d.pct_chg >= ?")
+            args.append(cfg.last_pct_chg_min - _EPS)
+        if cfg.price_min is not None and raw_prices:
+            conds.append("d.close >= ?")
+            args.append(cfg.price_min - _EPS)
+        if cfg.price_max is not None and raw_prices:
+            conds.append("d.close <= ?")
+            args.append(cfg.price_max + _EPS)
+        if cfg.volume_mode == 'volume_pullback' and cfg.pullback_require_red:
+            conds.append("d.close < d.open")
+        if cfg.range_increase_min_pct is not None and raw_prices:
+            if cfg.range_increase_days is None:
+                ref = ("(SELECT k.close FROM daily_kline k "
+                       "WHERE k.ts_code=c.ts_code AND k.trade_date=c.first_date)")
+            else:
+                days = max(int(cfg.range_increase_days), 1)
+                conds.append("c.n >= ?")
+                args.append(days)
+                ref = ("(SELECT k.close FROM daily_kline k "
+                       "WHERE k.ts_code=c.ts_code AND k.trade_date>=c.first_date AND k.trade_date<=c.last_date "
+                       f"ORDER BY k.trade_date DESC LIMIT 1 OFFSET {days - 1})")
+            conds.append(f"(d.close - {ref}) / MAX({ref}, 1e-6) * 100 >= ?")
+            args.append(cfg.range_increase_min_pct - _EPS)
+        if cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None:
+            since = self._nth_latest_date(int(cfg.exists_day_increase_within_days))
+            conds.append(
+                "EXISTS (SELECT 1 FROM daily_kline k WHERE k.ts_code=c.ts_code "
+                f"AND k.trade_date>={since} AND k.trade_date<=c.last_date AND k.pct_chg >= ?)"
+            )
+            args.append(cfg.exists_day_increase_min_pct - _EPS)
+        ratio_bound = None
+        if cfg.volume_mode == 'volume_breakout' and cfg.volume_ratio_min is not None:
+            ratio_bound = (">=", cfg.volume_ratio_min - _EPS)
+        elif cfg.volume_mode == 'volume_pullback' and cfg.volume_ratio_max is not None:
+            ratio_bound = ("<=", cfg.volume_ratio_max + _EPS)
+        if ratio_bound is not None:
+            # 与 rolling(volume_ma_days, min_periods=1).mean() 一致：取最近 volume_ma_days 根的均量
+            since = self._nth_latest_date(max(int(cfg.volume_ma_days or 1), 1))
+            vol_ma = ("(SELECT AVG(k.vol) FROM daily_kline k WHERE k.ts_code=c.ts_code "
+                      f"AND k.trade_date>={since} AND k.trade_date<=c.last_date)")
+            conds.append(f"d.vol / MAX({vol_ma}, 1e-6) {ratio_bound[0]} ?")
+            args.append(ratio_bound[1])
+
+        if xs_enabled(cfg):
+            # 截面排名：按各股最后一根K线的日期点查 xs_rank 主键
+            pct_col, rank_col = xs_columns(cfg.xs_scope or "market")
+            xs_conds = [f"x.{pct_col} IS NOT NULL"]
+            xs_args: list = [cfg.xs_feature]
+            if cfg.xs_pct_min is not None:
+                xs_conds.append(f"x.{pct_col} >= ?")
+                xs_args.append(float(cfg.xs_pct_min) * PCT_SCALE / 100.0)
+            if cfg.xs_pct_max is not None:
+                xs_conds.append(f"x.{pct_col} <= ?")
+                xs_args.append(float(cfg.xs_pct_max) * PCT_SCALE / 100.0)
+            if cfg.xs_top_n:
+                xs_conds.append(f"x.{rank_col} <= ?")
+                xs_args.append(int(cfg.xs_top_n))
+            conds.append(
+                "EXISTS (SELECT 1 FROM xs_rank x WHERE x.trade_date=c.last_date AND x.feature=? "
+                f"AND x.ts_code=c.ts_code AND {' AND '.join(xs_conds)})"
+            )
+            args += xs_args
+
+        if not conds:
+            return None
+
+        where = "trade_date>=? AND trade_date<=?"
+        base_args: list = [start, end]
+        if codes is not None and len(codes) <= _MAX_IN_PARAMS:
+            where += f" AND ts_code IN ({','.join('?' for _ in codes)})"
+            base_args += list(codes)
+
+        sql = f"""
+        WITH c AS (
+            SELECT ts_code, MIN(trade_date) AS first_date, MAX(trade_date) AS last_date, COUNT(*) AS n
+            FROM daily_kline
+            WHERE {where}
+            GROUP BY ts_code
+        )
+        SELECT c.ts_code
+        FROM c JOIN daily_kline d ON d.ts_code = c.ts_code AND d.trade_date = c.last_date
+        WHERE c.n >= 3 AND {' AND '.join(conds)}
+        """
+        return sql, base_args + args
+
+    @staticmethod
+    def _nth_latest_date(n: int) -> str:
+        """窗口内倒数第 n 根K线的日期；不足 n 根时取窗口首日（等价于 tail(n)）。"""
+        n = max(n, 1)
+        return (
+            "COALESCE((SELECT k2.trade_date FROM daily_kline k2 WHERE k2.ts_code=c.ts_code "
+            "AND k2.trade_date>=c.first_date AND k2.trade_date<=c.last_date "
+            f"ORDER BY k2.trade_date DESC LIMIT 1 OFFSET {n - 1}), c.first_date)"
+        )
+
+    def candidates(self, cfg: StrategyConfig, start: str, end: str, codes: Optional[List[str]] = None) -> Optional[Set[str]]:
+        """执行预筛，返回幸存代码集合；无可下推条件时返回 None（表示不缩小范围）。"""
+        plan = self.compile(cfg, start, end, codes)
+        if plan is None:
+            return None
+        sql, args = plan
+        survivors = {r[0] for r in self.conn.execute(sql, args).fetchall()}
+        if codes is not None:
+            survivors &= set(codes)
+        return survivors
@@ -0,0 +1,124 @@
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.selector import StrategyConfig
+
+# 参与计分的规则（列顺序）与对应的权重键
+SCORE_RULES: List[str] = ["volume", "ma", "breakout", "pattern", "macd", "rsi"]
+WEIGHT_KEYS: Dict[str, str] = {
+    "volume": "vol", "ma": "ma", "breakout": "brk", "pattern": "pat", "macd": "macd", "rsi": "rsi",
+}
+DEFAULT_WEIGHTS: Dict[str, float] = {"vol": 30, "ma": 20, "brk": 25, "pat": 15, "macd": 5, "rsi": 5}
+
+
+def rule_used(cfg: StrategyConfig) -> np.ndarray:
+    """各计分规则是否参与计分（口径与原 UI/回测评分一致）。"""
+    return np.array([
+        cfg.volume_mode is not None,
+        (cfg.ma_alignment is not None) or (cfg.price_above_ma is not None),
+        cfg.breakout_n is not None,
+        bool(cfg.enable_patterns),
+        bool(cfg.macd_enable),
+        bool(cfg.rsi_enable),
+    ], dtype=bool)
+
+
+def weight_vector(cfg: StrategyConfig, weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """返回按 SCORE_RULES 排列的有效权重：未启用或非正的权重置 0，缺省取 DEFAULT_WEIGHTS。"""
+    weights = weights or {}
+    w = np.array([float(weights.get(WEIGHT_KEYS[r], DEFAULT_WEIGHTS[WEIGHT_KEYS[r]])) for r in SCORE_RULES])
+    return np.where(rule_used(cfg) & (w > 0), w, 0.0)
+
+
+def score_array(checks: np.ndarray, cfg: StrategyConfig, weights: Optional[Mapping[str, float]] = None,
+                decimals: Optional[int] = None) -> np.ndarray:
+    """checks 最后一维按 SCORE_RULES 排列的布尔数组（任意前导维度），返回 0~100 的得分。
+    一次矩阵乘法完成：score = checks @ w / sum(w) * 100。"""
+    w = weight_vector(cfg, weights)
+    total = w.sum()
+    checks = np.asarray(checks, dtype=bool)
+    if total <= 0:
+        return np.zeros(checks.shape[:-1])
+    scores = checks.astype(float) @ w / total * 100.0
+    return np.round(scores, decimals) if decimals is not None else scores
+
+
+def score_checks(checks: pd.DataFrame, cfg: StrategyConfig, weights: Optional[Mapping[str, float]] = None,
+                 decimals: Optional[int] = None) -> pd.Series:
+    """对 (代码 × 规则) 的检查矩阵打分；缺失的规则列视为通过（与未启用规则恒为 True 一致）。"""
+    mat = checks.reindex(columns=SCORE_RULES).fillna(True).astype(bool).to_numpy()
+    return pd.Series(score_array(mat, cfg, weights, decimals), index=checks.index, name="score")
+
+
+def score_frames(frames: Mapping[str, pd.DataFrame], cfg: StrategyConfig,
+                 weights: Optional[Mapping[str, float]] = None, like: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """对规则布尔宽表（规则 -> 日期 × 代码，如 BulkEvaluator.rule_frames 的输出）整体打分，
+    返回 日期 × 代码 的得分表。缺失规则视为通过；like 用于确定形状（默认取任一宽表）。"""
+    like = like if like is not None else next(iter(frames.values()))
+    w = weight_vector(cfg, weights)
+    total = w.sum()
+    out = np.zeros(like.shape)
+    if total > 0:
+        for rule, wi in zip(SCORE_RULES, w):
+            if wi <= 0:
+                continue
+            frame = frames.get(rule)
+            out += wi if frame is None else frame.reindex_like(like).fillna(False).to_numpy(dtype=float) * wi
+        out = out / total * 100.0
+    return pd.DataFrame(out, index=like.index, columns=like.columns)
+
+
+# ====== Top-K ======
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """一维得分取前 k 个下标，按得分降序、同分按原顺序（与稳定降序排序后截断等价）。
+    k<=0 或不足 k 个时返回全部下标（保持原顺序）。"""
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    if k <= 0 or n <= k:
+        return np.arange(n)
+    part = np.argpartition(-scores, k - 1)[:k]
+    thr = scores[part].min()
+    # 边界同分时取最靠前者，保证结果确定
+    above = np.flatnonzero(scores > thr)
+    ties = np.flatnonzero(scores == thr)[:k - len(above)]
+    idx = np.concatenate([above, ties])
+    return idx[np.lexsort((idx, -scores[idx]))]
+
+
+def top_k_mask(scores: pd.DataFrame | np.ndarray, k: int,
+               eligible: pd.DataFrame | np.ndarray | None = None) -> np.ndarray:
+    """对 日期 × 代码 的得分表逐行取前 k 个，返回同形布尔掩码。
+    所有日期一次 np.partition 完成；边界同分取列序靠前者，与 top_k_indices 一致。"""
+    s = np.asarray(scores, dtype=float)
+    ok = np.isfinite(s) if eligible is None else (np.asarray(eligible, dtype=bool) & np.isfinite(s))
+    if k <= 0 or s.shape[1] <= k:
+        return ok
+    s = np.where(ok, s, -np.inf)
+    thr = -np.partition(-s, k - 1, axis=1)[:, k - 1:k]
+    above = s > thr
+    ties = s == thr
+    need = k - above.sum(axis=1, keepdims=True)
+    return ok & (above | (ties & (np.cumsum(ties, axis=1) <= need)))
+
+
+def diversified_top_k(scores: np.ndarray, corr: np.ndarray, k: int, max_corr: float) -> np.ndarray:
+    """带分散约束的 Top-K：按得分降序（同分按原顺序）贪心选取，
+    与任一已选标的相关系数超过 max_corr 的候选跳过。corr 为与 scores 同序的 n × n 相关矩阵。
+    k<=0 表示不限数量；候选不足时返回的个数可能少于 k。"""
+    scores = np.asarray(scores, dtype=float)
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    limit = len(scores) if k <= 0 else int(k)
+    corr = np.asarray(corr)
+    picked: List[int] = []
+    # blocked[j]：j 与已选集合的最大相关系数是否已超阈值，每选入一只只需更新一行
+    blocked = np.zeros(len(scores), dtype=bool)
+    for i in order:
+        if len(picked) >= limit:
+            break
+        if blocked[i]:
+            continue
+        picked.append(int(i))
+        blocked |= corr[i] > max_corr
+    return np.array(picked, dtype=np.int64)
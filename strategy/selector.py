@@ -1,6 +1,12 @@
+import threading
+import time
 import pandas as pd
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Any, Optional, Callable
+
+from strategy.adjust import DEFAULT_ADJUST, adjust_bars, latest_factors, normalize_adjust
+from strategy.cross_section import xs_columns, xs_condition, xs_enabled
+from strategy.timeframe import kline_table
 
 
 @dataclass
@@ -11,6 +17,8 @@ class StrategyConfig:
     range_increase_min_pct: float | None = None
     exists_day_increase_within_days: int | None = None
     exists_day_increase_min_pct: float | None = None
+    last_pct_chg_min: float | None = None  # 最后一日涨跌幅下限（%）
+    limit_up_streak_min: int | None = None  # 最后一日连续涨停天数下限（按 limit_status，板块/ST 涨跌幅规则）
 
     # 2) 成交量类
     volume_mode: Optional[str] = None  # None | "volume_breakout" | "volume_pullback"
@@ -49,22 +57,161 @@ class StrategyConfig:
     rsi_min: Optional[float] = None
     rsi_max: Optional[float] = None
 
+    # 7) 价格区间（最后一日收盘价）
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+
+    # 8) 截面排名（最后一日，读取 xs_rank 特征库，见 strategy.cross_section）
+    xs_feature: Optional[str] = None  # ret_N(N日涨幅) | turnover | amplitude | volume_ratio
+    xs_scope: str = "market"  # market(全市场) | industry(行业内)
+    xs_pct_min: Optional[float] = None  # 百分位下限（0~100），如 90 表示前 10%
+    xs_pct_max: Optional[float] = None  # 百分位上限（0~100）
+    xs_top_n: Optional[int] = None  # 降序名次不超过 N（1 为截面最大）
+
+    # 9) K线周期：weekly / monthly 时全部规则作用于周/月K线（读取 weekly_kline / monthly_kline，见 strategy.timeframe），
+    #    上文的“日”“N日”均指该周期的一根/N根K线
+    timeframe: str = "daily"  # daily | weekly | monthly
+
+    # 10) 复权方式：价格类规则（均线/突破/形态/价格区间等）所用的K线价格，见 strategy.adjust；
+    #     qfq 下最新价与原始价一致，历史价按除权折算；没有 adj_factor 的数据按原始价格
+    adjust: str = DEFAULT_ADJUST  # raw | qfq | hfq
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any] | None) -> "StrategyConfig":
+        """由接口传入的字典构建配置，忽略未知字段。"""
+        if isinstance(data, cls):
+            return data
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (data or {}).items() if k in known})
+
+
+# 规则名 -> 判定该规则对当前配置是否生效（未启用的规则恒为 True，无需计时）
+RULE_ENABLED: Dict[str, Callable[[StrategyConfig], bool]] = {
+    "price": lambda c: c.price_min is not None or c.price_max is not None,
+    "volume": lambda c: bool(c.volume_mode),
+    "ma": lambda c: bool(c.price_above_ma) or c.ma_alignment in ("long", "short"),
+    "range": lambda c: c.range_increase_min_pct is not None or c.last_pct_chg_min is not None
+        or bool(c.exists_day_increase_within_days and c.exists_day_increase_min_pct is not None)
+        or bool(c.limit_up_streak_min),
+    "pattern": lambda c: bool(c.enable_patterns),
+    "breakout": lambda c: bool(c.breakout_n),
+    "atr": lambda c: bool(c.atr_period and c.atr_max_pct_of_price),
+    "macd": lambda c: bool(c.macd_enable),
+    "rsi": lambda c: bool(c.rsi_enable),
+    "xsrank": lambda c: xs_enabled(c),
+}
+
+# 无历史统计时的先验顺序：廉价的标量判断在前，形态识别等逐行循环在后
+DEFAULT_RULE_ORDER: List[str] = ["price", "xsrank", "range", "volume", "ma", "breakout", "atr", "rsi", "macd", "pattern"]
+
+
+class RuleStats:
+    """按规则累计评估耗时与淘汰率，用于学习短路顺序。
+    - 耗时与淘汰率使用指数滑动平均(alpha)，以便跟随最近几次运行的数据分布
+    - 排序依据：期望淘汰代价 = 平均耗时 / 淘汰率，越小越先执行
+    - 同一实例可被多个线程中的 StockSelector 共享，读写统计均在实例锁内进行
+    """
+    def __init__(self, alpha: float = 0.05):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ewma_cost: Dict[str, float] = {}
+        self._ewma_reject: Dict[str, float] = {}
+        self._evaluated: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+        self._total_time: Dict[str, float] = {}
+
+    def record(self, rule: str, elapsed: float, passed: bool) -> None:
+        a = self.alpha
+        rej = 0.0 if passed else 1.0
+        with self._lock:
+            if rule in self._ewma_cost:
+                self._ewma_cost[rule] += a * (elapsed - self._ewma_cost[rule])
+                self._ewma_reject[rule] += a * (rej - self._ewma_reject[rule])
+            else:
+                self._ewma_cost[rule] = elapsed
+                self._ewma_reject[rule] = rej
+            self._evaluated[rule] = self._evaluated.get(rule, 0) + 1
+            self._rejected[rule] = self._rejected.get(rule, 0) + (0 if passed else 1)
+            self._total_time[rule] = self._total_time.get(rule, 0.0) + elapsed
+
+    def order(self, rules: List[str]) -> List[str]:
+        """按期望淘汰代价升序排列；未观测过的规则保持先验顺序并排在已观测规则之前，
+        以尽快获得统计。"""
+        prior = {r: i for i, r in enumerate(DEFAULT_RULE_ORDER)}
+        with self._lock:
+            cost = dict(self._ewma_cost)
+            reject = dict(self._ewma_reject)
+
+        def key(rule: str):
+            if rule not in cost:
+                return (0, prior.get(rule, len(prior)), 0.0)
+            return (1, 0, cost[rule] / max(reject[rule], 1e-3))
+        return sorted(rules, key=key)
+
+    def report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = []
+            for rule in DEFAULT_RULE_ORDER:
+                n = self._evaluated.get(rule, 0)
+                if n == 0:
+                    continue
+                total = self._total_time.get(rule, 0.0)
+                rows.append({
+                    "rule": rule,
+                    "evaluated": n,
+                    "rejected": self._rejected.get(rule, 0),
+                    "reject_rate": round(self._rejected.get(rule, 0) / n * 100.0, 2),
+                    "avg_ms": round(total / n * 1000.0, 4),
+                    "total_ms": round(total * 1000.0, 2),
+                    "recent_reject_rate": round(self._ewma_reject[rule] * 100.0, 2),
+                })
+            return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
 
 class StockSelector:
-    def __init__(self, db_conn=None):
+    def __init__(self, db_conn=None, rule_stats: RuleStats | None = None):
         # 可注入数据库连接
         self.conn = db_conn
+        # 规则统计跨多次 filter_stocks 复用，实现“从最近运行中学习”
+        self.rule_stats = rule_stats or RuleStats()
+        # 前复权基准（各股最新 adj_factor）按代码缓存，逐日回测反复评估同一只股票时只查一次
+        self._latest_factor: Dict[str, Optional[float]] = {}
+        self._rule_funcs: Dict[str, Callable[[pd.DataFrame, StrategyConfig], bool]] = {
+            "price": self._price_range_signal,
+            "volume": self._volume_signal,
+            "ma": self._ma_system_signal,
+            "range": self._range_increase_signal,
+            "pattern": self._pattern_signal,
+            "breakout": self._breakout_signal,
+            "atr": self._atr_filter,
+            "macd": self._macd_signal,
+            "rsi": self._rsi_signal,
+            "xsrank": self._xs_rank_signal,
+        }
 
     # ====== 工具方法 ======
-    def _load_kline(self, ts_code: str, start: str, end: str) -> pd.DataFrame:
-        q = """
-        SELECT trade_date, open, high, low, close, vol, pct_chg
-        FROM daily_kline
+    def _load_kline(self, ts_code: str, start: str, end: str, table: str = "daily_kline",
+                    adjust: str = "raw") -> pd.DataFrame:
+        adjust = normalize_adjust(adjust)
+        q = f"""
+        SELECT trade_date, open, high, low, close, vol, pct_chg, limit_status{', adj_factor' if adjust != 'raw' else ''}
+        FROM {table}
         WHERE ts_code=? AND trade_date>=? AND trade_date<=?
         ORDER BY trade_date ASC
         """
         df = pd.read_sql_query(q, self.conn, params=(ts_code, start, end))
-        return df
+        if adjust == "raw":
+            return df
+        if adjust == "qfq" and ts_code not in self._latest_factor:
+            self._latest_factor[ts_code] = latest_factors(self.conn, [ts_code]).get(ts_code)
+        return adjust_bars(df, adjust, self._latest_factor.get(ts_code)).drop(columns="adj_factor")
 
     def _calc_ma(self, s: pd.Series, n: int) -> pd.Series:
         return s.rolling(n, min_periods=1).mean()
@@ -129,8 +276,22 @@ class StockSelector:
         if cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None:
             recent = df['pct_chg'].tail(cfg.exists_day_increase_within_days).dropna()
             ok = ok and (not recent.empty and recent.max() >= cfg.exists_day_increase_min_pct)
+        if cfg.last_pct_chg_min is not None:
+            ok = ok and bool(df['pct_chg'].iloc[-1] >= cfg.last_pct_chg_min)
+        if cfg.limit_up_streak_min:
+            # 从最后一根K线往前数连续涨停
+            streak = int((df['limit_status'].fillna(0) > 0)[::-1].cumprod().sum())
+            ok = ok and streak >= cfg.limit_up_streak_min
         return ok
 
+    def _price_range_signal(self, df: pd.DataFrame, cfg: StrategyConfig) -> bool:
+        price = df['close'].iloc[-1]
+        if cfg.price_min is not None and not (price >= cfg.price_min):
+            return False
+        if cfg.price_max is not None and not (price <= cfg.price_max):
+            return False
+        return True
+
     def _pattern_signal(self, df: pd.DataFrame, cfg: StrategyConfig) -> bool:
         if not cfg.enable_patterns:
             return True
@@ -182,29 +343,71 @@ class StockSelector:
             return False
         return True
 
+    def _xs_rank_signal(self, df: pd.DataFrame, cfg: StrategyConfig) -> bool:
+        if not xs_enabled(cfg):
+            return True
+        # 截面排名依赖全市场数据，逐只评估时直接查特征库中最后一日的记录
+        ts_code = df.attrs.get("ts_code")
+        if self.conn is None or not ts_code:
+            return False
+        pct_col, rank_col = xs_columns(cfg.xs_scope or "market")
+        row = self.conn.execute(
+            f"SELECT {pct_col}, {rank_col} FROM xs_rank WHERE trade_date=? AND feature=? AND ts_code=?",
+            (df['trade_date'].iloc[-1], cfg.xs_feature, ts_code)
+        ).fetchone()
+        if row is None:
+            return False
+        return bool(xs_condition(cfg, row[0], row[1]))
+
+    # ====== 规则评估 ======
+    def evaluate_rules(self, df: pd.DataFrame, cfg: StrategyConfig, explain: bool = True) -> Dict[str, bool]:
+        """按学习到的顺序评估已启用规则。
+        - explain=True：计算全部规则（供 UI 详情列展示）
+        - explain=False：遇到第一条失败规则即返回，未评估的规则不出现在结果中
+        未启用的规则恒为 True，直接写入结果而不计入统计。
+        """
+        checks: Dict[str, bool] = {}
+        enabled = []
+        for name in DEFAULT_RULE_ORDER:
+            if RULE_ENABLED[name](cfg):
+                enabled.append(name)
+            else:
+                checks[name] = True
+        for name in self.rule_stats.order(enabled):
+            t0 = time.perf_counter()
+            ok = bool(self._rule_funcs[name](df, cfg))
+            self.rule_stats.record(name, time.perf_counter() - t0, ok)
+            checks[name] = ok
+            if not ok and not explain:
+                break
+        return checks
+
+    def rule_report(self) -> pd.DataFrame:
+        """各规则的评估次数、累计/平均耗时与淘汰率（按默认规则顺序）。"""
+        return pd.DataFrame(self.rule_stats.report())
+
     # ====== 主入口：对单只股票评估 ======
-    def evaluate_single(self, ts_code: str, start: str, end: str, cfg: StrategyConfig) -> Dict[str, Any]:
-        df = self._load_kline(ts_code, start, end)
+    def evaluate_single(self, ts_code: str, start: str, end: str, cfg: StrategyConfig, explain: bool = True) -> Dict[str, Any]:
+        df = self._load_kline(ts_code, start, end, kline_table(cfg.timeframe), cfg.adjust)
         if df is None or df.empty or len(df) < 3:
             return {"ts_code": ts_code, "pass": False, "reason": "no_data"}
-        checks = {
-            "volume": self._volume_signal(df, cfg),
-            "ma": self._ma_system_signal(df, cfg),
-            "range": self._range_increase_signal(df, cfg),
-            "pattern": self._pattern_signal(df, cfg),
-            "breakout": self._breakout_signal(df, cfg),
-            "atr": self._atr_filter(df, cfg),
-            "macd": self._macd_signal(df, cfg),
-            "rsi": self._rsi_signal(df, cfg),
-        }
-        passed = all(checks.values())
+        df.attrs["ts_code"] = ts_code
+        checks = self.evaluate_rules(df, cfg, explain=explain)
+        passed = len(checks) == len(RULE_ENABLED) and all(checks.values())
         return {"ts_code": ts_code, "pass": passed, "checks": checks}
 
     # ====== 对股票列表进行筛选 ======
-    def filter_stocks(self, ts_codes: List[str], start: str, end: str, cfg: StrategyConfig) -> pd.DataFrame:
+    def filter_stocks(self, ts_codes: List[str], start: str, end: str, cfg: StrategyConfig, prefilter: bool = True) -> pd.DataFrame:
+        # 先用 SQL 预筛缩小候选集合（只下推可由 SQLite 精确表达的条件），再逐只评估
+        if prefilter and self.conn is not None:
+            from strategy.planner import SelectionPlanner
+            survivors = SelectionPlanner(self.conn).candidates(cfg, start, end, ts_codes)
+            if survivors is not None:
+                ts_codes = [c for c in ts_codes if c in survivors]
+        # 筛选模式：短路评估；通过的股票必然已计算全部规则，checks 完整
         rows = []
         for code in ts_codes:
-            res = self.evaluate_single(code, start, end, cfg)
+            res = self.evaluate_single(code, start, end, cfg, explain=False)
             if res.get('pass'):
                 rows.append(res)
         return pd.DataFrame(rows)
@@ -0,0 +1,187 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 可参与形态匹配的字段
+SHAPE_FIELDS = ("close", "vol")
+# 匹配点之后统计的远期收益（交易日）
+DEFAULT_HORIZONS = (5, 10, 20)
+# 每块处理的代码数，限制单次逆 FFT 的中间结果大小
+SEARCH_BLOCK = 1000
+
+
+def znorm(values: Iterable[float]) -> np.ndarray:
+    """z 标准化（总体标准差）；含缺失或无波动时抛 ValueError。"""
+    x = np.asarray(list(values), dtype=float)
+    if len(x) < 2 or not np.isfinite(x).all():
+        raise ValueError("查询序列至少 2 个有效值且不能有缺失")
+    sd = x.std()
+    if sd <= 0:
+        raise ValueError("查询序列没有波动")
+    return (x - x.mean()) / sd
+
+
+class ShapeIndex:
+    """全市场逐K线序列的形态检索索引。
+
+    各代码的K线按 (代码, 日期) 展平存储，检索时左对齐填充为 (代码 × 最长K线数) 的网格；
+    每个字段预计算前缀和（求任意窗口的均值/标准差）与按行的 rfft，一次查询只需对查询序列做 FFT、
+    逐块相乘后逆变换，即得到所有代码、所有结束位置上的滑动点积（MASS 算法），
+    进而得到 z 标准化后的 Pearson 相关系数。与窗口长度无关，同一索引可服务任意 N。"""
+
+    def __init__(self, codes: Iterable[str], dates: np.ndarray, lengths: np.ndarray,
+                 series: Dict[str, np.ndarray]):
+        self.codes = pd.Index(list(codes), dtype=object)
+        self.dates = np.asarray(dates, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).astype(np.int64)
+        self.series = {k: np.asarray(v, dtype=float) for k, v in series.items()}
+        self.width = int(self.lengths.max()) if len(self.lengths) else 0
+        self.nfft = 1 << max(self.width - 1, 1).bit_length()
+        self._grids: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ShapeIndex":
+        """由按 (ts_code, trade_date) 排序的长表 (ts_code, trade_date, close[, vol]) 构建。"""
+        codes, lengths = np.unique(df["ts_code"].to_numpy(), return_counts=True)
+        series = {f: df[f].to_numpy(dtype=float) for f in SHAPE_FIELDS if f in df.columns}
+        if "vol" in series:
+            series["vol"] = np.nan_to_num(series["vol"], nan=0.0)
+        return cls(codes, df["trade_date"].astype(np.int64).to_numpy(), lengths, series)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _grid(self, field: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(前缀和, 平方前缀和, 按行 rfft)，首次使用时构建并缓存。"""
+        if field not in self._grids:
+            n = len(self.codes)
+            rows = np.repeat(np.arange(n), self.lengths)
+            cols = np.arange(len(self.dates)) - np.repeat(self.offsets, self.lengths)
+            grid = np.zeros((n, self.width))
+            grid[rows, cols] = self.series[field]
+            # 先逐行去均值，减小前缀和的舍入误差
+            grid[rows, cols] -= np.repeat(grid.sum(axis=1) / np.maximum(self.lengths, 1), self.lengths)
+            csum = np.zeros((n, self.width + 1))
+            csum2 = np.zeros((n, self.width + 1))
+            np.cumsum(grid, axis=1, out=csum[:, 1:])
+            np.cumsum(grid * grid, axis=1, out=csum2[:, 1:])
+            self._grids[field] = (csum, csum2, np.fft.rfft(grid, n=self.nfft, axis=1))
+        return self._grids[field]
+
+    def position(self, code: str, end: Optional[int] = None) -> Tuple[int, int]:
+        """代码（带或不带后缀）与截止日 -> (代码下标, 截止日及之前最后一根K线的位置)；找不到时抛 ValueError。"""
+        i = self.codes.get_indexer([code])[0]
+        if i < 0:
+            bare = [j for j, c in enumerate(self.codes) if str(c).split('.')[0] == str(code).split('.')[0]]
+            if not bare:
+                raise ValueError(f"索引中没有 {code} 的K线")
+            i = bare[0]
+        d = self.dates[self.offsets[i]:self.offsets[i] + self.lengths[i]]
+        pos = int(np.searchsorted(d, end, side="right")) - 1 if end is not None else len(d) - 1
+        if pos < 0:
+            raise ValueError(f"{code} 在 {end} 之前没有K线")
+        return int(i), pos
+
+    def window(self, field: str, code_idx: int, pos: int, n: int) -> np.ndarray:
+        """代码 code_idx 以位置 pos 结束的 n 根K线字段值。"""
+        if pos + 1 < n:
+            raise ValueError(f"K线不足 {n} 根")
+        off = self.offsets[code_idx]
+        return self.series[field][off + pos - n + 1:off + pos + 1]
+
+    def _scores(self, queries: Dict[str, np.ndarray], weights: Dict[str, float], rows: slice) -> np.ndarray:
+        """一块代码上所有结束位置的加权相关系数，无效位置为 -inf。"""
+        n = len(next(iter(queries.values())))
+        total = np.zeros((rows.stop - rows.start, self.width))
+        for field, q in queries.items():
+            csum, csum2, fx = self._grid(field)
+            fq = np.fft.rfft(q[::-1], n=self.nfft)
+            dot = np.fft.irfft(fx[rows] * fq, n=self.nfft, axis=1)[:, :self.width]
+            s1 = np.full_like(total, np.nan)
+            s2 = np.full_like(total, np.nan)
+            s1[:, n - 1:] = csum[rows, n:] - csum[rows, :-n]
+            s2[:, n - 1:] = csum2[rows, n:] - csum2[rows, :-n]
+            mean = s1 / n
+            sd = np.sqrt(np.maximum(s2 / n - mean * mean, 0.0))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # q 已 z 标准化（和为 0），窗口去均值项消去
+                corr = np.where(sd > 1e-9, dot / (n * sd), np.nan)
+            total += weights[field] * corr
+        total /= sum(weights[f] for f in queries)
+        valid = np.arange(self.width)[None, :] < self.lengths[rows, None]
+        return np.where(valid & np.isfinite(total), np.minimum(total, 1.0), -np.inf)
+
+    def search(self, queries: Dict[str, np.ndarray], weights: Optional[Dict[str, float]] = None, k: int = 20,
+               per_code: int = 1, since: Optional[int] = None, until: Optional[int] = None,
+               codes: Optional[Iterable[str]] = None, exclude: Optional[Tuple[int, int]] = None,
+               horizons: Iterable[int] = DEFAULT_HORIZONS) -> pd.DataFrame:
+        """按形态相关系数取前 k 个匹配。
+
+        queries 为 {字段: z 标准化后的查询序列}（等长）；weights 为字段权重（缺省等权）。
+        同一代码最多取 per_code 个互不重叠（结束位置相距至少 N）的匹配；since/until 限定匹配结束日 (yyyymmdd 整数)；
+        exclude=(代码下标, 位置) 排除与查询窗口本身重叠的匹配。返回每个匹配一行，含其后各 horizon 日的远期收益（%）。"""
+        queries = {f: np.asarray(q, dtype=float) for f, q in queries.items()}
+        n = len(next(iter(queries.values())))
+        if n > self.width:
+            raise ValueError(f"查询长度 {n} 超过索引中最长K线数 {self.width}")
+        weights = {f: float((weights or {}).get(f, 1.0)) for f in queries}
+        horizons = [int(h) for h in horizons]
+        allowed = None
+        if codes is not None:
+            allowed = np.zeros(len(self.codes), dtype=bool)
+            for c in codes:
+                try:
+                    allowed[self.position(c)[0]] = True
+                except ValueError:
+                    continue
+        cols = np.arange(self.width)
+        found: List[Tuple[float, int, int]] = []
+        for start in range(0, len(self.codes), SEARCH_BLOCK):
+            rows = slice(start, min(start + SEARCH_BLOCK, len(self.codes)))
+            if allowed is not None and not allowed[rows].any():
+                continue
+            s = self._scores(queries, weights, rows)
+            if allowed is not None:
+                s[~allowed[rows]] = -np.inf
+            if since is not None or until is not None:
+                # 网格位置 -> 日期：展平下标 = 偏移 + 位置（越界位置已是 -inf）
+                flat = np.minimum(self.offsets[rows, None] + cols[None, :], len(self.dates) - 1)
+                d = self.dates[flat]
+                if since is not None:
+                    s[d < since] = -np.inf
+                if until is not None:
+                    s[d > until] = -np.inf
+            if exclude is not None and start <= exclude[0] < rows.stop:
+                s[exclude[0] - start, np.abs(cols - exclude[1]) < n] = -np.inf
+            # 每轮取各代码当前最优，并屏蔽其前后 N 根内的重叠窗口
+            for _ in range(max(int(per_code), 1)):
+                best = np.argmax(s, axis=1)
+                val = s[np.arange(len(best)), best]
+                hit = np.flatnonzero(np.isfinite(val))
+                if not len(hit):
+                    break
+                found.extend(zip(val[hit].tolist(), (hit + start).tolist(), best[hit].tolist()))
+                s[np.abs(cols[None, :] - best[:, None]) < n] = -np.inf
+        found.sort(key=lambda t: (-t[0], t[1], t[2]))
+        found = found[:max(int(k), 0)]
+
+        records = []
+        close = self.series.get("close")
+        for score, ci, pos in found:
+            off, length = self.offsets[ci], self.lengths[ci]
+            rec = {
+                "ts_code": str(self.codes[ci]),
+                "start_date": str(self.dates[off + pos - n + 1]),
+                "end_date": str(self.dates[off + pos]),
+                "score": round(float(score), 4),
+                # z 标准化欧氏距离，与相关系数单调对应
+                "distance": round(float(np.sqrt(max(2.0 * n * (1.0 - score), 0.0))), 4),
+            }
+            for h in horizons:
+                ok = close is not None and pos + h < length and close[off + pos] > 0
+                rec[f"fwd_ret_{h}"] = round(float((close[off + pos + h] / close[off + pos] - 1.0) * 100.0), 3) if ok else None
+            records.append(rec)
+        return pd.DataFrame(records, columns=["ts_code", "start_date", "end_date", "score", "distance",
+                                              *[f"fwd_ret_{h}" for h in horizons]])
@@ -0,0 +1,159 @@
+import itertools
+import math
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from strategy.panel import Panel
+from strategy.selector import StrategyConfig
+from strategy.vector_backtest import VectorBacktester
+
+# 回测运行参数（其余键按 StrategyConfig 字段或 "weights.xxx" 解析）
+RUN_PARAMS = (
+    "lookback_days", "forward_n", "fee_single_side_bps", "top_k_per_day",
+    "entry_mode", "exit_mode", "exclude_limit_up", "limit_up_threshold",
+)
+WEIGHT_PREFIX = "weights."
+# 结果表中的指标列
+METRIC_COLUMNS = ["signals", "win_rate", "avg_ret", "avg_ret_after_fee", "median_ret", "mdd"]
+
+
+@dataclass
+class EarlyStop:
+    """提前淘汰：先在前 frac 比例的交易日上试跑，信号数足够且指标明显不达标的点不再跑全量。"""
+    frac: float = 0.3
+    min_signals: int = 30
+    min_win_rate: Optional[float] = None
+    min_avg_ret_after_fee: Optional[float] = None
+
+    def is_bad(self, summary: Dict[str, Any]) -> bool:
+        if summary.get("signals", 0) < self.min_signals:
+            return False
+        if self.min_win_rate is not None and summary["win_rate"] < self.min_win_rate:
+            return True
+        if self.min_avg_ret_after_fee is not None and summary["avg_ret_after_fee"] < self.min_avg_ret_after_fee:
+            return True
+        return False
+
+
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """{参数: 候选值列表} -> 全部组合。"""
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(list(grid[k]) for k in keys))]
+
+
+def split_point(point: Dict[str, Any], base_cfg: StrategyConfig, base_params: Dict[str, Any],
+                base_weights: Optional[Dict[str, float]]) -> Tuple[StrategyConfig, Dict[str, Any], Dict[str, float]]:
+    """把一个网格点拆成 (策略配置, 运行参数, 评分权重)。未知键抛 ValueError。"""
+    cfg_fields = {f.name for f in fields(StrategyConfig)}
+    cfg_updates, params, weights = {}, dict(base_params), dict(base_weights or {})
+    for k, v in point.items():
+        if k in RUN_PARAMS:
+            params[k] = v
+        elif k.startswith(WEIGHT_PREFIX):
+            weights[k[len(WEIGHT_PREFIX):]] = v
+        elif k in cfg_fields:
+            cfg_updates[k] = list(v) if isinstance(v, tuple) else v
+        else:
+            raise ValueError(f"未知的扫描参数: {k}")
+    return replace(base_cfg, **cfg_updates), params, weights
+
+
+# ====== 进程内状态 ======
+# 每个工作进程持有一份面板与指标缓存，分到同一进程的网格点共享指标中间结果
+WORKER_STATE: Dict[str, Any] = {}
+
+
+def build_worker_state(panel: Panel, early_stop: Optional[EarlyStop]) -> Dict[str, Any]:
+    state = {"full": VectorBacktester(panel), "early_stop": early_stop, "probe": None}
+    if early_stop is not None:
+        cut = max(int(len(panel.index) * early_stop.frac), 2)
+        state["probe"] = VectorBacktester(panel.take_rows(slice(0, cut)))
+    return state
+
+
+def init_worker(state: Dict[str, Any]) -> None:
+    WORKER_STATE.update(state)
+
+
+def pool_context():
+    """进程池启动方式：仅在单线程进程（命令行工具）中 fork，子进程直接继承父进程预热的指标缓存；
+    API 进程里扫描运行在 JobQueue 工作线程中，此时 fork 可能复制其他线程持有的锁而死锁，
+    改用 spawn（状态经 initargs 序列化传给子进程，启动稍慢但安全）。"""
+    if "fork" in mp.get_all_start_methods() and threading.active_count() == 1:
+        return mp.get_context("fork")
+    return mp.get_context("spawn")
+
+
+def _run_point(task: Tuple[int, StrategyConfig, Dict[str, Any], Dict[str, float]]) -> Dict[str, Any]:
+    idx, cfg, params, weights = task
+    t0 = time.perf_counter()
+    early_stop: Optional[EarlyStop] = WORKER_STATE["early_stop"]
+    status = "done"
+    if early_stop is not None:
+        summary = WORKER_STATE["probe"].run(cfg, weights=weights, **params).summary
+        if early_stop.is_bad(summary):
+            status = "stopped"
+    if status == "done":
+        summary = WORKER_STATE["full"].run(cfg, weights=weights, **params).summary
+    row = {"index": idx, "status": status}
+    row.update({k: summary.get(k) for k in METRIC_COLUMNS})
+    row["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    return row
+
+
+class ParameterSweep:
+    """参数扫描：面板只加载一次，网格点分发到多个进程并行回测，返回排名表。
+
+    - 网格键可以是 StrategyConfig 字段、RUN_PARAMS 中的运行参数或 "weights.vol" 这类评分权重
+    - 同一进程内的网格点共享 IndicatorCache（均线/MACD/形态等只算一次），
+      任务按配置排序后成块分发，使相近的点落在同一进程
+    - early_stop：先在前一段交易日上试跑，明显不达标的点标记为 stopped 并排在末尾
+    """
+    def __init__(self, panel: Panel, base_cfg: Optional[StrategyConfig] = None,
+                 base_params: Optional[Dict[str, Any]] = None, weights: Optional[Dict[str, float]] = None):
+        self.panel = panel
+        self.base_cfg = base_cfg or StrategyConfig()
+        self.base_params = dict(base_params or {})
+        self.weights = weights
+
+    def run(self, grid: Dict[str, Iterable[Any]] | List[Dict[str, Any]], processes: Optional[int] = None,
+            early_stop: Optional[EarlyStop] = None, rank_by: str = "avg_ret_after_fee",
+            ascending: bool = False) -> pd.DataFrame:
+        points = expand_grid(grid) if isinstance(grid, dict) else list(grid)
+        tasks = [(i, *split_point(p, self.base_cfg, self.base_params, self.weights)) for i, p in enumerate(points)]
+        if not tasks:
+            return pd.DataFrame()
+        # 相同指标参数的点相邻，提高进程内缓存命中
+        tasks.sort(key=lambda t: repr(t[1]))
+        processes = min(processes or os.cpu_count() or 1, len(tasks))
+        state = build_worker_state(self.panel, early_stop)
+        if processes <= 1:
+            init_worker(state)
+            rows = [_run_point(t) for t in tasks]
+        else:
+            # 先在父进程算好所有网格点共用的指标与前瞻价格，再交给子进程（fork 继承 / spawn 序列化），不重复计算
+            for _, cfg, params, _w in tasks:
+                fwd = (params.get("forward_n", 5), params.get("entry_mode", "close"), params.get("exit_mode", "close"))
+                for bt in (state["full"], state["probe"]):
+                    if bt is not None:
+                        bt.warm(cfg, *fwd)
+            ctx = pool_context()
+            chunksize = max(1, math.ceil(len(tasks) / (processes * 4)))
+            with ProcessPoolExecutor(max_workers=processes, mp_context=ctx,
+                                     initializer=init_worker, initargs=(state,)) as ex:
+                rows = list(ex.map(_run_point, tasks, chunksize=chunksize))
+
+        table = pd.DataFrame(rows).sort_values("index").reset_index(drop=True)
+        table = pd.concat([pd.DataFrame(points), table.drop(columns="index")], axis=1)
+        table["_stopped"] = table["status"] == "stopped"
+        table = table.sort_values(["_stopped", rank_by], ascending=[True, ascending], kind="stable")
+        table = table.drop(columns="_stopped").reset_index(drop=True)
+        table.insert(0, "rank", range(1, len(table) + 1))
+        return table
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# K线周期 -> 存储表（周/月K线由日线聚合，见 TimeframeRepository）
+TIMEFRAMES: Dict[str, str] = {"daily": "daily_kline", "weekly": "weekly_kline", "monthly": "monthly_kline"}
+PERIOD_TIMEFRAMES: Tuple[str, ...] = ("weekly", "monthly")
+
+# 聚合所需的 daily_kline 字段
+DAILY_FIELDS: List[str] = ["open", "high", "low", "close", "vol", "amount", "pct_chg", "turnover_rate",
+                           "pre_close", "circ_mv", "total_mv", "limit_status", "adj_factor"]
+# weekly_kline / monthly_kline 的列（与 aggregate_bars 输出一致）
+PERIOD_COLUMNS: List[str] = [
+    "ts_code", "period", "trade_date", "first_date", "last_date", "bars",
+    "open", "high", "low", "close", "vol", "amount", "pct_chg", "turnover_rate", "pre_close", "amplitude",
+    "circ_mv", "total_mv", "limit_status", "adj_factor",
+]
+
+_FMT = "%Y%m%d"
+
+
+def kline_table(timeframe: str | None) -> str:
+    """周期 -> K线表名；未知周期抛 ValueError。"""
+    tf = timeframe or "daily"
+    if tf not in TIMEFRAMES:
+        raise ValueError(f"未知的K线周期: {timeframe}")
+    return TIMEFRAMES[tf]
+
+
+def period_keys(dates, timeframe: str) -> np.ndarray:
+    """交易日 (yyyymmdd) -> 所属周期键：周为该自然周周一的日期，月为当月 1 日（yyyymm01）。
+    周期按自然周/月划分，只包含实际有K线的交易日，节假日所在周/月自然变短。"""
+    dates = np.asarray(dates, dtype=object).astype(str)
+    if timeframe == "monthly":
+        return np.char.add(dates.astype("U6"), "01")
+    if timeframe == "weekly":
+        d = pd.to_datetime(pd.Series(dates), format=_FMT)
+        return (d - pd.to_timedelta(d.dt.weekday, unit="D")).dt.strftime(_FMT).to_numpy(dtype=str)
+    raise ValueError(f"不支持聚合的K线周期: {timeframe}")
+
+
+def period_bounds(date: str, timeframe: str) -> Tuple[str, str]:
+    """包含 date 的周期的自然日起止 (yyyymmdd, yyyymmdd)。"""
+    d = datetime.strptime(date, _FMT)
+    if timeframe == "weekly":
+        first = d - timedelta(days=d.weekday())
+        last = first + timedelta(days=6)
+    elif timeframe == "monthly":
+        first = d.replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    else:
+        raise ValueError(f"不支持聚合的K线周期: {timeframe}")
+    return first.strftime(_FMT), last.strftime(_FMT)
+
+
+def aggregate_bars(daily: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """日线长表 (ts_code, trade_date, DAILY_FIELDS...) -> 周期K线，每个 (代码, 周期) 一行，列见 PERIOD_COLUMNS。
+
+    - 开/收取周期内首/末根K线，高/低取极值，量、额、换手率求和；市值与涨跌停状态取末根
+    - pre_close 取首根K线的昨收（缺失时由首根收盘与涨跌幅反推），pct_chg/amplitude 相对它计算
+    - 周期内有除权时，各根K线的价格先按 adj_factor 折算到周期末根的口径再聚合，adj_factor 取末根因子，
+      因此周/月K线与日线一样是“原始价格 + 因子”，可按同一方式复权（见 strategy.adjust）
+    - trade_date 为周期内全市场最后一个交易日（未结束的周期即最新交易日），同一周期所有代码一致，
+      便于按日期对齐成面板；个股自身的首末K线日期见 first_date/last_date
+    一次 groupby 完成，输入只需覆盖完整周期（见 period_bounds）。"""
+    if daily is None or daily.empty:
+        return pd.DataFrame(columns=PERIOD_COLUMNS)
+    df = daily.sort_values(["ts_code", "trade_date"], kind="stable").copy()
+    df["trade_date"] = df["trade_date"].astype(str)
+    df["period"] = period_keys(df["trade_date"].to_numpy(), timeframe)
+    pct = pd.to_numeric(df["pct_chg"], errors="coerce")
+    implied = df["close"] / (1.0 + pct / 100.0)
+    df["pre_close"] = pd.to_numeric(df["pre_close"], errors="coerce").fillna(implied)
+    # 缺失因子按同股最近的已知因子补齐，整段无因子视为不复权
+    factor = pd.to_numeric(df["adj_factor"], errors="coerce")
+    factor = factor.groupby(df["ts_code"]).bfill().groupby(df["ts_code"]).ffill()
+    df["adj_factor"] = factor
+    scale = (factor / factor.groupby([df["ts_code"], df["period"]]).transform("last")).fillna(1.0)
+    for col in ("open", "high", "low", "close", "pre_close"):
+        df[col] = pd.to_numeric(df[col], errors="coerce") * scale
+    g = df.groupby(["ts_code", "period"], sort=False)
+    out = g.agg(
+        first_date=("trade_date", "first"), last_date=("trade_date", "last"), bars=("trade_date", "size"),
+        open=("open", "first"), high=("high", "max"), low=("low", "min"), close=("close", "last"),
+        vol=("vol", "sum"), amount=("amount", "sum"), turnover_rate=("turnover_rate", "sum"),
+        pre_close=("pre_close", "first"), circ_mv=("circ_mv", "last"), total_mv=("total_mv", "last"),
+        limit_status=("limit_status", "last"), adj_factor=("adj_factor", "last"),
+    ).reset_index()
+    # 全部为空的求和列保持为空，而不是 0
+    for col in ("vol", "amount", "turnover_rate"):
+        has = g[col].count().to_numpy() > 0
+        out[col] = out[col].where(has)
+    out["trade_date"] = out["period"].map(df.groupby("period")["trade_date"].max())
+    base = out["pre_close"].where(out["pre_close"] > 0)
+    out["pct_chg"] = (out["close"] / base - 1.0) * 100.0
+    out["amplitude"] = (out["high"] - out["low"]) / base * 100.0
+    return out[PERIOD_COLUMNS]
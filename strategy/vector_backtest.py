@@ -0,0 +1,198 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from strategy.backtest import BacktestResult, summarize_signals
+from strategy.benchmark import Benchmark
+from strategy.bulk import BulkEvaluator
+from strategy.limits import limit_up_mask
+from strategy.panel import IndicatorCache, Panel
+from strategy.scoring import score_frames, top_k_mask
+from strategy.selector import StrategyConfig
+
+
+class VectorBacktester:
+    """面板化的信号回测：参数、输出格式与 Backtester.run 相同，但整段区间一次性向量化计算。
+
+    - 信号：BulkEvaluator 的规则宽表（按 lookback 计算区间涨幅），逐日取 Top-K
+    - 入场/离场价：按每只股票自身的K线序号前移 n 根（停牌跳过），与逐只 SQL 口径一致
+    - 均线/N 日新高/区间涨幅等滚动与前移类指标同样按各股自身的K线计数（见 IndicatorCache.per_bar），
+      停牌时与 Backtester 的信号一致
+    - 指标在整段面板上连续计算，不随每个回看窗口重新初始化；
+      因此 EMA/RSI/ATR 类指标在窗口起点附近与 Backtester 的逐窗口结果略有差异
+    同一个 IndicatorCache 可在多次 run（不同参数）之间共享，供参数扫描/滚动优化复用。
+    """
+    # 候选信号最多等待多少个交易日的后续K线；更早仍无法成交的（长期停牌/退市）视为放弃
+    PENDING_HORIZON = 60
+
+    def __init__(self, panel: Panel, cache: Optional[IndicatorCache] = None):
+        if panel.align != "calendar":
+            raise ValueError("VectorBacktester 需要 calendar 对齐的面板")
+        self.panel = panel
+        self.cache = cache or IndicatorCache(panel)
+        self.evaluator = BulkEvaluator(self.cache)
+
+    def rule_frames(self, cfg: StrategyConfig, lookback_days: int) -> Dict[str, pd.DataFrame]:
+        return self.cache.get(("rule_frames", repr(cfg), int(lookback_days)),
+                              lambda: self.evaluator.rule_frames(cfg, lookback_days))
+
+    def signal_mask(self, cfg: StrategyConfig, lookback_days: int) -> np.ndarray:
+        """(日期 × 代码) 信号布尔数组：全部已启用规则通过且当日有K线。"""
+        key = ("signal_mask", repr(cfg), int(lookback_days))
+
+        def _calc():
+            ok = self.evaluator.valid_mask().to_numpy()
+            for frame in self.rule_frames(cfg, lookback_days).values():
+                ok = ok & frame.to_numpy(dtype=bool)
+            return ok
+        return self.cache.get(key, _calc)
+
+    def scores(self, cfg: StrategyConfig, lookback_days: int, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """(日期 × 代码) 评分数组（不区分是否为信号）。"""
+        return self.cache.get(
+            ("scores", repr(cfg), int(lookback_days), tuple(sorted((weights or {}).items()))),
+            lambda: score_frames(self.rule_frames(cfg, lookback_days), cfg, weights, like=self.panel["close"]).to_numpy())
+
+    def signal_scores(self, cfg: StrategyConfig, lookback_days: int,
+                      weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """信号处为评分、其余为 NaN 的 (日期 × 代码) 数组，供组合回测引擎使用。"""
+        return np.where(self.signal_mask(cfg, lookback_days), self.scores(cfg, lookback_days, weights), np.nan)
+
+    def forward_returns(self, forward_n: int, entry_mode: str = "close", exit_mode: str = "close"):
+        """返回 (入场行, 入场价, 离场行, 离场价) 四个 (日期 × 代码) 数组；无法成交处行号为 -1、价格为 NaN。"""
+        key = ("forward_returns", int(forward_n), entry_mode, exit_mode)
+
+        def _calc():
+            cols = np.arange(len(self.panel.codes))[None, :]
+            if entry_mode == "next_open":
+                entry_row = self.cache.forward_row(1)
+                entry_field = "open"
+            else:
+                entry_row = self.cache.forward_row(0)
+                entry_field = "close"
+            exit_row = self.cache.forward_row(int(forward_n) + (1 if entry_mode == "next_open" else 0))
+            exit_field = "open" if exit_mode == "open" else "close"
+            entry_px = np.where(entry_row >= 0, self.panel[entry_field].to_numpy()[np.maximum(entry_row, 0), cols], np.nan)
+            exit_px = np.where(exit_row >= 0, self.panel[exit_field].to_numpy()[np.maximum(exit_row, 0), cols], np.nan)
+            return entry_row, entry_px, exit_row, exit_px
+        return self.cache.get(key, _calc)
+
+    def warm(self, cfg: StrategyConfig, forward_n: int, entry_mode: str = "close", exit_mode: str = "close") -> None:
+        """预计算指标与前瞻价格（参数扫描在分发前调用，子进程直接继承）。"""
+        self.evaluator.warm(cfg)
+        self.forward_returns(forward_n, entry_mode, exit_mode)
+
+    def run(
+        self,
+        cfg: StrategyConfig,
+        lookback_days: int = 60,
+        forward_n: int = 5,
+        fee_single_side_bps: float = 3.0,
+        top_k_per_day: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        entry_mode: str = "close",
+        exit_mode: str = "close",
+        exclude_limit_up: bool = False,
+        limit_up_threshold: float = 9.8,
+        rows: Optional[slice] = None,
+        exit_before: Optional[int] = None,
+        benchmark: Optional[Benchmark] = None,
+    ) -> BacktestResult:
+        """rows 限定参与统计的信号日（行切片），默认跳过首行，与 Backtester 一致；
+        exit_before 为行号上限，离场行不早于它的信号被剔除（滚动优化的训练窗防止前视）；
+        benchmark 给出时，信号明细增加同一持有窗口的基准收益 bench_ret_pct 与（费前）超额收益 excess_ret_pct。
+        只对 rows 范围内的行做打分与 Top-K，开销与窗口长度成正比。"""
+        p = self.panel
+        dates = np.asarray(p.index)
+        codes = np.asarray(p.codes)
+        r0, r1, _ = (rows if rows is not None else slice(1, None)).indices(len(dates))
+        r1 = max(r0, r1)
+        win = slice(r0, r1)
+        sig = self.signal_mask(cfg, lookback_days)[win].copy()
+        if exclude_limit_up:
+            status = p.fields.get("limit_status")
+            pct = p["pct_chg"].to_numpy()[win]
+            sig &= ~(limit_up_mask(status.to_numpy()[win], pct, limit_up_threshold) if status is not None
+                     else pct >= limit_up_threshold)
+        entry_row, entry_px, exit_row, exit_px = self.forward_returns(forward_n, entry_mode, exit_mode)
+        entry_row, entry_px, exit_row, exit_px = entry_row[win], entry_px[win], exit_row[win], exit_px[win]
+        # 末尾若干行中缺少入场/离场K线的候选：新数据到来后该日的 Top-K 与收益都可能变化
+        unresolved = (sig & ((entry_row < 0) | (exit_row < 0))).any(axis=1)
+        unresolved[:max(len(dates) - self.PENDING_HORIZON - r0, 0)] = False
+        pending = np.flatnonzero(unresolved)
+        pending_from = str(dates[pending[0] + r0]) if len(pending) else None
+        # 入场价缺失的候选不参与排序（与 Backtester 先取入场价、后排序一致）
+        sig &= np.isfinite(entry_px)
+
+        scores = self.scores(cfg, lookback_days, weights)[win]
+        if top_k_per_day and top_k_per_day > 0:
+            counts = sig.sum(axis=1)
+            sig = top_k_mask(scores, top_k_per_day, sig)
+            truncated = counts > top_k_per_day
+        else:
+            truncated = np.zeros(r1 - r0, dtype=bool)
+        sig &= exit_row >= 0
+        if exit_before is not None:
+            sig &= exit_row < exit_before
+
+        r, c = np.nonzero(sig)
+        if len(r) == 0:
+            signals = pd.DataFrame()
+        else:
+            s = scores[r, c]
+            # 同日内：被截断的日期按得分降序，其余保持代码顺序
+            order = np.lexsort((c, np.where(truncated[r], -s, 0.0), r))
+            r, c, s = r[order], c[order], s[order]
+            e_px, x_px = entry_px[r, c], exit_px[r, c]
+            raw_ret = (x_px - e_px) / e_px * 100.0
+            fee_pct = 2.0 * fee_single_side_bps / 10.0  # 单边‰ 转为百分比并双边
+            signals = pd.DataFrame({
+                'trade_date': dates[r + r0],
+                'ts_code': codes[c],
+                'entry_date': dates[entry_row[r, c]],
+                'entry_price': np.round(e_px, 4),
+                'exit_date': dates[exit_row[r, c]],
+                'exit_price': np.round(x_px, 4),
+                'ret_pct': np.round(raw_ret, 4),
+                'ret_pct_after_fee': np.round(raw_ret - fee_pct, 4),
+                'score': np.round(s, 3),
+                'passed': True,
+            })
+            if benchmark is not None:
+                bench = benchmark.holding_return(entry_row[r, c], exit_row[r, c], c,
+                                                 "open" if entry_mode == "next_open" else "close",
+                                                 "open" if exit_mode == "open" else "close")
+                signals['bench_ret_pct'] = np.round(bench, 4)
+                signals['excess_ret_pct'] = np.round(raw_ret - bench, 4)
+        # 统计区间：默认为整段面板，指定 rows 时为该窗口
+        lo, hi = (0, len(dates)) if rows is None else (r0, r1)
+        start = str(dates[lo]) if hi > lo else ""
+        end = str(dates[hi - 1]) if hi > lo else ""
+        summary = summarize_signals(signals, start, end, {
+            'lookback_days': lookback_days,
+            'forward_n': forward_n,
+            'fee_single_side_bps': fee_single_side_bps,
+            'top_k_per_day': top_k_per_day,
+            'entry_mode': entry_mode,
+            'exit_mode': exit_mode,
+            'exclude_limit_up': exclude_limit_up,
+            'limit_up_threshold': limit_up_threshold,
+        })
+        if benchmark is not None:
+            summary.update(summarize_excess(signals, benchmark.name))
+        return BacktestResult(signals=signals, summary=summary, pending_from=pending_from)
+
+
+def summarize_excess(signals: pd.DataFrame, name: str) -> Dict[str, object]:
+    """超额收益汇总：只统计有基准数据的信号。"""
+    ex = signals['excess_ret_pct'].dropna() if 'excess_ret_pct' in signals else pd.Series(dtype=float)
+    if ex.empty:
+        return {'benchmark': name, 'bench_signals': 0, 'avg_bench_ret': 0.0, 'avg_excess_ret': 0.0, 'excess_win_rate': 0.0}
+    return {
+        'benchmark': name,
+        'bench_signals': int(len(ex)),
+        'avg_bench_ret': round(float(signals['bench_ret_pct'].mean()), 3),
+        'avg_excess_ret': round(float(ex.mean()), 3),
+        'excess_win_rate': round(float((ex > 0).mean() * 100.0), 2),
+    }
@@ -0,0 +1,132 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from strategy.backtest import summarize_signals
+from strategy.panel import Panel
+from strategy.selector import StrategyConfig
+from strategy.sweep import (METRIC_COLUMNS, WORKER_STATE, build_worker_state, init_worker, expand_grid,
+                            pool_context, split_point)
+
+
+@dataclass
+class Fold:
+    """一个滚动折：训练窗与紧随其后的测试窗（均为面板行号，左闭右开）。"""
+    index: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def make_folds(n_rows: int, train_days: int, test_days: int, step_days: Optional[int] = None,
+               anchored: bool = False, first_row: int = 1) -> List[Fold]:
+    """把 [first_row, n_rows) 切成滚动的训练/测试窗。
+    - step_days 默认等于 test_days（测试窗首尾相接、互不重叠）
+    - anchored=True 时训练窗起点固定为 first_row（扩张窗口）"""
+    step = step_days or test_days
+    folds: List[Fold] = []
+    start = first_row
+    while True:
+        train_start = first_row if anchored else start
+        train_end = start + train_days
+        test_end = min(train_end + test_days, n_rows)
+        if train_end >= n_rows or test_end <= train_end:
+            break
+        folds.append(Fold(len(folds), train_start, train_end, train_end, test_end))
+        start += step
+    return folds
+
+
+def _run_folds(task: Tuple[int, StrategyConfig, Dict[str, Any], Dict[str, float], List[Fold]]) -> Dict[str, Any]:
+    """单个网格点在全部训练窗上的表现（同一进程内的点共享指标/前瞻收益缓存）。"""
+    idx, cfg, params, weights, folds = task
+    bt = WORKER_STATE["full"]
+    per_fold = []
+    for f in folds:
+        # 训练窗只保留在窗内平仓的信号，避免用到测试窗的价格
+        summary = bt.run(cfg, weights=weights, rows=slice(f.train_start, f.train_end),
+                         exit_before=f.train_end, **params).summary
+        per_fold.append({k: summary.get(k) for k in METRIC_COLUMNS})
+    return {"index": idx, "folds": per_fold}
+
+
+class WalkForward:
+    """滚动优化：每个训练窗上对参数网格寻优，用最优参数在随后的测试窗上检验。
+
+    所有折共用同一个 calendar 面板与 VectorBacktester：指标、规则布尔表、评分与前瞻收益
+    均按整段面板计算一次并缓存，各折只在自己的行区间上做 Top-K 与统计，
+    因此 20 折的开销远小于 20 次完整回测。
+    """
+    def __init__(self, panel: Panel, base_cfg: Optional[StrategyConfig] = None,
+                 base_params: Optional[Dict[str, Any]] = None, weights: Optional[Dict[str, float]] = None):
+        self.panel = panel
+        self.base_cfg = base_cfg or StrategyConfig()
+        self.base_params = dict(base_params or {})
+        self.weights = weights
+
+    def run(self, grid: Dict[str, Iterable[Any]] | List[Dict[str, Any]], train_days: int, test_days: int,
+            step_days: Optional[int] = None, anchored: bool = False, rank_by: str = "avg_ret_after_fee",
+            ascending: bool = False, min_signals: int = 1, processes: Optional[int] = 1) -> Dict[str, Any]:
+        """返回 {"folds": 每折明细 DataFrame, "oos_signals": 全部测试窗信号, "summary": 样本外汇总}。
+        min_signals：训练窗信号数不足的参数点不参与该折寻优。"""
+        dates = list(self.panel.index)
+        folds = make_folds(len(dates), train_days, test_days, step_days, anchored)
+        points = expand_grid(grid) if isinstance(grid, dict) else list(grid)
+        if not folds or not points:
+            return {"folds": pd.DataFrame(), "oos_signals": pd.DataFrame(),
+                    "summary": summarize_signals(pd.DataFrame(), dates[0] if dates else "", dates[-1] if dates else "")}
+        tasks = [(i, *split_point(p, self.base_cfg, self.base_params, self.weights), folds)
+                 for i, p in enumerate(points)]
+        tasks.sort(key=lambda t: repr(t[1]))
+
+        # ====== 训练窗：全部网格点 × 全部折 ======
+        state = build_worker_state(self.panel, None)
+        processes = min(processes or os.cpu_count() or 1, len(tasks))
+        if processes <= 1:
+            init_worker(state)
+            rows = [_run_folds(t) for t in tasks]
+        else:
+            for _, cfg, params, _w, _f in tasks:
+                state["full"].warm(cfg, params.get("forward_n", 5), params.get("entry_mode", "close"),
+                                   params.get("exit_mode", "close"))
+            ctx = pool_context()
+            chunksize = max(1, math.ceil(len(tasks) / (processes * 4)))
+            with ProcessPoolExecutor(max_workers=processes, mp_context=ctx,
+                                     initializer=init_worker, initargs=(state,)) as ex:
+                rows = list(ex.map(_run_folds, tasks, chunksize=chunksize))
+        train = {r["index"]: r["folds"] for r in rows}
+        task_by_idx = {t[0]: t for t in tasks}
+
+        # ====== 测试窗：每折取训练窗最优参数 ======
+        bt = state["full"]
+        fold_rows, oos = [], []
+        for f in folds:
+            candidates = [(i, train[i][f.index]) for i in train if (train[i][f.index]["signals"] or 0) >= min_signals]
+            if not candidates:
+                continue
+            sign = 1 if ascending else -1
+            best_idx, best_train = min(candidates, key=lambda x: (sign * x[1][rank_by], x[0]))
+            _, cfg, params, weights, _ = task_by_idx[best_idx]
+            res = bt.run(cfg, weights=weights, rows=slice(f.test_start, f.test_end), **params)
+            oos.append(res.signals)
+            row = {
+                "fold": f.index,
+                "train_start": dates[f.train_start], "train_end": dates[f.train_end - 1],
+                "test_start": dates[f.test_start], "test_end": dates[f.test_end - 1],
+                "best_index": best_idx,
+            }
+            row.update(points[best_idx])
+            row.update({f"train_{k}": best_train[k] for k in METRIC_COLUMNS})
+            row.update({f"test_{k}": res.summary.get(k) for k in METRIC_COLUMNS})
+            fold_rows.append(row)
+
+        oos_signals = pd.concat([s for s in oos if not s.empty], ignore_index=True) if any(not s.empty for s in oos) else pd.DataFrame()
+        summary = summarize_signals(oos_signals, dates[folds[0].test_start], dates[folds[-1].test_end - 1],
+                                    {"folds": len(fold_rows), "train_days": train_days, "test_days": test_days,
+                                     "step_days": step_days or test_days, "anchored": anchored, "grid_points": len(points)})
+        return {"folds": pd.DataFrame(fold_rows), "oos_signals": oos_signals, "summary": summary}
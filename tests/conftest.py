@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+KLINE_COLUMNS = ["ts_code", "trade_date", "open", "high", "low", "close", "vol", "amount", "pct_chg"]
+
+
+def synthetic_kline(n_codes: int = 20, n_days: int = 80, suspended_per_code: int = 10, seed: int = 7,
+                    start: str = "2023-01-02") -> pd.DataFrame:
+    """随机游走日线长表（列见 KLINE_COLUMNS）。每只股票删去 suspended_per_code 根K线模拟停牌：
+    一段连续 4 天 + 其余零散交易日，首日保留；suspended_per_code=0 时不停牌。"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days).strftime("%Y%m%d")
+    rows = []
+    for i in range(n_codes):
+        code = f"{i:06d}.SZ"
+        close = 10.0 * np.cumprod(1.0 + rng.normal(0.002, 0.02, n_days))
+        open_ = close * (1.0 + rng.normal(0.0, 0.005, n_days))
+        high = np.maximum(open_, close) * (1.0 + rng.uniform(0.0, 0.01, n_days))
+        low = np.minimum(open_, close) * (1.0 - rng.uniform(0.0, 0.01, n_days))
+        vol = rng.uniform(1e4, 5e4, n_days)
+        pct = np.r_[0.0, (close[1:] / close[:-1] - 1.0) * 100.0]
+        suspended: set = set()
+        if suspended_per_code:
+            block = min(4, suspended_per_code)
+            s0 = int(rng.integers(5, n_days - 10))
+            rest = np.setdiff1d(np.arange(1, n_days), np.arange(s0, s0 + block))
+            scattered = rng.choice(rest, suspended_per_code - block, replace=False)
+            suspended = set(range(s0, s0 + block)) | set(scattered.tolist())
+        for j, d in enumerate(dates):
+            if j not in suspended:
+                rows.append((code, d, open_[j], high[j], low[j], close[j], vol[j], vol[j] * close[j], pct[j]))
+    return pd.DataFrame(rows, columns=KLINE_COLUMNS)
+
+
+def insert_kline(conn, df: pd.DataFrame) -> None:
+    cols = [c for c in df.columns if c in KLINE_COLUMNS or c in ("limit_status", "adj_factor")]
+    conn.executemany(
+        f"INSERT INTO daily_kline ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+        df[cols].astype(object).where(df[cols].notna(), None).itertuples(index=False, name=None),
+    )
+    conn.commit()
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """已迁移的空库文件，APP_DB_PATH 指向它（服务层/仓储经 get_session 读写）。"""
+    from infrastructure.db.migrations import MigrationManager
+
+    path = str(tmp_path / "app.db")
+    monkeypatch.setenv("APP_DB_PATH", path)
+    MigrationManager().upgrade()
+    return path
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.backtest.engine import BacktestEngine, EngineConfig
+from strategy.limits import LIMIT_UP, LIMIT_UP_ONE_WORD, fill_masks
+from strategy.panel import Panel
+
+DATES = ["20240102", "20240103", "20240104", "20240105"]
+
+
+def _panel(open_: dict, close: dict, limit_status: dict | None = None) -> Panel:
+    fields = {"open": pd.DataFrame(open_, index=DATES, dtype=float),
+              "close": pd.DataFrame(close, index=DATES, dtype=float)}
+    if limit_status is not None:
+        fields["limit_status"] = pd.DataFrame(limit_status, index=DATES, dtype=float)
+    return Panel(fields=fields)
+
+
+def _scores(panel: Panel, signals: dict) -> pd.DataFrame:
+    """signals：{代码: {行号: 得分}}，其余为 NaN（无信号）。"""
+    sc = pd.DataFrame(np.nan, index=panel.index, columns=panel.codes)
+    for code, rows in signals.items():
+        for row, score in rows.items():
+            sc.iloc[row, sc.columns.get_loc(code)] = score
+    return sc
+
+
+def _run(panel, scores, **cfg):
+    config = EngineConfig(**{"initial_cash": 100_000.0, "max_positions": 1, "hold_days": 1, **cfg})
+    buyable = sellable = None
+    if "limit_status" in panel.fields:
+        buyable, sellable = fill_masks(panel["limit_status"].to_numpy(), config.entry_mode, config.exit_mode)
+    return BacktestEngine(config).run(panel, scores, buyable, sellable)
+
+
+def test_lot_rounding_and_fees():
+    panel = _panel({"A": [10, 10, 10, 10]}, {"A": [10, 11, 12, 12]})
+    res = _run(panel, _scores(panel, {"A": {0: 1.0}}), entry_mode="close", exit_mode="close",
+               fee_single_side_bps=3.0, stamp_tax_rate=0.0005)
+    buy, sell = res.trades.iloc[0], res.trades.iloc[1]
+    # 100000 / (10 × 1.003) = 9970.09 股，向下取整到 100 股一手
+    assert (buy["side"], buy["trade_date"], buy["shares"]) == ("buy", "20240102", 9900)
+    outlay = 9900 * 10 * 1.003
+    assert res.nav["cash"].iloc[0] == pytest.approx(100_000.0 - outlay)
+    assert res.nav["equity"].iloc[0] == pytest.approx(100_000.0 - outlay + 99_000.0)
+    # 卖出：佣金 + 印花税
+    proceeds = 9900 * 11 * (1.0 - 0.003 - 0.0005)
+    assert (sell["side"], sell["trade_date"], sell["shares"]) == ("sell", "20240103", 9900)
+    assert sell["pnl"] == pytest.approx(proceeds - outlay)
+    assert res.nav["equity"].iloc[-1] == pytest.approx(100_000.0 - outlay + proceeds)
+
+
+def test_no_same_day_sell():
+    """T+1：次日开盘买入、收盘卖出、持有 1 根K线时，买入当日不卖，下一交易日收盘才卖出。"""
+    panel = _panel({"A": [10, 10, 10, 10]}, {"A": [10, 12, 13, 13]})
+    res = _run(panel, _scores(panel, {"A": {0: 1.0}}), entry_mode="next_open", exit_mode="close")
+    assert list(zip(res.trades["side"], res.trades["trade_date"])) == [("buy", "20240103"), ("sell", "20240104")]
+    assert (res.trades["trade_date"] > res.trades["entry_date"])[res.trades["side"] == "sell"].all()
+    assert res.nav["positions"].tolist() == [0, 1, 0, 0]
+
+
+@pytest.mark.parametrize("entry_mode, blocked_row, status", [
+    ("close", 0, LIMIT_UP),                 # 收盘涨停封板：收盘买不进
+    ("next_open", 1, LIMIT_UP_ONE_WORD),    # 一字涨停：次日开盘买不进
+])
+def test_limit_up_blocks_buy(entry_mode, blocked_row, status):
+    """得分最高的 A 在买入时点涨停，唯一仓位落到 B。"""
+    panel = _panel({"A": [10, 11, 11, 11], "B": [10, 10, 10, 10]}, {"A": [11, 11, 11, 11], "B": [10, 10, 10, 10]},
+                   {"A": [0, 0, 0, 0], "B": [0, 0, 0, 0]})
+    panel["limit_status"].iloc[blocked_row, 0] = status
+    scores = _scores(panel, {"A": {0: 2.0}, "B": {0: 1.0}})
+    buys = _run(panel, scores, entry_mode=entry_mode).trades.query("side == 'buy'")
+    assert buys[["trade_date", "ts_code"]].values.tolist() == [[DATES[blocked_row], "B"]]
+
+    # 解除限制后买入 A；开盘买入时非一字的收盘涨停不构成限制
+    panel["limit_status"].iloc[blocked_row, 0] = LIMIT_UP if entry_mode == "next_open" else 0
+    buys = _run(panel, scores, entry_mode=entry_mode).trades.query("side == 'buy'")
+    assert buys["ts_code"].tolist() == ["A"]
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from conftest import insert_kline, synthetic_kline
+from core.backtest.incremental import IncrementalBacktest
+from core.dao.repositories import BacktestRunRepository, KlineRepository
+from strategy.selector import StrategyConfig
+
+CFG = StrategyConfig(breakout_n=5, ma_alignment="long")
+RUN = {"lookback_days": 20, "forward_n": 3}
+SUMMARY_KEYS = ["signals", "win_rate", "avg_ret", "median_ret", "avg_ret_after_fee", "mdd"]
+
+
+@pytest.fixture
+def kline():
+    return synthetic_kline(n_codes=12, n_days=80, suspended_per_code=5, seed=5)
+
+
+def _insert(app_db, df):
+    conn = sqlite3.connect(app_db)
+    insert_kline(conn, df)
+    conn.close()
+
+
+def _run(start, end, force=False):
+    res = IncrementalBacktest().run(CFG, start, end, force=force, **RUN)
+    signals = BacktestRunRepository().load_signals(res["run_id"], ["trade_date", "ts_code", "ret_pct"])
+    return res, signals.sort_values(["trade_date", "ts_code"]).reset_index(drop=True)
+
+
+def test_incremental_extension_equals_full_rerun(app_db, kline):
+    dates = sorted(kline["trade_date"].unique())
+    start, mid, end = dates[0], dates[59], dates[-1]
+    _insert(app_db, kline[kline["trade_date"] <= mid])
+    first, _ = _run(start, end)
+    assert first["mode"] == "full"
+
+    _insert(app_db, kline[kline["trade_date"] > mid])
+    inc, inc_signals = _run(start, end)
+    assert inc["mode"] == "incremental"
+    full, full_signals = _run(start, end, force=True)
+    assert full["mode"] == "full"
+    assert inc["summary"]["signals"] > 0
+    assert {k: inc["summary"][k] for k in SUMMARY_KEYS} == {k: full["summary"][k] for k in SUMMARY_KEYS}
+    pd.testing.assert_frame_equal(inc_signals, full_signals)
+
+
+def test_revision_inside_window_forces_recompute(app_db, kline):
+    dates = sorted(kline["trade_date"].unique())
+    start, end, day = dates[0], dates[-1], dates[30]
+    _insert(app_db, kline)
+    before, before_signals = _run(start, end)
+    assert before["mode"] == "full"
+
+    # 回填工具式的原地 UPDATE：rowid 水位不变
+    conn = sqlite3.connect(app_db)
+    conn.execute("UPDATE daily_kline SET close = close * 1.05 WHERE trade_date = ?", (day,))
+    conn.commit()
+    assert _run(start, end)[0]["mode"] == "cached"
+
+    KlineRepository.record_revision(conn, day, day, "test")
+    conn.commit()
+    conn.close()
+    rerun, rerun_signals = _run(start, end)
+    assert rerun["mode"] == "full"
+    full, full_signals = _run(start, end, force=True)
+    assert {k: rerun["summary"][k] for k in SUMMARY_KEYS} == {k: full["summary"][k] for k in SUMMARY_KEYS}
+    pd.testing.assert_frame_equal(rerun_signals, full_signals)
+    assert not rerun_signals.equals(before_signals)
+    # 修订已记入 state，再跑命中缓存
+    assert _run(start, end)[0]["mode"] == "cached"
@@ -0,0 +1,86 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from conftest import insert_kline, synthetic_kline
+
+pytest.importorskip("data.fetcher")  # DataService 依赖行情抓取模块（akshare/tushare/toml）
+from core.service.data_service import DataService
+
+STATS_COLUMNS = ["industry", "trade_date", "total_volume", "avg_volume", "total_amount", "avg_amount",
+                 "avg_pct_chg", "max_pct_chg", "min_pct_chg", "stock_count", "rising_count", "falling_count"]
+
+
+def _legacy_industry_stats(conn, trade_date: str) -> int:
+    """改写前的逐日逐行业版本（LEFT JOIN 统计行业内全部股票，stock_count 含当日停牌股）。"""
+    industries = conn.execute("SELECT DISTINCT industry FROM stock_info WHERE industry IS NOT NULL AND industry != ''").fetchall()
+    count = 0
+    for (industry,) in industries:
+        result = conn.execute("""
+            SELECT
+                COUNT(*) as stock_count,
+                SUM(dk.vol) as total_volume,
+                AVG(dk.vol) as avg_volume,
+                SUM(dk.amount) as total_amount,
+                AVG(dk.amount) as avg_amount,
+                AVG(dk.pct_chg) as avg_pct_chg,
+                MAX(dk.pct_chg) as max_pct_chg,
+                MIN(dk.pct_chg) as min_pct_chg,
+                SUM(CASE WHEN dk.pct_chg > 0 THEN 1 ELSE 0 END) as rising_count,
+                SUM(CASE WHEN dk.pct_chg < 0 THEN 1 ELSE 0 END) as falling_count
+            FROM stock_info si
+            LEFT JOIN daily_kline dk ON si.ts_code = dk.ts_code AND dk.trade_date = ?
+            WHERE si.industry = ?
+        """, (trade_date, industry)).fetchone()
+        if result and result[0] > 0:
+            conn.execute("""
+                INSERT OR REPLACE INTO industry_stats
+                (industry, trade_date, total_volume, avg_volume, total_amount, avg_amount,
+                 avg_pct_chg, max_pct_chg, min_pct_chg, stock_count, rising_count, falling_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (industry, trade_date, result[1], result[2], result[3], result[4],
+                  result[5], result[6], result[7], result[0], result[8], result[9]))
+            count += 1
+    return count
+
+
+@pytest.fixture
+def conn(app_db):
+    """4 个行业 × 若干股票（含停牌），另有无行业股票、从未交易的股票，以及整个行业停牌的一天。"""
+    kline = synthetic_kline(n_codes=14, n_days=30, suspended_per_code=6, seed=9)
+    codes = sorted(kline["ts_code"].unique())
+    industries = ["银行"] * 4 + ["医药"] * 4 + ["电子"] * 3 + ["煤炭"] * 2 + [None]
+    dates = sorted(kline["trade_date"].unique())
+    # 煤炭全行业停牌一天
+    coal = [c for c, ind in zip(codes, industries) if ind == "煤炭"]
+    kline = kline[~((kline["trade_date"] == dates[10]) & kline["ts_code"].isin(coal))]
+    c = sqlite3.connect(app_db)
+    insert_kline(c, kline)
+    c.executemany("INSERT INTO stock_info (ts_code, name, industry) VALUES (?, ?, ?)",
+                  [(code, code, ind) for code, ind in zip(codes, industries)]
+                  + [("999999.SZ", "未上市", "电子"), ("999998.SZ", "空行业", "")])
+    c.commit()
+    yield c
+    c.close()
+
+
+def _read(conn) -> pd.DataFrame:
+    return (pd.read_sql_query(f"SELECT {', '.join(STATS_COLUMNS)} FROM industry_stats", conn)
+            .sort_values(["trade_date", "industry"]).reset_index(drop=True))
+
+
+def test_set_based_matches_per_date_loop(conn):
+    dates = [r[0] for r in conn.execute("SELECT DISTINCT trade_date FROM daily_kline ORDER BY trade_date")]
+    legacy_rows = sum(_legacy_industry_stats(conn, d) for d in dates)
+    legacy = _read(conn)
+    conn.execute("DELETE FROM industry_stats")
+
+    # 分两批写入，覆盖批次边界
+    rows = DataService._industry_stats_for_dates(conn, dates[:13]) + DataService._industry_stats_for_dates(conn, dates[13:])
+    current = _read(conn)
+
+    assert rows == legacy_rows == len(dates) * 4
+    coal_day = current[(current["industry"] == "煤炭") & (current["trade_date"] == dates[10])].iloc[0]
+    assert coal_day["stock_count"] == 2 and pd.isna(coal_day["total_volume"]) and coal_day["rising_count"] == 0
+    pd.testing.assert_frame_equal(current, legacy, check_exact=False, rtol=1e-12)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.backtest.rotation import RotationConfig, SectorRotation, rebalance_nav
+
+
+def _simulate(px: np.ndarray, reb_rows, weights: np.ndarray, fee_rate: float, tax_rate: float) -> np.ndarray:
+    """逐日模拟：调仓日收盘按漂移后的实际权重计算换手成本，扣费后按目标权重换算持有份数，其余日按份数估值。"""
+    n_rows, n_cols = px.shape
+    nav = np.ones(n_rows)
+    units = np.zeros(n_cols)
+    cash = 1.0
+    value = 1.0
+    k = 0
+    for t in range(n_rows):
+        held = units > 0
+        value = cash + float((units[held] * px[t, held]).sum())
+        if k < len(reb_rows) and t == reb_rows[k]:
+            prev = np.where(held, units * px[t], 0.0) / value
+            w = weights[k]
+            traded = np.abs(w - prev).sum()
+            sold = np.maximum(prev - w, 0.0).sum()
+            value *= 1.0 - traded * fee_rate - sold * tax_rate
+            units = np.where(w > 0, w * value / np.where(w > 0, px[t], 1.0), 0.0)
+            cash = value * (1.0 - w.sum())
+            k += 1
+        if k > 0:
+            nav[t] = value
+    return nav
+
+
+def _prices(n_rows: int, n_cols: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.cumprod(1.0 + rng.normal(0.0005, 0.015, (n_rows, n_cols)), axis=0)
+    dates = pd.bdate_range("2022-01-03", periods=n_rows).strftime("%Y%m%d")
+    df = pd.DataFrame(close, index=dates, columns=[f"IDX{i:02d}" for i in range(n_cols)])
+    # 零散缺失（停牌/未发布）：按前值估值
+    mask = rng.random(df.shape) < 0.03
+    mask[0] = False
+    return df.mask(mask)
+
+
+def test_rebalance_nav_matches_daily_simulation():
+    px = _prices(120, 6, seed=1).ffill().to_numpy()
+    reb = np.arange(5, 120, 15)
+    rng = np.random.default_rng(2)
+    weights = rng.random((len(reb), px.shape[1])) * (rng.random((len(reb), px.shape[1])) < 0.6)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+    weights[2] *= 0.7      # 部分空仓
+    weights[4] = 0.0       # 全部空仓
+    res = rebalance_nav(px, reb, weights, fee_rate=0.001, tax_rate=0.0005)
+    np.testing.assert_allclose(res["nav"], _simulate(px, reb, weights, 0.001, 0.0005), rtol=1e-14, atol=0)
+
+
+@pytest.mark.parametrize("hold", ["industry", "stocks"])
+def test_sector_rotation_nav_matches_daily_simulation(hold):
+    index_close = _prices(160, 8, seed=3)
+    cfg = RotationConfig(criteria={"momentum": 1.0, "low_vol": 0.5}, lookback=10, top_n=3, rebalance_days=7,
+                         hold=hold, stocks_per_industry=2, fee_single_side_bps=1.5, stamp_tax_rate=0.001)
+    kwargs = {}
+    if hold == "stocks":
+        stock_close = _prices(160, 24, seed=4)
+        stock_close.columns = [f"{i:06d}.SZ" for i in range(24)]
+        kwargs = {"stock_close": stock_close,
+                  "member_map": {f"{i:06d}": f"IDX{i % 8:02d}" for i in range(24)}}
+    res = SectorRotation(cfg).run(index_close, start=index_close.index[30], **kwargs)
+
+    prices = kwargs.get("stock_close", index_close).ffill()
+    dates = list(prices.index)
+    first = dates.index(res.holdings["trade_date"].iloc[0])
+    reb_dates = dates[first::cfg.rebalance_days]
+    assert len(reb_dates) > 10 and set(res.holdings["trade_date"]) <= set(reb_dates)
+    weights = (res.holdings.pivot(index="trade_date", columns="code", values="weight")
+               .reindex(index=reb_dates, columns=prices.columns).fillna(0.0).to_numpy())
+    tax = cfg.stamp_tax_rate if hold == "stocks" else 0.0
+    expected = _simulate(prices.to_numpy(), [dates.index(d) for d in reb_dates], weights,
+                         cfg.fee_single_side_bps / 1000.0, tax)
+    assert res.nav["trade_date"].iloc[0] == dates[first]
+    np.testing.assert_allclose(res.nav["nav"].to_numpy(), expected[first:], rtol=1e-14, atol=0)
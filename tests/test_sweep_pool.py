@@ -0,0 +1,49 @@
+import multiprocessing as mp
+
+import pandas as pd
+import pytest
+
+from conftest import insert_kline, synthetic_kline
+from db.database import Database
+from strategy import sweep
+from strategy.panel import load_panel
+from strategy.sweep import EarlyStop, ParameterSweep
+
+GRID = {"breakout_n": [3, 5], "ma_alignment": [None, "long"], "forward_n": [3, 5]}
+
+
+@pytest.fixture(scope="module")
+def panel():
+    db = Database(":memory:")
+    insert_kline(db.conn, synthetic_kline(n_codes=12, n_days=60, suspended_per_code=5, seed=11))
+    start, end = db.conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+    p = load_panel(db.conn, start, end)
+    db.close()
+    return p
+
+
+def _run(panel, monkeypatch, method, processes):
+    if method is not None:
+        monkeypatch.setattr(sweep, "pool_context", lambda: mp.get_context(method))
+    early = EarlyStop(frac=0.4, min_signals=5, min_win_rate=70.0)
+    table = ParameterSweep(panel, base_params={"lookback_days": 20}).run(GRID, processes=processes, early_stop=early)
+    return table.drop(columns="elapsed_ms")
+
+
+@pytest.mark.parametrize("method", [m for m in ("fork", "spawn") if m in mp.get_all_start_methods()])
+def test_pool_matches_serial(panel, monkeypatch, method):
+    """API 进程中走 spawn（状态经 initargs 序列化），命令行走 fork：两者与串行结果逐点一致，含提前淘汰状态。"""
+    serial = _run(panel, monkeypatch, None, 1)
+    pooled = _run(panel, monkeypatch, method, 2)
+    assert 0 < (serial["status"] == "stopped").sum() < len(serial)
+    pd.testing.assert_frame_equal(pooled, serial)
+
+
+def test_pool_context_uses_spawn_off_main_thread():
+    import threading
+
+    out = {}
+    t = threading.Thread(target=lambda: out.update(method=sweep.pool_context().get_start_method()))
+    t.start()
+    t.join()
+    assert out["method"] == "spawn"
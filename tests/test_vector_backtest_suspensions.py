@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from conftest import insert_kline, synthetic_kline
+from db.database import Database
+from strategy.backtest import Backtester
+from strategy.panel import load_panel
+from strategy.selector import StrategyConfig
+from strategy.vector_backtest import VectorBacktester
+
+
+@pytest.fixture(scope="module")
+def conn():
+    """20 只股票 × 80 个交易日的随机游走行情，每只股票删去 10 根K线模拟停牌（含连续停牌）。"""
+    db = Database(":memory:")
+    insert_kline(db.conn, synthetic_kline(n_codes=20, n_days=80, suspended_per_code=10))
+    yield db.conn
+    db.close()
+
+
+def _signal_keys(df: pd.DataFrame) -> set:
+    if df.empty:
+        return set()
+    return set(zip(df["trade_date"], df["ts_code"], df["exit_date"]))
+
+
+@pytest.mark.parametrize("cfg", [
+    StrategyConfig(breakout_n=5),
+    StrategyConfig(ma_alignment="long"),
+    StrategyConfig(price_above_ma=10, ma_days=[5, 10]),
+    StrategyConfig(volume_mode="volume_breakout", volume_ratio_min=1.2),
+    StrategyConfig(range_increase_days=5, range_increase_min_pct=2.0),
+    StrategyConfig(range_increase_min_pct=3.0),
+    StrategyConfig(exists_day_increase_within_days=3, exists_day_increase_min_pct=3.0),
+    StrategyConfig(volume_mode="volume_pullback", volume_ratio_max=1.0, pullback_touch_ma=5),
+    StrategyConfig(enable_patterns=["bullish_engulfing", "hammer", "doji"]),
+], ids=["breakout", "ma_long", "above_ma", "volume", "range_days", "range_window", "exists_day", "pullback",
+        "patterns"])
+def test_vector_matches_legacy_with_suspensions(conn, cfg):
+    """滚动/前移类规则按每只股票自身的K线计数，停牌时与逐只回测的信号完全一致。
+    （EMA 类指标 MACD/RSI/ATR 随回看窗口重新初始化，口径差异见 VectorBacktester 文档，不在此比较。）"""
+    codes = [r[0] for r in conn.execute("SELECT DISTINCT ts_code FROM daily_kline ORDER BY ts_code")]
+    start, end = conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+    legacy = Backtester(conn).run(codes, start, end, cfg, lookback_days=30, forward_n=3)
+    vector = VectorBacktester(load_panel(conn, start, end, codes)).run(cfg, lookback_days=30, forward_n=3)
+    assert legacy.summary["signals"] > 0
+    assert _signal_keys(vector.signals) == _signal_keys(legacy.signals)
+    assert vector.summary["avg_ret"] == pytest.approx(legacy.summary["avg_ret"], abs=1e-3)
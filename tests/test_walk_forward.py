@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import insert_kline, synthetic_kline
+from db.database import Database
+from strategy.panel import Panel, load_panel
+from strategy.walk_forward import Fold, WalkForward, make_folds
+
+GRID = {"breakout_n": [3, 5], "ma_alignment": [None, "long"], "forward_n": [3, 5]}
+TRAIN, TEST = 30, 10
+
+
+@pytest.fixture(scope="module")
+def panel():
+    db = Database(":memory:")
+    insert_kline(db.conn, synthetic_kline(n_codes=15, n_days=80, suspended_per_code=5, seed=3))
+    start, end = db.conn.execute("SELECT MIN(trade_date), MAX(trade_date) FROM daily_kline").fetchone()
+    p = load_panel(db.conn, start, end)
+    db.close()
+    return p
+
+
+def _run(panel: Panel) -> pd.DataFrame:
+    wf = WalkForward(panel, base_params={"lookback_days": 20})
+    return wf.run(GRID, train_days=TRAIN, test_days=TEST, min_signals=3)["folds"]
+
+
+def _perturb_from(panel: Panel, row: int, seed: int) -> Panel:
+    """把第 row 行起的价量乘以随机扰动（未来行情被改写，之前的行不变）。"""
+    rng = np.random.default_rng(seed)
+    fields = {}
+    for name, df in panel.fields.items():
+        df = df.copy()
+        if name in ("open", "high", "low", "close", "vol"):
+            noise = rng.uniform(0.8, 1.2, size=(len(df) - row, df.shape[1]))
+            df.iloc[row:] = df.iloc[row:].to_numpy() * noise
+        fields[name] = df
+    return Panel(fields=fields, align=panel.align, last_dates=panel.last_dates)
+
+
+def test_make_folds_rolling_and_anchored():
+    assert make_folds(60, 20, 10) == [Fold(0, 1, 21, 21, 31), Fold(1, 11, 31, 31, 41),
+                                      Fold(2, 21, 41, 41, 51), Fold(3, 31, 51, 51, 60)]
+    anchored = make_folds(60, 20, 10, step_days=20, anchored=True)
+    assert [(f.train_start, f.train_end, f.test_end) for f in anchored] == [(1, 21, 31), (1, 41, 51)]
+
+
+def test_fold_dates(panel):
+    folds = _run(panel)
+    dates = list(panel.index)
+    expected = make_folds(len(dates), TRAIN, TEST)
+    assert len(folds) == len(expected) > 2
+    for row, f in zip(folds.itertuples(), expected):
+        assert (row.train_start, row.train_end) == (dates[f.train_start], dates[f.train_end - 1])
+        assert (row.test_start, row.test_end) == (dates[f.test_start], dates[f.test_end - 1])
+        # 测试窗紧接训练窗，互不重叠
+        assert row.train_end < row.test_start
+
+
+def test_params_come_from_own_train_window(panel):
+    """改写第 k 折测试窗起的全部行情：第 k 折的最优参数与训练期指标不变（无前视），
+    之后各折的训练窗包含被改写的行，结果随之变化。"""
+    base = _run(panel)
+    folds = make_folds(len(panel.index), TRAIN, TEST)
+    train_cols = ["best_index"] + [c for c in base.columns if c.startswith("train_")]
+    changed_later = False
+    for k, f in enumerate(folds[:-1]):
+        perturbed = _run(_perturb_from(panel, f.test_start, seed=k))
+        pd.testing.assert_frame_equal(perturbed.loc[:k, train_cols], base.loc[:k, train_cols])
+        assert perturbed.at[k, "test_avg_ret"] != base.at[k, "test_avg_ret"]
+        later = perturbed.loc[k + 1:, train_cols].reset_index(drop=True)
+        changed_later |= not later.equals(base.loc[k + 1:, train_cols].reset_index(drop=True))
+    assert changed_later
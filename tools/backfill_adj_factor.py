@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""回填 daily_kline.adj_factor（复权因子），无需重新拉取K线。
+
+按交易日调用 TuShare adj_factor(trade_date=...)，一次请求覆盖全市场，只处理仍有空因子的交易日；
+写入后重算受影响区间的周/月K线（其价格按周期末因子折算，见 strategy.timeframe）。
+原地 UPDATE 不产生新 rowid，每个交易日同时登记 kline_revisions：增量回测据此重查受影响交易日，
+已运行服务的进程级缓存（复权面板、前复权基准等，见 KlineRepository.data_version）随之失效。
+复权价按需计算（见 strategy.adjust / core.service.price_service）。
+
+用法示例：
+    python tools/backfill_adj_factor.py --db stock_data.db
+    python tools/backfill_adj_factor.py --db stock_data.db --start 20200101 --rate 200
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.dao.repositories import KlineRepository, TimeframeRepository
+from data.fetcher import DataFetcher
+from db.database import Database
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="回填 daily_kline.adj_factor",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--db", default="stock_data.db", help="数据库文件路径")
+    parser.add_argument("--start", default="", help="只回填该日及之后的交易日 (yyyyMMdd)")
+    parser.add_argument("--end", default="", help="只回填该日及之前的交易日 (yyyyMMdd)")
+    parser.add_argument("--rate", type=int, default=180, help="每分钟最多请求次数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # 通过 Database 确保 adj_factor 列存在
+    Database(args.db).close()
+    fetcher = DataFetcher()
+    if fetcher.ts_pro is None:
+        print("未配置 TuShare token，无法获取复权因子")
+        return
+    conn = sqlite3.connect(args.db)
+    try:
+        dates = [r[0] for r in conn.execute(
+            "SELECT DISTINCT trade_date FROM daily_kline WHERE adj_factor IS NULL "
+            "AND trade_date>=? AND trade_date<=? ORDER BY trade_date",
+            (args.start or "00000000", args.end or "99999999"),
+        )]
+        print(f"待回填交易日 {len(dates)} 个")
+        t0 = time.perf_counter()
+        interval = 60.0 / max(args.rate, 1)
+        updated = 0
+        for i, trade_date in enumerate(dates, start=1):
+            started = time.perf_counter()
+            adj = fetcher.fetch_adj_factor_by_date(trade_date)
+            if not adj.empty:
+                # 库中代码可能带或不带交易所后缀，两种形式都匹配
+                rows = [(float(f), trade_date, c, c.split('.')[0])
+                        for c, f in zip(adj["ts_code"].astype(str), adj["adj_factor"]) if f == f]
+                cur = conn.executemany(
+                    "UPDATE daily_kline SET adj_factor=? WHERE trade_date=? AND ts_code IN (?, ?) AND adj_factor IS NULL",
+                    rows,
+                )
+                if cur.rowcount:
+                    KlineRepository.record_revision(conn, trade_date, trade_date, "adj_factor")
+                conn.commit()
+                updated += cur.rowcount
+            print(f"[{i}/{len(dates)}] {trade_date} 因子 {len(adj)} 条，累计更新 {updated} 行")
+            time.sleep(max(interval - (time.perf_counter() - started), 0.0))
+        if dates and updated:
+            count = TimeframeRepository().refresh(dates[0], None, conn=conn)
+            conn.commit()
+            print(f"周/月K线：重算 {count} 行")
+        print(f"完成，用时 {time.perf_counter() - t0:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
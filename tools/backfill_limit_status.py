@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""回填 daily_kline.limit_status（涨停/跌停/一字板，按板块与 ST 规则）。
+
+按代码分批读取（走 (ts_code, trade_date) 索引），向量化计算后批量更新；
+pre_close 缺失的行用该股上一根K线的收盘价补齐。
+原地 UPDATE 不产生新 rowid，每批同时登记 kline_revisions，增量回测据此重查受影响交易日。
+
+用法示例：
+    python tools/backfill_limit_status.py --db stock_data.db
+    python tools/backfill_limit_status.py --db stock_data.db --all --batch 500
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.dao.repositories import KlineRepository
+from db.database import Database
+from strategy.limits import compute_limit_status
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="回填 daily_kline.limit_status",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--db", default="stock_data.db", help="数据库文件路径")
+    parser.add_argument("--all", action="store_true", help="重算全部行（默认只补 limit_status 为空的代码）")
+    parser.add_argument("--batch", type=int, default=200, help="每批处理的代码数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # 通过 Database 确保 limit_status 列存在
+    Database(args.db).close()
+    conn = sqlite3.connect(args.db)
+    try:
+        info = conn.execute("SELECT ts_code, name, is_st, list_date FROM stock_info").fetchall()
+        st_codes = {r[0] for r in info if r[2] == 1 or (r[1] and 'ST' in r[1].upper())}
+        list_dates = {r[0]: str(r[3]) for r in info if r[3]}
+        if args.all:
+            codes = [r[0] for r in conn.execute("SELECT DISTINCT ts_code FROM daily_kline")]
+        else:
+            codes = [r[0] for r in conn.execute("SELECT DISTINCT ts_code FROM daily_kline WHERE limit_status IS NULL")]
+        print(f"待处理代码 {len(codes)} 只")
+        t0 = time.perf_counter()
+        updated = 0
+        for i in range(0, len(codes), args.batch):
+            part = codes[i:i + args.batch]
+            df = pd.read_sql_query(
+                f"SELECT id, ts_code, trade_date, high, low, close, pre_close FROM daily_kline "
+                f"WHERE ts_code IN ({','.join('?' for _ in part)}) ORDER BY ts_code, trade_date",
+                conn, params=part,
+            )
+            df["pre_close"] = df["pre_close"].fillna(df.groupby("ts_code")["close"].shift(1))
+            status = compute_limit_status(df, st_codes, list_dates)
+            values = [None if np.isnan(s) else int(s) for s in status]
+            conn.executemany("UPDATE daily_kline SET limit_status=? WHERE id=?",
+                             zip(values, df["id"].astype(int).tolist()))
+            if not df.empty:
+                KlineRepository.record_revision(conn, str(df["trade_date"].min()), str(df["trade_date"].max()),
+                                                "limit_status")
+            conn.commit()
+            updated += len(df)
+            print(f"[{min(i + args.batch, len(codes))}/{len(codes)}] 已更新 {updated} 行")
+        print(f"完成，用时 {time.perf_counter() - t0:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
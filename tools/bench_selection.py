@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""选股性能基准：在合成的全市场数据库上对比 SQL 预筛前后的耗时。
+
+用法示例：
+    python tools/bench_selection.py --codes 5000 --days 250
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from db.database import Database
+from strategy.selector import StockSelector, StrategyConfig
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="生成合成行情库并测量选股耗时。",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--codes", type=int, default=5000, help="股票数量")
+    parser.add_argument("--days", type=int, default=250, help="交易日数量")
+    parser.add_argument("--seed", type=int, default=7, help="随机种子")
+    parser.add_argument("--db", default=None, help="数据库路径（默认临时文件，运行后删除）")
+    return parser.parse_args()
+
+
+def build_synthetic_db(path: str, n_codes: int, n_days: int, seed: int) -> tuple[list[str], list[str]]:
+    """按几何布朗运动生成 OHLCV，写入 stock_info 与 daily_kline。"""
+    rng = np.random.default_rng(seed)
+    dates = [d.strftime("%Y%m%d") for d in pd.bdate_range("2020-01-02", periods=n_days)]
+    codes = [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(n_codes)]
+    db = Database(path)
+    try:
+        db.conn.executemany(
+            "INSERT OR REPLACE INTO stock_info (ts_code, name, industry, list_date, market, exchange, area, is_st, list_status) "
+            "VALUES (?, ?, ?, '20100101', '', '', '', 0, 'L')",
+            [(c, f"S{c}", f"IND{i % 30}") for i, c in enumerate(codes)],
+        )
+        for i, code in enumerate(codes):
+            r = rng.normal(0.0003, 0.02, n_days)
+            close = 10.0 * np.exp(np.cumsum(r))
+            pre = np.r_[close[0], close[:-1]]
+            op = pre * (1 + rng.normal(0, 0.005, n_days))
+            hi = np.maximum(op, close) * (1 + np.abs(rng.normal(0, 0.01, n_days)))
+            lo = np.minimum(op, close) * (1 - np.abs(rng.normal(0, 0.01, n_days)))
+            vol = rng.lognormal(10, 0.5, n_days)
+            pct = (close / pre - 1) * 100
+            db.conn.executemany(
+                "INSERT INTO daily_kline (ts_code, trade_date, open, high, low, close, vol, amount, pct_chg, pre_close) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([code] * n_days, dates, op, hi, lo, close, vol, vol * close, pct, pre),
+            )
+        db.conn.commit()
+    finally:
+        db.close()
+    return codes, dates
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    res = fn()
+    return res, time.perf_counter() - t0
+
+
+def main():
+    args = parse_args()
+    tmp_dir = None
+    path = args.db
+    if path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_sel_")
+        path = os.path.join(tmp_dir, "bench.db")
+    print(f"生成合成数据：{args.codes} 只 × {args.days} 日 -> {path}")
+    (codes, dates), t_build = _timed(lambda: build_synthetic_db(path, args.codes, args.days, args.seed))
+    print(f"建库耗时 {t_build:.1f}s")
+
+    import sqlite3
+    conn = sqlite3.connect(path)
+    start, end = dates[0], dates[-1]
+    cfg = StrategyConfig(
+        last_pct_chg_min=2.0,
+        exists_day_increase_within_days=5,
+        exists_day_increase_min_pct=3.0,
+        volume_mode="volume_breakout",
+        volume_ratio_min=1.2,
+        ma_alignment="long",
+        rsi_enable=True,
+        rsi_min=50,
+    )
+    try:
+        base, t_base = _timed(lambda: StockSelector(conn).filter_stocks(codes, start, end, cfg, prefilter=False))
+        fast, t_fast = _timed(lambda: StockSelector(conn).filter_stocks(codes, start, end, cfg, prefilter=True))
+        base_set = set(base["ts_code"]) if not base.empty else set()
+        fast_set = set(fast["ts_code"]) if not fast.empty else set()
+        print(f"无预筛：{t_base:.2f}s，通过 {len(base_set)} 只")
+        print(f"SQL预筛：{t_fast:.2f}s，通过 {len(fast_set)} 只")
+        print(f"加速比：{t_base / max(t_fast, 1e-9):.1f}x，结果一致：{base_set == fast_set}")
+    finally:
+        conn.close()
+        if tmp_dir:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,33 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
+from core.dao.repositories import (CrossSectionRepository, IndustryRepository, MarketSnapshotRepository,
+                                   TimeframeRepository)
+from infrastructure.db.engine import get_session
 from infrastructure.db.migrations import MigrationManager
 
 
 def main():
     mgr = MigrationManager()
     mgr.upgrade()
+    # 新建的行业滚动聚合表为空时按已有 industry_stats 全量构建一次
+    with get_session() as conn:
+        empty = conn.execute("SELECT 1 FROM industry_stats_rolling LIMIT 1").fetchone() is None
+        if empty:
+            rows = IndustryRepository().refresh_rolling_stats(None, conn)
+            print(f"industry_stats_rolling built: {rows} rows")
+        # 市场快照表为空时按已有K线全量构建一次
+        if conn.execute("SELECT 1 FROM market_snapshot LIMIT 1").fetchone() is None:
+            rows = MarketSnapshotRepository().refresh(None, None, conn)
+            print(f"market_snapshot built: {rows} rows")
+        # 周/月K线表为空时由日线全量聚合一次
+        if conn.execute("SELECT 1 FROM weekly_kline LIMIT 1").fetchone() is None:
+            rows = TimeframeRepository().refresh(None, None, conn=conn)
+            print(f"weekly_kline/monthly_kline built: {rows} rows")
+        # 截面排名特征库为空时按已有K线全量构建一次（默认特征）
+        if conn.execute("SELECT 1 FROM xs_rank LIMIT 1").fetchone() is None:
+            rows = CrossSectionRepository().refresh(None, None, conn=conn)
+            print(f"xs_rank built: {rows} rows")
     print("Migration completed.")
 
 
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""夜间重跑已保存的回测：按 backtest_runs 中的配置续算到最新交易日。
+
+用法示例：
+    python tools/rerun_backtests.py --end 20250101 [--force]
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+# 回退：若直接运行该脚本，确保项目根在 sys.path 中
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from core.service.backtest_service import BacktestService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="续算全部已保存的回测")
+    parser.add_argument("--end", default=datetime.date.today().strftime("%Y%m%d"), help="截止日期 YYYYMMDD，默认今天")
+    parser.add_argument("--force", action="store_true", help="全部全量重算")
+    args = parser.parse_args()
+
+    svc = BacktestService()
+    runs = svc.list_runs()
+    print(f"共 {len(runs)} 个已保存回测，截止 {args.end}")
+    for run in runs:
+        spec = run["config"]
+        t0 = time.perf_counter()
+        res = svc.run_incremental(spec["cfg"], spec["start"], args.end, spec.get("codes"),
+                                  spec.get("lookback_days", 60), spec.get("forward_n", 5),
+                                  params=spec.get("params"), weights=spec.get("weights") or None,
+                                  force=args.force, max_signals=0)
+        s = res["summary"]
+        print(f"[{run['id']}] {res['mode']:<11} {run['last_date']} -> {args.end}  signals={s.get('signals')} "
+              f"avg_ret_after_fee={s.get('avg_ret_after_fee')} mdd={s.get('mdd')}  "
+              f"{(time.perf_counter() - t0) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
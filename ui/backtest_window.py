@@ -1,14 +1,17 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QLabel
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QLabel, QTabWidget
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from strategy.analytics import rolling_drawdown
 
 class BacktestWindow(QDialog):
-    def __init__(self, backtest_result):
+    def __init__(self, backtest_result, analytics=None):
         super().__init__()
         self.setWindowTitle("回测结果")
         self.res = backtest_result
+        # strategy.analytics.signal_analytics 的输出，可选
+        self.analytics = analytics or {}
         layout = QVBoxLayout()
 
         # 概览
@@ -19,11 +22,20 @@ class BacktestWindow(QDialog):
             f"中位数: {s.get('median_ret')}% | 最大回撤: {s.get('mdd')}%"
         )
         layout.addWidget(overview)
+        r = self.analytics.get('ratios') or {}
+        if r:
+            dd = self.analytics.get('drawdown') or {}
+            layout.addWidget(QLabel(
+                f"Sharpe: {r.get('sharpe')} | Sortino: {r.get('sortino')} | Calmar: {r.get('calmar')} | "
+                f"年化收益: {r.get('annual_return')}% | 年化波动: {r.get('annual_vol')}% | "
+                f"最大回撤位置: {dd.get('trough_date')}"
+            ))
 
-        # 资金曲线图
+        # 资金曲线与回撤
         fig = Figure(figsize=(10, 4))
         canvas = FigureCanvas(fig)
-        ax = fig.add_subplot(1, 1, 1)
+        ax = fig.add_subplot(2, 1, 1)
+        ax_dd = fig.add_subplot(2, 1, 2, sharex=ax)
         df = self.res.signals.copy()
         if df is not None and not df.empty:
             # 按时间排序
@@ -33,15 +45,27 @@ class BacktestWindow(QDialog):
             ax.set_title('资金曲线（按信号顺序串行累积）')
             ax.set_ylabel('净值')
             ax.grid(True, alpha=0.3)
+            ax_dd.fill_between(eq.index, rolling_drawdown(eq.values) * 100.0, 0, color='tab:red', alpha=0.3)
+            ax_dd.set_ylabel('回撤%')
+            ax_dd.grid(True, alpha=0.3)
+        fig.tight_layout()
         layout.addWidget(canvas)
 
         # 明细表
         self.table = QTableWidget(0, 9)
         self.table.setHorizontalHeaderLabels([
-            'trade_date', 'ts_code', 'entry_close', 'exit_date', 'exit_close', 'ret_%', 'ret_%_after_fee', 'score', 'passed'
+            'trade_date', 'ts_code', 'entry_price', 'exit_date', 'exit_price', 'ret_%', 'ret_%_after_fee', 'score', 'passed'
         ])
         self.table.setSortingEnabled(True)
-        layout.addWidget(self.table)
+        tabs = QTabWidget()
+        tabs.addTab(self.table, "明细")
+        for key, title in [('horizons', '持有期'), ('by_month', '月度'), ('by_industry', '行业')]:
+            if self.analytics.get(key):
+                tabs.addTab(self._records_table(self.analytics[key]), title)
+        dist = self.analytics.get('distribution') or {}
+        if dist:
+            tabs.addTab(self._records_table(dist.get('histogram', [])), "收益分布")
+        layout.addWidget(tabs)
 
         self.setLayout(layout)
         self.resize(1000, 700)
@@ -66,6 +90,23 @@ class BacktestWindow(QDialog):
         else:
             return QColor(255, 255, 255)
 
+    @staticmethod
+    def _records_table(records):
+        cols = list(records[0].keys()) if records else []
+        table = QTableWidget(len(records), len(cols))
+        table.setHorizontalHeaderLabels(cols)
+        for i, rec in enumerate(records):
+            for j, c in enumerate(cols):
+                item = QTableWidgetItem()
+                v = rec.get(c)
+                if isinstance(v, (int, float)):
+                    item.setData(Qt.DisplayRole, v)
+                else:
+                    item.setText("-" if v is None else str(v))
+                table.setItem(i, j, item)
+        table.setSortingEnabled(True)
+        return table
+
     def _populate_table(self):
         df = self.res.signals
         if df is None or df.empty:
@@ -77,16 +118,16 @@ class BacktestWindow(QDialog):
             self.table.setItem(i, 0, QTableWidgetItem(str(row.get('trade_date', ''))))
             # ts_code
             self.table.setItem(i, 1, QTableWidgetItem(str(row.get('ts_code', ''))))
-            # entry_close
+            # entry_price
             item_entry = QTableWidgetItem()
-            v_entry = float(row.get('entry_close', 0) or 0)
+            v_entry = float(row.get('entry_price', 0) or 0)
             item_entry.setData(Qt.DisplayRole, v_entry)
             self.table.setItem(i, 2, item_entry)
             # exit_date
             self.table.setItem(i, 3, QTableWidgetItem(str(row.get('exit_date', ''))))
-            # exit_close
+            # exit_price
             item_exit = QTableWidgetItem()
-            v_exit = float(row.get('exit_close', 0) or 0)
+            v_exit = float(row.get('exit_price', 0) or 0)
             item_exit.setData(Qt.DisplayRole, v_exit)
             self.table.setItem(i, 4, item_exit)
             # ret_%
@@ -25,6 +25,7 @@ from db.database import Database
 from data.fetcher import DataFetcher
 from data.save_data import DataSaver
 from strategy.selector import StockSelector, StrategyConfig
+from strategy.scoring import score_checks
 from PyQt5.QtWidgets import QGroupBox, QCheckBox, QRadioButton, QSpinBox, QComboBox
 # 新增用于详情弹窗的组件
 from PyQt5.QtWidgets import QDialog, QTextEdit, QDialogButtonBox, QFileDialog
@@ -735,14 +736,7 @@ class MainWindow(QMainWindow):
             fee = float(self.bt_fee_bps.value())
             topk = int(self.bt_topk.value())
             # 评分权重与回测器
-            weights = {
-                'vol': float(self.weight_vol.value()),
-                'ma': float(self.weight_ma.value()),
-                'brk': float(self.weight_brk.value()),
-                'pat': float(self.weight_pat.value()),
-                'macd': float(self.weight_macd.value()),
-                'rsi': float(self.weight_rsi.value()),
-            }
+            weights = self._score_weights()
             entry_mode = 'next_open' if self.bt_entry_mode.currentIndex() == 1 else 'close'
             exit_mode = 'open' if self.bt_exit_mode.currentIndex() == 1 else 'close'
             exclude_limit = bool(self.bt_exclude_limit.isChecked())
@@ -752,6 +746,15 @@ class MainWindow(QMainWindow):
                          entry_mode=entry_mode, exit_mode=exit_mode,
                          exclude_limit_up=exclude_limit, limit_up_threshold=limit_th)
             self._last_backtest = res
+            # 风险收益分析：持有期胜率需要信号股票的面板，行业取自股票列表
+            from strategy.analytics import signal_analytics
+            from strategy.panel import load_panel
+            panel = None
+            if not res.signals.empty:
+                panel = load_panel(self.db.conn, start, end, res.signals['ts_code'].unique().tolist(), adjust=cfg.adjust)
+            industry_map = (dict(zip(stock_df['ts_code'].astype(str).str.split('.').str[0], stock_df['industry']))
+                            if 'industry' in stock_df.columns else None)
+            analytics = signal_analytics(res.signals, forward_n, panel, industry_map)
             s = res.summary
             msg = (
                 f"周期: {s.get('period')}, 窗口: {s.get('lookback_days')}, 前瞻: {s.get('forward_n')}\n"
@@ -759,9 +762,11 @@ class MainWindow(QMainWindow):
                 f"平均收益(含费前/后): {s.get('avg_ret')}% / {s.get('avg_ret_after_fee')}%\n"
                 f"中位数收益: {s.get('median_ret')}%\n"
                 f"最大回撤: {s.get('mdd')}%\n"
+                f"Sharpe/Sortino/Calmar: {analytics['ratios'].get('sharpe')} / "
+                f"{analytics['ratios'].get('sortino')} / {analytics['ratios'].get('calmar')}\n"
             )
             # 弹窗展示图形与明细
-            win = BacktestWindow(res)
+            win = BacktestWindow(res, analytics)
             win.exec_()
             # 同时给出简要汇总
             QMessageBox.information(self, "回测结果", msg)
@@ -815,22 +820,16 @@ class MainWindow(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "导出失败", f"导出时发生错误: {e}")
 
-    # 评分：按启用项的权重归一化到100分
-    def _calc_score(self, checks: dict, cfg: StrategyConfig) -> float:
-        items = []
-        # (是否启用, 是否通过, 权重)
-        items.append((cfg.volume_mode is not None, bool(checks.get('volume', False)), self.weight_vol.value()))
-        items.append(((cfg.ma_alignment is not None) or (cfg.price_above_ma is not None), bool(checks.get('ma', False)), self.weight_ma.value()))
-        items.append((cfg.breakout_n is not None, bool(checks.get('breakout', False)), self.weight_brk.value()))
-        items.append((bool(cfg.enable_patterns), bool(checks.get('pattern', False)), self.weight_pat.value()))
-        items.append((bool(cfg.macd_enable), bool(checks.get('macd', False)), self.weight_macd.value()))
-        items.append((bool(cfg.rsi_enable), bool(checks.get('rsi', False)), self.weight_rsi.value()))
-        total = sum(w for used, _pass, w in items if used and w > 0)
-        if total <= 0:
-            return 0.0
-        earned = sum(w for used, _pass, w in items if used and _pass)
-        score = earned / total * 100.0
-        return round(score, 1)
+    # 评分权重：键与 strategy.scoring.WEIGHT_KEYS 对应
+    def _score_weights(self) -> dict:
+        return {
+            'vol': self.weight_vol.value(),
+            'ma': self.weight_ma.value(),
+            'brk': self.weight_brk.value(),
+            'pat': self.weight_pat.value(),
+            'macd': self.weight_macd.value(),
+            'rsi': self.weight_rsi.value(),
+        }
 
     # 评分颜色：低分绿色→高分红色（线性渐变）
     def _score_to_color(self, score: float) -> QColor:
@@ -919,13 +918,23 @@ class MainWindow(QMainWindow):
                 detail.append(f"价>MA{cfg.price_above_ma}")
             add_line("均线", checks.get('ma', False), ", ".join(detail))
         # 涨幅
-        if cfg.range_increase_min_pct is not None or (cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None):
+        if cfg.range_increase_min_pct is not None or cfg.last_pct_chg_min is not None or (cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None):
             detail = []
             if cfg.range_increase_min_pct is not None:
                 detail.append(f"区间≥{cfg.range_increase_min_pct}%")
             if cfg.exists_day_increase_within_days and cfg.exists_day_increase_min_pct is not None:
                 detail.append(f"{cfg.exists_day_increase_within_days}日内单日≥{cfg.exists_day_increase_min_pct}%")
+            if cfg.last_pct_chg_min is not None:
+                detail.append(f"末日≥{cfg.last_pct_chg_min}%")
             add_line("涨幅", checks.get('range', False), ", ".join(detail))
+        # 价格区间
+        if cfg.price_min is not None or cfg.price_max is not None:
+            detail = []
+            if cfg.price_min is not None:
+                detail.append(f"≥{cfg.price_min}")
+            if cfg.price_max is not None:
+                detail.append(f"≤{cfg.price_max}")
+            add_line("价格", checks.get('price', False), " ".join(detail))
         # 形态
         if cfg.enable_patterns:
             add_line("形态", checks.get('pattern', False), f"{','.join(cfg.enable_patterns)} | 窗口{cfg.pattern_window}")
@@ -987,6 +996,11 @@ class MainWindow(QMainWindow):
         ts_codes = stock_df['ts_code'].tolist()
         # 执行筛选
         passed = self.selector.filter_stocks(ts_codes, start, end, cfg)
+        # 评分：整张检查矩阵一次矩阵运算（按启用项的权重归一化到100分）
+        if not passed.empty:
+            scores = score_checks(pd.DataFrame(list(passed['checks'])), cfg, self._score_weights(), 1).tolist()
+        else:
+            scores = []
         # 展示结果，补充名称、行业与区间指标
         self.table.setRowCount(len(passed))
         for i, r in passed.reset_index(drop=True).iterrows():
@@ -1015,7 +1029,7 @@ class MainWindow(QMainWindow):
             # 生成详细摘要与简要标签
             detail_text = self._checks_summary_text(checks, cfg)
             short_tags = "; ".join([seg.split(':')[0] + ':' + ('✔' if '✔' in seg else '✘') for seg in detail_text.split('\n')]) if detail_text and detail_text != '-' else '-'
-            score = self._calc_score(checks, cfg)
+            score = scores[i]
             fwd5 = self._forward_return_pct(ts_code, end_date, close, 5)
 
             self.table.setItem(i, 0, QTableWidgetItem(ts_code))
@@ -1048,14 +1062,29 @@ class MainWindow(QMainWindow):
         if notes:
             summary = f"{summary} | {'；'.join(notes)}"
         self.update_info_label(summary)
+        self.info_label.setToolTip(self._rule_report_text())
+
+    def _rule_report_text(self) -> str:
+        # 规则评估报告：平均耗时与淘汰率（累计自本次启动以来的选股运行）
+        report = self.selector.rule_report()
+        if report.empty:
+            return ""
+        lines = ["规则 | 评估次数 | 平均耗时(ms) | 淘汰率"]
+        for _, r in report.iterrows():
+            lines.append(f"{r['rule']} | {r['evaluated']} | {r['avg_ms']:.3f} | {r['reject_rate']:.1f}%")
+        return "\n".join(lines)
 
     def on_plot_kline(self, row, col):
         ts_code = self.table.item(row, 0).text()
         # 获取当前筛选的日期区间
         start, end, _ = self.get_date_range()
-        kline = self.db.conn.execute(
-            "SELECT trade_date, open, high, low, close, vol FROM daily_kline WHERE ts_code=? AND trade_date>=? AND trade_date<=? ORDER BY trade_date ASC",
-            (ts_code, start, end)).fetchall()
+        # 图表按前复权价格绘制，与选股/回测口径一致（见 strategy.adjust）
+        from strategy.adjust import DEFAULT_ADJUST, adjust_bars, latest_factors
+        bars = pd.read_sql_query(
+            "SELECT trade_date, open, high, low, close, vol, adj_factor FROM daily_kline WHERE ts_code=? AND trade_date>=? AND trade_date<=? ORDER BY trade_date ASC",
+            self.db.conn, params=(ts_code, start, end))
+        bars = adjust_bars(bars, DEFAULT_ADJUST, latest_factors(self.db.conn, [ts_code]).get(ts_code))
+        kline = list(bars[["trade_date", "open", "high", "low", "close", "vol"]].itertuples(index=False, name=None))
         if not kline:
             QMessageBox.warning(self, "无数据", "该股票区间无K线数据")
             return
@@ -1,3 +1,5 @@
+import json
+
 import streamlit as st
 import requests
 import pandas as pd
@@ -29,6 +31,7 @@ try:
     stats_data = stats_resp.json()
     total_stocks = stats_data.get("total_stocks", 0)
     latest_date = stats_data.get("latest_trade_date", "未知")
+    market_snapshot = stats_data.get("market")
     if latest_date and latest_date != "未知":
         # 格式化日期显示
         try:
@@ -40,6 +43,7 @@ try:
 except:
     total_stocks = "未知"
     latest_date = "未知"
+    market_snapshot = None
 
 # 运行中任务数
 try:
@@ -107,6 +111,38 @@ with col4:
 # 市场概览
 st.header("📊 市场概览")
 
+# 市场宽度与异动（读取 market_snapshot 最新一行，入库后已预先计算）
+if market_snapshot:
+    st.caption(f"快照交易日：{market_snapshot.get('trade_date')}")
+    m1, m2, m3, m4, m5, m6 = st.columns(6)
+    m1.metric("上涨 / 下跌", f"{market_snapshot.get('advancers', 0)} / {market_snapshot.get('decliners', 0)}")
+    m2.metric("涨停 / 跌停", f"{market_snapshot.get('limit_up', 0)} / {market_snapshot.get('limit_down', 0)}")
+    m3.metric("20日新高 / 新低", f"{market_snapshot.get('new_high_20', 0)} / {market_snapshot.get('new_low_20', 0)}")
+    m4.metric("60日新高 / 新低", f"{market_snapshot.get('new_high_60', 0)} / {market_snapshot.get('new_low_60', 0)}")
+    m5.metric("放量异动", market_snapshot.get("vol_spikes", 0))
+    median_chg = market_snapshot.get("median_pct_chg")
+    m6.metric("涨跌幅中位数", f"{median_chg:.2f}%" if median_chg is not None else "-")
+
+    lead_col1, lead_col2 = st.columns(2)
+    with lead_col1:
+        st.markdown("**换手率排行**")
+        leaders = market_snapshot.get("turnover_leaders") or []
+        if leaders:
+            st.dataframe(pd.DataFrame(leaders).rename(columns={"ts_code": "代码", "turnover_rate": "换手率", "pct_chg": "涨跌幅"}),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("暂无数据")
+    with lead_col2:
+        st.markdown("**放量异动（成交量 z-score）**")
+        spikes = market_snapshot.get("vol_spike_leaders") or []
+        if spikes:
+            st.dataframe(pd.DataFrame(spikes).rename(columns={"ts_code": "代码", "vol_z": "z-score", "pct_chg": "涨跌幅"}),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("当日无放量异动")
+else:
+    st.info("暂无市场快照，请先点击'📊 计算统计数据'")
+
 # 行业标签
 st.subheader("🏷️ 行业标签")
 
@@ -276,23 +312,39 @@ st.header("📋 最近活动")
 
 # 最近选股结果
 st.subheader("最近选股结果")
-try:
-    # 调用选股接口获取最近结果
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _recent_selection(backend_url: str, limit: int = 5) -> list:
+    """流式读取选股结果，拿到前 limit 条即断开，不等待全市场评估完成。"""
     selection_payload = {
         "cfg": {},
         "start": "20240101",
         "end": "20241231",
         "codes": None
     }
-    selection_resp = requests.post(f"{backend}/selection", json=selection_payload, timeout=30)
-    selection_data = selection_resp.json()
-    items = selection_data.get("items", [])
+    items = []
+    with requests.post(f"{backend_url}/selection", params={"stream": "true"},
+                       json=selection_payload, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            row = json.loads(line)
+            if row.get("done"):
+                break
+            items.append(row)
+            if len(items) >= limit:
+                break
+    return items
+
+
+try:
+    items = _recent_selection(backend)
     
     if items:
-        # 取前5个结果
-        top_5 = items[:5]
         df_data = []
-        for item in top_5:
+        for item in items:
             df_data.append({
                 "代码": item.get("ts_code", ""),
                 "名称": item.get("name", ""),
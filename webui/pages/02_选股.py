@@ -1,3 +1,5 @@
+import json
+
 import streamlit as st
 import pandas as pd
 import requests
@@ -53,6 +55,33 @@ sort_options = {
 }
 sort_by = st.selectbox("排序方式", list(sort_options.keys()))
 
+# 截面排名筛选（读取 xs_rank 特征库，需先计算统计数据）
+xs_features = {"不启用": None, "5日涨幅": "ret_5", "20日涨幅": "ret_20", "60日涨幅": "ret_60",
+               "换手率": "turnover", "振幅": "amplitude", "量比": "volume_ratio"}
+xs_col1, xs_col2, xs_col3 = st.columns(3)
+with xs_col1:
+    xs_label = st.selectbox("截面排名特征", list(xs_features.keys()))
+with xs_col2:
+    xs_scope = st.selectbox("排名范围", ["全市场", "行业内"])
+with xs_col3:
+    xs_pct_min = st.number_input("百分位下限（90 = 前10%）", min_value=0.0, max_value=100.0, value=90.0, step=5.0)
+xs_cfg = {}
+# K线周期：周/月线需先计算周期K线（/stocks/calculate-timeframe-bars）
+timeframes = {"日线": "daily", "周线": "weekly", "月线": "monthly"}
+adjusts = {"前复权": "qfq", "后复权": "hfq", "不复权": "raw"}
+tf_col, adj_col = st.columns(2)
+with tf_col:
+    tf_label = st.selectbox("K线周期", list(timeframes.keys()))
+with adj_col:
+    adj_label = st.selectbox("复权方式", list(adjusts.keys()))
+if timeframes[tf_label] != "daily":
+    xs_cfg["timeframe"] = timeframes[tf_label]
+if adjusts[adj_label] != "qfq":
+    xs_cfg["adjust"] = adjusts[adj_label]
+if xs_features[xs_label]:
+    xs_cfg.update({"xs_feature": xs_features[xs_label], "xs_scope": "industry" if xs_scope == "行业内" else "market",
+                   "xs_pct_min": xs_pct_min})
+
 if st.button("运行选股"):
     try:
         codes = [c.strip() for c in codes_csv.split(',') if c.strip()] if codes_csv.strip() else None
@@ -68,14 +97,28 @@ if st.button("运行选股"):
             if industry_stocks:
                 codes = [stock['ts_code'] for stock in industry_stocks]
         
-        payload = {"cfg": {}, "start": start, "end": end, "codes": codes}
+        payload = {"cfg": xs_cfg, "start": start, "end": end, "codes": codes}
         url = f"{st.session_state['backend_url'].rstrip('/')}/selection"
-        resp = requests.post(url, json=payload, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-        items = data.get("items", [])
+        # 流式接收：每到一批结果就刷新表格，首批结果无需等待全部评估完成
+        items = []
+        status = st.empty()
+        table = st.empty()
+        with requests.post(url, params={"stream": "true"}, json=payload, timeout=60, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                row = json.loads(line)
+                if row.get("done"):
+                    status.caption(f"共 {row.get('total', len(items))} 只，耗时 {row.get('elapsed_ms', 0):.0f} ms")
+                    break
+                items.append(row)
+                if len(items) % 50 == 1:
+                    table.dataframe(pd.DataFrame(items), use_container_width=True)
+                    status.caption(f"已返回 {len(items)} 只…")
         
         if not items:
+            table.empty()
             st.info("没有返回结果")
         else:
             df = pd.DataFrame(items)
@@ -85,7 +128,7 @@ if st.button("运行选股"):
                 if sort_field in df.columns:
                     df = df.sort_values(sort_field, ascending=False)
             
-            st.dataframe(df, use_container_width=True)
+            table.dataframe(df, use_container_width=True)
             
             # 导出功能
             if st.button("导出结果"):
@@ -21,23 +21,62 @@ with col3:
 
 forward_n = st.number_input("前瞻天数", value=5, min_value=1, max_value=60, step=1)
 codes_csv = st.text_area("可选：指定代码(逗号分隔)", value="")
+boot_n = st.number_input("自助法重采样次数(0 为不计算)", value=0, min_value=0, max_value=20000, step=500)
 
 if st.button("运行回测"):
     try:
         codes = [c.strip() for c in codes_csv.split(',') if c.strip()] if codes_csv.strip() else None
         payload = {"cfg": {}, "start": start, "end": end, "codes": codes, "lookback": lookback, "forward_n": forward_n}
+        if boot_n:
+            payload["bootstrap"] = {"n_samples": int(boot_n), "block_days": int(forward_n), "seed": 0}
         url = f"{st.session_state['backend_url'].rstrip('/')}/backtest"
         resp = requests.post(url, json=payload, timeout=120)
         resp.raise_for_status()
         data = resp.json()
+        summary = data.get("summary", {})
+        portfolio = summary.pop("portfolio", {})
         st.subheader("Summary")
-        st.json(data.get("summary", {}))
+        st.json(summary)
+        nav = data.get("nav", [])
+        if nav:
+            st.subheader("组合净值")
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("总收益", f"{portfolio.get('total_return', 0):.2f}%")
+            c2.metric("年化收益", f"{portfolio.get('annual_return', 0):.2f}%")
+            c3.metric("最大回撤", f"{portfolio.get('portfolio_mdd', 0):.2f}%")
+            c4.metric("平均仓位", f"{portfolio.get('avg_exposure', 0) * 100:.1f}%")
+            nav_df = pd.DataFrame(nav).set_index("trade_date")
+            st.line_chart(nav_df["nav"])
+            st.area_chart(nav_df[["exposure", "turnover"]])
+        analytics = data.get("analytics", {})
+        sa = analytics.get("signals", {})
+        if sa.get("ratios"):
+            st.subheader("风险收益")
+            r = sa["ratios"]
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Sharpe", r.get("sharpe"))
+            c2.metric("Sortino", r.get("sortino"))
+            c3.metric("Calmar", r.get("calmar"))
+            c4.metric("组合 Sharpe", analytics.get("portfolio", {}).get("sharpe"))
+            if nav:
+                st.area_chart(nav_df["drawdown"])
+            t1, t2, t3, t4 = st.tabs(["持有期", "月度", "行业", "收益分布"])
+            t1.dataframe(pd.DataFrame(sa.get("horizons", [])), use_container_width=True)
+            t2.dataframe(pd.DataFrame(sa.get("by_month", [])), use_container_width=True)
+            t3.dataframe(pd.DataFrame(sa.get("by_industry", [])), use_container_width=True)
+            hist = pd.DataFrame(sa.get("distribution", {}).get("histogram", []))
+            if not hist.empty:
+                t4.bar_chart(hist.set_index("bin")["count"])
+        boot = analytics.get("bootstrap", {})
+        if boot.get("metrics"):
+            st.subheader(f"置信区间（块自助法 {boot['samples']} 次，块长 {boot['block_days']} 个信号日）")
+            st.dataframe(pd.DataFrame(boot["metrics"]).T, use_container_width=True)
         sig = data.get("signals", [])
         if sig:
             st.subheader("Signals")
             df = pd.DataFrame(sig)
             st.dataframe(df, use_container_width=True)
         else:
-            st.info("暂无信号明细(占位)")
+            st.info("暂无信号明细")
     except Exception as e:
         st.error(f"请求失败: {e}")